@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('committees', '0003_alter_committeeleadership_unique_together_and_more'),
+        ('core', '0010_job'),
+        ('membership', '0006_alter_member_membership_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='committeemembership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['committee'], name='committeemember_active_idx'),
+        ),
+    ]
@@ -63,3 +63,6 @@ class CommitteeMembership(TenantModel):
     class Meta:
         ordering = ['committee', 'member__last_name']
         unique_together = ['church', 'committee', 'member']
+        indexes = [
+            models.Index(fields=['committee'], condition=models.Q(is_active=True), name='committeemember_active_idx'),
+        ]
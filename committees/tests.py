@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import Church, UserProfile
+from membership.models import Member
+from .models import Committee, CommitteeLeadership, CommitteeMembership
+
+
+class CommitteeQueryCountTests(TestCase):
+    """Committee lists and reports must not run a count query per committee"""
+
+    # session, user, profile, church, page count, page of committees
+    LIST_QUERIES = 6
+    # session, user, profile, church, committees with their figures
+    SUMMARY_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Query Count Church')
+        cls.user = User.objects.create_user('committees-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.members = [
+            Member.objects.create(
+                church=cls.church, first_name=f'Member{i}', last_name='Test', gender='F',
+                date_of_birth=date(1990, 1, 1), address='-', membership_status='communicant',
+                date_joined=date(2020, 1, 1),
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_committees(self, count):
+        for i in range(count):
+            committee = Committee.objects.create(church=self.church, name=f'Committee {Committee.admin_objects.count()}')
+            for j, member in enumerate(self.members):
+                CommitteeMembership.objects.create(
+                    church=self.church, committee=committee, member=member,
+                    joined_date=date(2021, 1, 1), is_active=j != 0,
+                )
+            CommitteeLeadership.objects.create(
+                church=self.church, committee=committee, member=self.members[1], role='convenor',
+                start_date=date(2021, 1, 1),
+            )
+
+    def test_list_query_count_does_not_grow_with_committees(self):
+        self.add_committees(2)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            self.client.get('/api/committees/committees/')
+
+        self.add_committees(10)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/committees/committees/')
+
+        committee = response.json()['results'][0]
+        self.assertEqual(committee['member_count'], 3)
+        self.assertEqual(committee['leader_count'], 1)
+        self.assertEqual(committee['convenor_name'], 'Member1 Test')
+
+    def test_summary_query_count_does_not_grow_with_committees(self):
+        self.add_committees(12)
+        with self.assertNumQueries(self.SUMMARY_QUERIES):
+            response = self.client.get('/api/reports/generate/committees_summary/')
+
+        self.assertEqual(len(response.json()), 12)
+        self.assertEqual(response.json()[0]['active_members'], 3)
+        self.assertEqual(response.json()[0]['total_members'], 4)
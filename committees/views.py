@@ -1,5 +1,6 @@
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from core.aggregates import with_membership_stats
 from .models import Committee, CommitteeLeadership, CommitteeMembership
 from .serializers import CommitteeSerializer, CommitteeLeadershipSerializer, CommitteeMembershipSerializer
 
@@ -9,6 +10,9 @@ class CommitteeViewSet(viewsets.ModelViewSet):
     serializer_class = CommitteeSerializer
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name']
+    
+    def get_queryset(self):
+        return with_membership_stats(super().get_queryset())
 
 
 class CommitteeLeadershipViewSet(viewsets.ModelViewSet):
@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import Church, UserProfile, Backup, BackupConfiguration
+from .models import Church, UserProfile, Backup, BackupConfiguration, NumberSequence, Job
 from django.urls import path
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import FileResponse, HttpResponse
 from django.utils.html import format_html
-from core import backup_utils
+from core import backup_utils, jobs
 import os
 
 @admin.register(Church)
@@ -21,18 +21,43 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'church__name']
 
 
+@admin.register(NumberSequence)
+class NumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'church', 'last_value', 'updated_at']
+    list_filter = ['prefix', 'church']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'church', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind', 'church']
+    readonly_fields = ['kind', 'status', 'payload', 'upload', 'progress', 'progress_message', 'result', 'error',
+                       'attempts', 'worker', 'church', 'created_by', 'created_at', 'started_at', 'finished_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Backup)
 class BackupAdmin(admin.ModelAdmin):
-    list_display = ['filename', 'backup_type', 'status', 'file_size_display', 'created_at', 'created_by', 'action_buttons']
+    list_display = ['filename', 'backup_type', 'status', 'file_size_display', 'progress_display', 'created_at', 'created_by', 'action_buttons']
     list_filter = ['backup_type', 'status', 'created_at']
     search_fields = ['filename', 'notes']
-    readonly_fields = ['filename', 'created_at', 'created_by', 'file_size', 'status']
+    readonly_fields = ['filename', 'created_at', 'created_by', 'file_size', 'status', 'parent', 'snapshot_at',
+                       'files_total', 'files_done', 'bytes_processed', 'duration']
+    exclude = ['manifest']
     change_list_template = 'admin/core/backup/change_list.html'
     
     def file_size_display(self, obj):
         return f"{obj.file_size_mb} MB"
     file_size_display.short_description = 'Size'
     
+    def progress_display(self, obj):
+        if not obj.files_total:
+            return '-'
+        return f"{obj.files_done}/{obj.files_total} files ({obj.progress_percent}%, {obj.throughput_mb} MB/s)"
+    progress_display.short_description = 'Media Progress'
+    
     def action_buttons(self, obj):
         if obj.status == 'completed':
             return format_html(
@@ -63,23 +88,14 @@ class BackupAdmin(admin.ModelAdmin):
             backup_type = request.POST.get('backup_type', 'full')
             notes = request.POST.get('notes', '')
             
-            try:
-                if backup_type == 'database':
-                    backup, filepath = backup_utils.create_database_backup(user=request.user, notes=notes)
-                elif backup_type == 'media':
-                    backup, filepath = backup_utils.create_media_backup(user=request.user, notes=notes)
-                else:
-                    backup, filepath = backup_utils.create_full_backup(user=request.user, notes=notes)
-                
-                # Cleanup old backups
-                backup_utils.cleanup_old_backups()
-                
-                messages.success(request, f'Backup created successfully: {backup.filename}')
+            if backup_type not in dict(Backup.BACKUP_TYPE_CHOICES):
+                messages.error(request, f'Unknown backup type: {backup_type}')
                 return redirect('/admin/core/backup/')
             
-            except Exception as e:
-                messages.error(request, f'Backup failed: {str(e)}')
-                return redirect('/admin/core/backup/')
+            # Backups run in the job worker so the request does not hit the worker timeout
+            job = jobs.enqueue('core.create_backup', {'backup_type': backup_type, 'notes': notes}, user=request.user)
+            messages.success(request, f'Backup queued (job #{job.id}). It will appear in the list when the job worker has finished it.')
+            return redirect('/admin/core/backup/')
         
         context = {
             'title': 'Create Backup',
@@ -114,10 +130,16 @@ class BackupAdmin(admin.ModelAdmin):
                 messages.error(request, 'Backup file not found')
                 return redirect('/admin/core/backup/')
             
+            church_restore = backup.backup_type in ('database', 'full')
+            
             if request.method == 'POST':
                 confirm = request.POST.get('confirm')
                 if confirm == 'yes':
                     try:
+                        church = None
+                        if church_restore and request.POST.get('church'):
+                            church = Church.objects.get(pk=request.POST['church'])
+                        
                         # Create automatic backup before restore
                         backup_utils.create_full_backup(
                             user=request.user,
@@ -126,13 +148,16 @@ class BackupAdmin(admin.ModelAdmin):
                         
                         # Perform restore
                         if backup.backup_type == 'database':
-                            backup_utils.restore_database(filepath)
+                            backup_utils.restore_database(filepath, church=church)
                         elif backup.backup_type == 'media':
                             backup_utils.restore_media(filepath)
+                        elif backup.backup_type == 'differential':
+                            backup_utils.restore_differential_backup(backup)
                         else:
-                            backup_utils.restore_full_backup(filepath)
+                            backup_utils.restore_full_backup(filepath, church=church)
                         
-                        messages.success(request, f'Restore completed successfully from: {backup.filename}')
+                        scope = f' for {church.name}' if church else ''
+                        messages.success(request, f'Restore completed successfully{scope} from: {backup.filename}')
                         return redirect('/admin/core/backup/')
                     
                     except Exception as e:
@@ -142,6 +167,7 @@ class BackupAdmin(admin.ModelAdmin):
             context = {
                 'title': 'Restore Backup',
                 'backup': backup,
+                'churches': Church.objects.order_by('name') if church_restore else None,
                 'opts': self.model._meta,
                 'has_view_permission': self.has_view_permission(request),
             }
@@ -0,0 +1,66 @@
+"""
+Per-row aggregates for list endpoints and reports.
+
+The helpers annotate a queryset with correlated subqueries, so a page of rows
+comes back with its counts in one query instead of one extra query per row.
+Each subquery is scoped to its own relation, so several counts on the same
+rows don't multiply each other the way joins would.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def aggregate_subquery(queryset, outer_field, aggregate, default, output_field):
+    """``aggregate`` over the ``queryset`` rows whose ``outer_field`` points at the outer row"""
+    values = (
+        queryset.filter(**{outer_field: OuterRef('pk')})
+        .order_by()
+        .values(outer_field)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Coalesce(Subquery(values, output_field=output_field), Value(default), output_field=output_field)
+
+
+def count_subquery(queryset, outer_field):
+    """Count of ``queryset`` rows whose ``outer_field`` points at the outer row"""
+    return aggregate_subquery(queryset, outer_field, Count('pk'), 0, IntegerField())
+
+
+def sum_subquery(queryset, outer_field, expression):
+    """Sum of ``expression`` (a field name or expression) over the related rows, 0 when there are none"""
+    return aggregate_subquery(queryset, outer_field, Sum(expression), Decimal('0'), MONEY)
+
+
+def with_membership_stats(queryset):
+    """Annotate groups or committees with membership and leadership figures.
+
+    Works for any model with ``memberships`` and ``leadership`` reverse
+    relations whose rows carry ``is_active`` and ``member`` fields. Adds
+    ``active_member_count``, ``member_count_total``, ``active_leader_count``
+    and ``convenor_name`` (the active convenor, or None).
+    """
+    meta = queryset.model._meta
+    membership_relation = meta.get_field('memberships')
+    leadership_relation = meta.get_field('leadership')
+    memberships = membership_relation.related_model._base_manager.all()
+    leadership = leadership_relation.related_model._base_manager.all()
+    membership_fk = membership_relation.field.name
+    leadership_fk = leadership_relation.field.name
+
+    convenor = (
+        leadership.filter(**{leadership_fk: OuterRef('pk')}, role='convenor', is_active=True)
+        .order_by('-start_date')
+        .annotate(name=Concat('member__first_name', Value(' '), 'member__last_name'))
+        .values('name')[:1]
+    )
+    return queryset.annotate(
+        active_member_count=count_subquery(memberships.filter(is_active=True), membership_fk),
+        member_count_total=count_subquery(memberships, membership_fk),
+        active_leader_count=count_subquery(leadership.filter(is_active=True), leadership_fk),
+        convenor_name=Subquery(convenor),
+    )
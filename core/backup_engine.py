@@ -0,0 +1,448 @@
+"""
+Streaming database backup format.
+
+A database backup is a ZIP archive with one compressed member per model:
+
+    manifest.json                         format version, per-model row counts and checksums
+    database/<app_label>.<model>.jsonl    one serialized row per line (Django's "python" format)
+
+Rows are read in primary-key chunks and written straight into their archive
+member, so memory use stays flat however large the tables are and no
+intermediate JSON file is written.
+
+Differential backups use the same layout, but models with an ``updated_at``
+timestamp only carry the rows changed since the parent backup, plus a
+``keys/<app_label>.<model>.keys`` member listing every primary key so
+deletions can be replayed. Many-to-many links are stored as full copies of
+their through tables. Media files are not put in the archive; they are
+stored once in a content-addressed blob store next to the backups and the
+manifest maps each media path to its blob.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.apps import apps
+from django.core import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+
+FORMAT_VERSION = 2
+MANIFEST_NAME = 'manifest.json'
+DATABASE_PREFIX = 'database/'
+KEYS_PREFIX = 'keys/'
+BLOB_DIR_NAME = 'blobs'
+CHUNK_SIZE = 2000
+READ_SIZE = 1024 * 1024
+
+# Formats that are already compressed; deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.pdf',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.rar',
+    '.mp3', '.mp4', '.m4a', '.mov', '.avi',
+    '.docx', '.xlsx', '.pptx', '.odt', '.ods',
+}
+# Larger files are streamed by the writer instead of being buffered by a worker
+MAX_BUFFERED_SIZE = 64 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# Same exclusions the old dumpdata-based backups used, plus the backup
+# catalogue, which describes files on disk and is carried across restores
+EXCLUDED = ['contenttypes', 'auth.permission', 'sessions.session', 'core.backup']
+CATALOGUE_MODEL = 'core.backup'
+
+
+class BackupIntegrityError(Exception):
+    """The archive does not match its manifest"""
+
+
+def backup_models():
+    """Models included in database backups, in dependency order"""
+    app_list = {}
+    for model in apps.get_models():
+        opts = model._meta
+        if opts.app_label in EXCLUDED or opts.label_lower in EXCLUDED:
+            continue
+        if opts.proxy or not opts.managed:
+            continue
+        app_list.setdefault(apps.get_app_config(opts.app_label), []).append(model)
+    return serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+
+
+def iter_model_rows(model, chunk_size=CHUNK_SIZE, queryset=None, include_m2m=True):
+    """Yield serialized rows of a model, reading the table in primary-key chunks"""
+    qs = queryset if queryset is not None else model._base_manager.all()
+    m2m = [f.name for f in model._meta.many_to_many if f.remote_field.through._meta.auto_created]
+    qs = qs.order_by('pk')
+    options = {}
+    if not include_m2m:
+        options['fields'] = [f.name for f in model._meta.local_fields if not f.primary_key]
+    elif m2m:
+        qs = qs.prefetch_related(*m2m)
+
+    last_pk = None
+    while True:
+        chunk = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            return
+        yield from serializers.serialize('python', chunk, **options)
+        last_pk = chunk[-1].pk
+
+
+def member_name(model, prefix=DATABASE_PREFIX):
+    return f'{prefix}{model._meta.label_lower}.jsonl'
+
+
+def write_rows(zipf, name, rows, chunk_size=CHUNK_SIZE):
+    """Stream serialized rows into one archive member. Returns (row count, sha256)"""
+    digest = hashlib.sha256()
+    count = 0
+    buffer = []
+    with zipf.open(name, 'w', force_zip64=True) as member:
+        for row in rows:
+            buffer.append(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            count += 1
+            if len(buffer) >= chunk_size:
+                data = ('\n'.join(buffer) + '\n').encode('utf-8')
+                digest.update(data)
+                member.write(data)
+                buffer = []
+        if buffer:
+            data = ('\n'.join(buffer) + '\n').encode('utf-8')
+            digest.update(data)
+            member.write(data)
+    return count, digest.hexdigest()
+
+
+def write_keys(zipf, name, queryset, chunk_size=CHUNK_SIZE):
+    """Write the primary keys of a queryset, one per line. Returns (key count, sha256)"""
+    rows = ({'pk': pk} for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size))
+    return write_rows(zipf, name, rows, chunk_size)
+
+
+def write_database(zipf, models=None, chunk_size=CHUNK_SIZE):
+    """Write every backed-up model into the archive and return the manifest entries"""
+    entries = []
+    for model in models or backup_models():
+        name = member_name(model)
+        rows, checksum = write_rows(zipf, name, iter_model_rows(model, chunk_size), chunk_size)
+        entries.append({
+            'model': model._meta.label_lower,
+            'member': name,
+            'rows': rows,
+            'sha256': checksum,
+        })
+    return entries
+
+
+def delta_field(model):
+    """The modification timestamp differential backups compare against, if the model has one"""
+    try:
+        field = model._meta.get_field('updated_at')
+    except FieldDoesNotExist:
+        return None
+    return field.name if field.get_internal_type() == 'DateTimeField' else None
+
+
+def through_models(models):
+    """Auto-created many-to-many tables of the given models"""
+    return [
+        field.remote_field.through
+        for model in models
+        for field in model._meta.local_many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+
+
+def write_differential(zipf, since=None, chunk_size=CHUNK_SIZE):
+    """Write the rows changed since ``since`` (everything when None) and return the manifest entries"""
+    models = backup_models()
+    entries = []
+    for model in models + through_models(models):
+        label = model._meta.label_lower
+        qs = model._base_manager.all()
+        field = delta_field(model) if since else None
+        if field:
+            qs = qs.filter(**{f'{field}__gte': since})
+
+        name = member_name(model)
+        rows, checksum = write_rows(zipf, name, iter_model_rows(model, chunk_size, qs, include_m2m=False), chunk_size)
+        entry = {
+            'model': label,
+            'member': name,
+            'rows': rows,
+            'sha256': checksum,
+            'mode': 'delta' if field else 'full',
+        }
+        if field:
+            keys_name = f'{KEYS_PREFIX}{label}.keys'
+            keys, keys_checksum = write_keys(zipf, keys_name, model._base_manager.all(), chunk_size)
+            entry['keys'] = {'member': keys_name, 'rows': keys, 'sha256': keys_checksum}
+        entries.append(entry)
+    return entries
+
+
+def build_manifest(backup_type, database=None, **extra):
+    manifest = {
+        'format': FORMAT_VERSION,
+        'backup_type': backup_type,
+        'created_at': datetime.now().isoformat(),
+        'database': database or [],
+    }
+    manifest.update(extra)
+    return manifest
+
+
+def write_manifest(zipf, manifest):
+    zipf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, cls=DjangoJSONEncoder))
+
+
+def read_manifest(zipf):
+    """Return the manifest of a streaming backup, or None for legacy archives"""
+    if MANIFEST_NAME not in zipf.namelist():
+        return None
+    return json.loads(zipf.read(MANIFEST_NAME))
+
+
+def iter_member_rows(zipf, name):
+    """Yield the serialized rows stored in one archive member"""
+    with zipf.open(name) as member:
+        for line in member:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _verify_member(zipf, entry):
+    digest = hashlib.sha256()
+    rows = 0
+    with zipf.open(entry['member']) as member:
+        for line in member:
+            digest.update(line)
+            rows += 1
+    if rows != entry['rows'] or digest.hexdigest() != entry['sha256']:
+        raise BackupIntegrityError(f"{entry['member']} does not match the backup manifest")
+
+
+def verify_archive(zipf, manifest):
+    """Check every database member against the row count and checksum in the manifest"""
+    for entry in manifest['database']:
+        _verify_member(zipf, entry)
+        if 'keys' in entry:
+            _verify_member(zipf, entry['keys'])
+
+
+# Content-addressed media store
+
+def blob_path(blob_root, checksum):
+    return os.path.join(blob_root, checksum[:2], checksum)
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_media(media_root, blob_root, previous=None):
+    """Store every media file in the blob store and return (media map, bytes newly stored).
+
+    Files whose size and modification time match the previous backup's map are
+    not read again.
+    """
+    previous = previous or {}
+    media = {}
+    stored = 0
+    if not os.path.exists(media_root):
+        return media, stored
+
+    for root, dirs, files in os.walk(media_root):
+        for file in files:
+            file_path = os.path.join(root, file)
+            relpath = os.path.relpath(file_path, media_root).replace(os.sep, '/')
+            stat = os.stat(file_path)
+            entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+            known = previous.get(relpath)
+            if (known and known['size'] == entry['size'] and known['mtime'] == entry['mtime']
+                    and os.path.exists(blob_path(blob_root, known['sha256']))):
+                entry['sha256'] = known['sha256']
+            else:
+                entry['sha256'] = file_checksum(file_path)
+                target = blob_path(blob_root, entry['sha256'])
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    partial = f'{target}.partial'
+                    shutil.copyfile(file_path, partial)
+                    os.replace(partial, target)
+                    stored += entry['size']
+            media[relpath] = entry
+    return media, stored
+
+
+def restore_media_from_blobs(media, blob_root, media_root):
+    """Rebuild MEDIA_ROOT from a media map"""
+    missing = [path for path, entry in media.items() if not os.path.exists(blob_path(blob_root, entry['sha256']))]
+    if missing:
+        raise BackupIntegrityError(f"{len(missing)} media blobs are missing, e.g. {missing[0]}")
+
+    if os.path.exists(media_root):
+        shutil.rmtree(media_root)
+    for relpath, entry in media.items():
+        destination = os.path.join(media_root, *relpath.split('/'))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(blob_path(blob_root, entry['sha256']), destination)
+
+
+def collect_garbage(blob_root, referenced):
+    """Delete blobs no longer referenced by any backup. Returns the number removed"""
+    removed = 0
+    if not os.path.exists(blob_root):
+        return removed
+    for root, dirs, files in os.walk(blob_root):
+        for file in files:
+            if file not in referenced:
+                os.remove(os.path.join(root, file))
+                removed += 1
+    return removed
+
+
+# Media archiving
+
+class MediaZipFile(zipfile.ZipFile):
+    """ZipFile that can append entries compressed ahead of time by worker threads.
+
+    ZipFile has no public way to append an already-deflated payload, so
+    write_compressed() mirrors what ZipFile.writestr() does with its internal
+    state (file pointer, central directory list, header writer). Those
+    internals are not a stable API: core.tests reads archives written this
+    way back with testzip() to catch a Python upgrade that changes them.
+    """
+
+    def write_compressed(self, zinfo, payload):
+        """Append an entry whose file_size, CRC and compress_type are already set on ``zinfo``"""
+        zinfo.compress_size = len(payload)
+        zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+        if self._writing:
+            raise ValueError("Can't write to ZIP archive while an open writing handle exists.")
+        with self._lock:
+            self._writecheck(zinfo)
+            self._didModify = True
+            self.fp.seek(self.start_dir)
+            zinfo.header_offset = self.fp.tell()
+            self.fp.write(zinfo.FileHeader(zip64))
+            self.fp.write(payload)
+            self.start_dir = self.fp.tell()
+            self.filelist.append(zinfo)
+            self.NameToInfo[zinfo.filename] = zinfo
+
+
+def media_files(media_root):
+    """(path, relative path) of every file under MEDIA_ROOT"""
+    files = []
+    if os.path.exists(media_root):
+        for root, dirs, names in os.walk(media_root):
+            for name in names:
+                path = os.path.join(root, name)
+                files.append((path, os.path.relpath(path, media_root)))
+    return files
+
+
+def is_precompressed(path):
+    return os.path.splitext(path)[1].lower() in STORED_EXTENSIONS
+
+
+def _prepare_media_file(path, arcname):
+    """Read and compress one file off the writer thread. Returns (zipinfo, payload or None)"""
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    if zinfo.file_size > MAX_BUFFERED_SIZE:
+        return zinfo, None
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    zinfo.file_size = len(data)
+    zinfo.CRC = zlib.crc32(data)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    payload = data
+
+    if not is_precompressed(path):
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+        deflated = compressor.compress(data) + compressor.flush()
+        if len(deflated) < len(data):
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            payload = deflated
+    return zinfo, payload
+
+
+def write_media(zipf, media_root, prefix='', workers=None, progress=None, files=None):
+    """Archive MEDIA_ROOT into ``zipf`` (a MediaZipFile) using a pool of reader/compressor threads.
+
+    Already-compressed formats are stored as-is. ``progress`` is called with
+    (files done, bytes done) as entries are written. Returns (file count, bytes read).
+    """
+    files = media_files(media_root) if files is None else files
+    workers = workers or min(8, os.cpu_count() or 1)
+    done = 0
+    done_bytes = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        queue = iter(files)
+
+        def submit_next():
+            item = next(queue, None)
+            if item is not None:
+                path, relpath = item
+                arcname = os.path.join(prefix, relpath) if prefix else relpath
+                pending.append((path, arcname, pool.submit(_prepare_media_file, path, arcname)))
+
+        # Keep a bounded number of files in flight, written in walk order
+        for _ in range(workers * 2):
+            submit_next()
+        while pending:
+            path, arcname, future = pending.popleft()
+            zinfo, payload = future.result()
+            if payload is None:
+                compress_type = zipfile.ZIP_STORED if is_precompressed(path) else zipfile.ZIP_DEFLATED
+                zipf.write(path, arcname, compress_type=compress_type)
+            else:
+                zipf.write_compressed(zinfo, payload)
+            submit_next()
+
+            done += 1
+            done_bytes += zinfo.file_size
+            if progress:
+                progress(done, done_bytes)
+    return done, done_bytes
+
+
+class BackupProgress:
+    """Progress callback that records files done and throughput on a Backup, at most once per interval"""
+
+    def __init__(self, backup, total_files, interval=1.0):
+        self.backup = backup
+        self.interval = interval
+        self.started = time.monotonic()
+        self.last_saved = 0
+        backup.files_total = total_files
+        type(backup).objects.filter(pk=backup.pk).update(files_total=total_files, files_done=0, bytes_processed=0)
+
+    def __call__(self, files_done, bytes_done, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_saved < self.interval:
+            return
+        self.last_saved = now
+        self.backup.files_done = files_done
+        self.backup.bytes_processed = bytes_done
+        self.backup.duration = now - self.started
+        type(self.backup).objects.filter(pk=self.backup.pk).update(
+            files_done=files_done, bytes_processed=bytes_done, duration=self.backup.duration
+        )
@@ -2,15 +2,24 @@ import os
 import json
 import zipfile
 import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import ProtectedError
+from django.utils import timezone
 from pathlib import Path
 import subprocess
 
+from core import backup_engine, restore_engine
+
 # Backup directory configuration
 BACKUP_DIR = getattr(settings, 'BACKUP_DIR', os.path.join(settings.BASE_DIR, 'backups'))
 MAX_BACKUPS = getattr(settings, 'MAX_BACKUPS', 10)
+# Reader/compressor threads used when archiving media
+BACKUP_WORKERS = getattr(settings, 'BACKUP_WORKERS', None)
+# Differentials applied on top of one base before a new base is taken
+MAX_CHAIN_LENGTH = getattr(settings, 'MAX_BACKUP_CHAIN_LENGTH', 7)
 
 # Ensure backup directory exists
 os.makedirs(BACKUP_DIR, exist_ok=True)
@@ -34,12 +43,12 @@ def get_backup_dir():
 
 
 def create_database_backup(user=None, notes=''):
-    """Create a database backup using dumpdata"""
+    """Create a database backup, streamed model by model into a ZIP archive"""
     from core.models import Backup
     
     current_backup_dir = get_backup_dir()
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'db_backup_{timestamp}.json'
+    filename = f'db_backup_{timestamp}.zip'
     filepath = os.path.join(current_backup_dir, filename)
     
     # Create backup record
@@ -53,12 +62,9 @@ def create_database_backup(user=None, notes=''):
     )
     
     try:
-        # Dump database to JSON
-        with open(filepath, 'w', encoding='utf-8') as f:
-            call_command('dumpdata', 
-                        exclude=['contenttypes', 'auth.permission', 'sessions.session'],
-                        indent=2,
-                        stdout=f)
+        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            database = backup_engine.write_database(zipf)
+            backup_engine.write_manifest(zipf, backup_engine.build_manifest('database', database))
         
         # Update backup record
         backup.file_size = os.path.getsize(filepath)
@@ -71,9 +77,21 @@ def create_database_backup(user=None, notes=''):
         backup.status = 'failed'
         backup.notes = f"{backup.notes}\nError: {str(e)}"
         backup.save()
+        if os.path.exists(filepath):
+            os.remove(filepath)
         raise
 
 
+def _archive_media(backup, zipf, prefix=''):
+    """Archive MEDIA_ROOT into ``zipf``, recording progress and throughput on the backup"""
+    files = backup_engine.media_files(settings.MEDIA_ROOT)
+    progress = backup_engine.BackupProgress(backup, len(files))
+    done, done_bytes = backup_engine.write_media(
+        zipf, settings.MEDIA_ROOT, prefix=prefix, workers=BACKUP_WORKERS, progress=progress, files=files
+    )
+    progress(done, done_bytes, force=True)
+
+
 def create_media_backup(user=None, notes=''):
     """Create a ZIP archive of media files"""
     from core.models import Backup
@@ -94,16 +112,9 @@ def create_media_backup(user=None, notes=''):
     )
     
     try:
-        media_root = settings.MEDIA_ROOT
-        
-        # Create ZIP archive
-        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            if os.path.exists(media_root):
-                for root, dirs, files in os.walk(media_root):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, media_root)
-                        zipf.write(file_path, arcname)
+        # Photos and PDFs are stored as-is, everything else is deflated
+        with backup_engine.MediaZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            _archive_media(backup, zipf)
         
         # Update backup record
         backup.file_size = os.path.getsize(filepath)
@@ -139,34 +150,14 @@ def create_full_backup(user=None, notes=''):
     )
     
     try:
-        # Create temporary directory for backup components
-        temp_dir = os.path.join(current_backup_dir, f'temp_{timestamp}')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Create database dump
-        db_file = os.path.join(temp_dir, 'database.json')
-        with open(db_file, 'w', encoding='utf-8') as f:
-            call_command('dumpdata',
-                        exclude=['contenttypes', 'auth.permission', 'sessions.session'],
-                        indent=2,
-                        stdout=f)
-        
-        # Create ZIP with database and media
-        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add database dump
-            zipf.write(db_file, 'database.json')
+        # Database rows are streamed straight into the archive, no temp copy
+        with backup_engine.MediaZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            database = backup_engine.write_database(zipf)
             
             # Add media files
-            media_root = settings.MEDIA_ROOT
-            if os.path.exists(media_root):
-                for root, dirs, files in os.walk(media_root):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.join('media', os.path.relpath(file_path, media_root))
-                        zipf.write(file_path, arcname)
-        
-        # Cleanup temp directory
-        shutil.rmtree(temp_dir)
+            _archive_media(backup, zipf, prefix='media')
+            
+            backup_engine.write_manifest(zipf, backup_engine.build_manifest('full', database))
         
         # Update backup record
         backup.file_size = os.path.getsize(filepath)
@@ -181,18 +172,129 @@ def create_full_backup(user=None, notes=''):
         backup.save()
         
         # Cleanup
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        
+        raise
+
+
+def get_blob_dir(backup_dir):
+    """Content-addressed media store shared by the differential backups in a directory"""
+    return os.path.join(backup_dir, backup_engine.BLOB_DIR_NAME)
+
+
+def _differential_parent():
+    """Latest differential to build on, or None when a new base backup is due"""
+    from core.models import Backup
+    
+    parent = Backup.objects.filter(backup_type='differential', status='completed').first()
+    if parent is None or not parent.snapshot_at or not os.path.exists(get_backup_file_path(parent)):
+        return None
+    if len(parent.chain()) > MAX_CHAIN_LENGTH:
+        return None
+    return parent
+
+
+def create_differential_backup(user=None, notes=''):
+    """Create a backup holding only what changed since the previous differential.
+    
+    Database rows are selected by their updated_at timestamp and media files
+    are stored once in the blob store, so unchanged photos and receipts are
+    never copied again. The first differential (and every MAX_CHAIN_LENGTH-th
+    after it) is a base holding everything.
+    """
+    from core.models import Backup
+    
+    current_backup_dir = get_backup_dir()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'diff_backup_{timestamp}.zip'
+    filepath = os.path.join(current_backup_dir, filename)
+    parent = _differential_parent()
+    
+    # Taken before reading so rows changed during the backup are picked up next time
+    snapshot_at = timezone.now()
+    
+    # Create backup record
+    backup = Backup.objects.create(
+        filename=filename,
+        absolute_path=filepath,
+        created_by=user,
+        backup_type='differential',
+        status='in_progress',
+        notes=notes,
+        parent=parent,
+        snapshot_at=snapshot_at,
+    )
+    
+    try:
+        previous_media = parent.manifest.get('media', {}) if parent else {}
+        media, stored = backup_engine.store_media(settings.MEDIA_ROOT, get_blob_dir(current_backup_dir), previous_media)
+        
+        with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            database = backup_engine.write_differential(zipf, since=parent.snapshot_at if parent else None)
+            manifest = backup_engine.build_manifest(
+                'differential', database,
+                parent=parent.filename if parent else None,
+                snapshot_at=snapshot_at,
+                media=media,
+                media_bytes_stored=stored,
+            )
+            backup_engine.write_manifest(zipf, manifest)
+        
+        # Update backup record
+        backup.manifest = json.loads(json.dumps(manifest, cls=DjangoJSONEncoder))
+        backup.file_size = os.path.getsize(filepath) + stored
+        backup.status = 'completed'
+        backup.save()
         
+        return backup, filepath
+    
+    except Exception as e:
+        backup.status = 'failed'
+        backup.parent = None
+        backup.notes = f"{backup.notes}\nError: {str(e)}"
+        backup.save()
+        if os.path.exists(filepath):
+            os.remove(filepath)
         raise
 
 
-def restore_database(backup_file_path):
-    """Restore database from JSON backup"""
+def _restore_archive_database(zipf, manifest, church=None):
+    """Restore the database part of a backup archive, for every church or just one"""
+    from dashboard.summaries import rebuild_summaries
+    
+    if church is None:
+        restore_engine.restore_database(zipf, manifest)
+        rebuild_summaries()
+    else:
+        restore_engine.restore_church(zipf, manifest, church.id)
+        rebuild_summaries(church.id)
+
+
+def _require_whole_restore(church):
+    if church is not None:
+        raise restore_engine.RestoreError("Single-church restore needs a backup taken with the current backup format")
+
+
+def restore_database(backup_file_path, church=None):
+    """Restore database from a backup archive (or a legacy JSON dump).
+    
+    With ``church``, only that church's data is replaced.
+    """
     if not os.path.exists(backup_file_path):
         raise FileNotFoundError(f"Backup file not found: {backup_file_path}")
     
     try:
+        if zipfile.is_zipfile(backup_file_path):
+            with zipfile.ZipFile(backup_file_path, 'r') as zipf:
+                manifest = backup_engine.read_manifest(zipf)
+                if manifest is None:
+                    raise ValueError("Archive has no backup manifest")
+                _restore_archive_database(zipf, manifest, church)
+            return True
+        
+        _require_whole_restore(church)
+        
         # Flush existing data (except users and permissions)
         call_command('flush', '--no-input', verbosity=0)
         
@@ -221,38 +323,48 @@ def restore_media(backup_file_path):
         raise Exception(f"Media restore failed: {str(e)}")
 
 
-def restore_full_backup(backup_file_path):
-    """Restore full backup (database + media)"""
+def restore_full_backup(backup_file_path, church=None):
+    """Restore full backup (database + media).
+    
+    With ``church``, only that church's data is replaced and media files,
+    which are shared by all churches, are left as they are.
+    """
     if not os.path.exists(backup_file_path):
         raise FileNotFoundError(f"Backup file not found: {backup_file_path}")
     
+    temp_dir = os.path.join(BACKUP_DIR, f'restore_temp_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
     try:
-        # Create temporary extraction directory
-        temp_dir = os.path.join(BACKUP_DIR, f'restore_temp_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Extract backup
         with zipfile.ZipFile(backup_file_path, 'r') as zipf:
-            zipf.extractall(temp_dir)
-        
-        # Restore database
-        db_file = os.path.join(temp_dir, 'database.json')
-        if os.path.exists(db_file):
-            call_command('flush', '--no-input', verbosity=0)
-            call_command('loaddata', db_file, verbosity=2)
-        
-        # Restore media files
-        media_backup_dir = os.path.join(temp_dir, 'media')
-        if os.path.exists(media_backup_dir):
-            media_root = settings.MEDIA_ROOT
-            # Clear existing media
-            if os.path.exists(media_root):
-                shutil.rmtree(media_root)
-            # Copy backup media
-            shutil.copytree(media_backup_dir, media_root)
+            manifest = backup_engine.read_manifest(zipf)
+            media_members = [name for name in zipf.namelist() if name.startswith('media/')]
+            
+            # Restore database
+            if manifest is not None:
+                _restore_archive_database(zipf, manifest, church)
+                if church is not None:
+                    media_members = []
+            elif 'database.json' in zipf.namelist():
+                _require_whole_restore(church)
+                # Legacy full backups carry a single dumpdata file
+                os.makedirs(temp_dir, exist_ok=True)
+                db_file = zipf.extract('database.json', temp_dir)
+                call_command('flush', '--no-input', verbosity=0)
+                call_command('loaddata', db_file, verbosity=2)
+            
+            # Restore media files
+            if media_members:
+                os.makedirs(temp_dir, exist_ok=True)
+                zipf.extractall(temp_dir, members=media_members)
+                media_root = settings.MEDIA_ROOT
+                # Clear existing media
+                if os.path.exists(media_root):
+                    shutil.rmtree(media_root)
+                # Copy backup media
+                shutil.copytree(os.path.join(temp_dir, 'media'), media_root)
         
         # Cleanup
-        shutil.rmtree(temp_dir)
+        if os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
         
         return True
     except Exception as e:
@@ -262,21 +374,83 @@ def restore_full_backup(backup_file_path):
         raise Exception(f"Full restore failed: {str(e)}")
 
 
+def restore_differential_backup(backup):
+    """Restore the database and media as they were when a differential backup was taken"""
+    chain = backup.chain()
+    paths = [get_backup_file_path(b) for b in chain]
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Backup file not found: {path}")
+    
+    archives = []
+    try:
+        for path in paths:
+            zipf = zipfile.ZipFile(path, 'r')
+            archives.append((zipf, backup_engine.read_manifest(zipf)))
+        
+        manifest = archives[-1][1]
+        blob_dir = get_blob_dir(os.path.dirname(paths[-1]))
+        restore_engine.restore_chain(archives)
+        
+        from dashboard.summaries import rebuild_summaries
+        rebuild_summaries()
+        backup_engine.restore_media_from_blobs(manifest.get('media', {}), blob_dir, settings.MEDIA_ROOT)
+        
+        return True
+    except Exception as e:
+        raise Exception(f"Differential restore failed: {str(e)}")
+    finally:
+        for zipf, _ in archives:
+            zipf.close()
+
+
 def cleanup_old_backups():
-    """Remove old backups exceeding MAX_BACKUPS limit"""
+    """Remove old backups exceeding MAX_BACKUPS limit, keeping every backup a retained differential needs"""
     from core.models import Backup
     
-    backups = Backup.objects.filter(status='completed').order_by('-created_at')
+    backups = list(Backup.objects.filter(status='completed').order_by('-created_at'))
     
-    if backups.count() > MAX_BACKUPS:
-        old_backups = backups[MAX_BACKUPS:]
-        for backup in old_backups:
+    if len(backups) > MAX_BACKUPS:
+        keep = set()
+        for backup in backups[:MAX_BACKUPS]:
+            keep.update(b.pk for b in backup.chain())
+        
+        # Newest first, so differentials go before the backups they build on
+        for backup in backups[MAX_BACKUPS:]:
+            if backup.pk in keep:
+                continue
+            try:
+                # Delete record
+                backup.delete()
+            except ProtectedError:
+                continue
             # Delete file
             filepath = backup.absolute_path or os.path.join(BACKUP_DIR, backup.filename)
             if os.path.exists(filepath):
                 os.remove(filepath)
-            # Delete record
-            backup.delete()
+    
+    cleanup_unused_blobs()
+
+
+def cleanup_unused_blobs():
+    """Delete media blobs that no remaining differential backup refers to"""
+    from core.models import Backup
+    
+    # A running differential may have stored blobs its record does not list yet
+    running = Backup.objects.filter(
+        backup_type='differential', status='in_progress',
+        created_at__gte=timezone.now() - timedelta(days=1)
+    )
+    if running.exists():
+        return 0
+    
+    referenced = set()
+    backup_dirs = {get_backup_dir()}
+    for backup in Backup.objects.filter(backup_type='differential', status='completed'):
+        referenced.update(entry['sha256'] for entry in backup.manifest.get('media', {}).values())
+        backup_dirs.add(os.path.dirname(get_backup_file_path(backup)))
+    
+    return sum(backup_engine.collect_garbage(get_blob_dir(d), referenced) for d in backup_dirs)
 
 
 def get_backup_file_path(backup):
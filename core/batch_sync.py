@@ -0,0 +1,133 @@
+"""
+Bulk synchronisation of a parent's child rows with a list submitted by the UI.
+
+Screens such as the harvest items table or the Sunday items list post every
+row at once. ``sync_rows`` diffs them against the rows already stored (one
+query), then applies the changes with one DELETE, one bulk_update and one
+bulk_create, instead of a get()/save() per row.
+
+Incoming rows carry an ``id`` for rows that already exist. Rows without one
+(or with an id that isn't among the existing rows) are created, and existing
+rows missing from the list are deleted. An id may appear only once.
+"""
+from django.core.exceptions import ValidationError
+
+BATCH_SIZE = 500
+
+
+class SyncResult:
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.unchanged = []
+        self.deleted = 0
+
+    @property
+    def objects(self):
+        """Every row that is now stored, new ones last"""
+        return self.updated + self.unchanged + self.created
+
+    def __len__(self):
+        return len(self.created) + len(self.updated) + len(self.unchanged)
+
+
+def clean_row(model, row, fields, defaults=None):
+    """Convert the submitted values of ``fields`` to Python values. Raises ValidationError
+
+    Missing or empty values take the value from ``defaults``, else None on
+    nullable fields, else the model field's default. The row's ``id`` is kept.
+    """
+    defaults = defaults or {}
+    values = {'id': row.get('id')}
+    errors = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = row.get(name)
+        if value in (None, ''):
+            if name in defaults:
+                value = defaults[name]
+            elif field.null:
+                values[name] = None
+                continue
+            elif field.has_default():
+                value = field.get_default()
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+def clean_rows(model, rows, fields, defaults=None):
+    """clean_row() for every row. Raises one ValidationError listing problems as 'Row n: field: message'"""
+    cleaned = []
+    errors = []
+    first_row = {}
+    for number, row in enumerate(rows, start=1):
+        pk = _pk(model, row.get('id'))
+        if pk is not None:
+            if pk in first_row:
+                errors.append(f"Row {number}: id: {pk} is already used by row {first_row[pk]}")
+            first_row.setdefault(pk, number)
+        try:
+            cleaned.append(clean_row(model, row, fields, defaults))
+        except ValidationError as e:
+            errors.extend(
+                f"Row {number}: {name}: {message}"
+                for name, messages in e.message_dict.items() for message in messages
+            )
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def sync_rows(queryset, rows, fields, build, apply, batch_size=BATCH_SIZE):
+    """Make the rows of ``queryset`` match ``rows`` (a list of dicts submitted by the client).
+
+    ``build(row)`` returns a new, unsaved instance for an incoming row, and
+    ``apply(instance, row)`` copies an incoming row onto an existing instance;
+    only instances whose ``fields`` actually changed are written. Call inside
+    a transaction. Returns a SyncResult. Raises ValidationError, before
+    writing anything, if an existing row's id is listed twice (clean_rows
+    reports this as a row error first).
+    """
+    model = queryset.model
+    existing = {obj.pk: obj for obj in queryset}
+    result = SyncResult()
+
+    seen = set()
+    for row in rows:
+        pk = _pk(model, row.get('id'))
+        instance = existing.get(pk)
+        if instance is None:
+            result.created.append(build(row))
+            continue
+        if pk in seen:
+            raise ValidationError(f"Row id {pk} is listed more than once")
+        seen.add(pk)
+        before = [getattr(instance, name) for name in fields]
+        apply(instance, row)
+        if [getattr(instance, name) for name in fields] != before:
+            result.updated.append(instance)
+        else:
+            result.unchanged.append(instance)
+
+    stale = [pk for pk in existing if pk not in seen]
+    if stale:
+        result.deleted, _ = model._base_manager.filter(pk__in=stale).delete()
+    if result.updated:
+        model._base_manager.bulk_update(result.updated, fields, batch_size=batch_size)
+    if result.created:
+        model._base_manager.bulk_create(result.created, batch_size=batch_size)
+    return result
+
+
+def _pk(model, value):
+    if value in (None, ''):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except ValidationError:
+        return None
@@ -0,0 +1,170 @@
+"""
+Database-backed background jobs.
+
+Slow operations (backups, CSV imports, payroll generation) are queued as Job
+rows and picked up by ``python manage.py run_job_worker``, so the request that
+starts them returns straight away with a job id the browser can poll at
+/api/core/jobs/<id>/.
+
+Handlers live in a ``jobs`` module in each app and are registered by name:
+
+    @register('membership.import_members')
+    def import_members(job):
+        ...
+        return {...}   # stored as job.result
+
+The job's church is made the current tenant while its handler runs, exactly
+as TenantMiddleware does for a request.
+"""
+import io
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job, set_current_church, clear_current_church
+
+logger = logging.getLogger(__name__)
+
+# Running jobs not finished after this long are assumed to belong to a dead worker
+JOB_TIMEOUT = getattr(settings, 'JOB_TIMEOUT', timedelta(hours=1))
+MAX_ATTEMPTS = getattr(settings, 'JOB_MAX_ATTEMPTS', 2)
+
+_registry = {}
+
+
+class JobError(Exception):
+    """A handler failed in an expected way; the message is shown to the user"""
+
+
+def register(kind):
+    """Register a job handler under ``kind``"""
+    def decorator(func):
+        _registry[kind] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    autodiscover_modules('jobs')
+
+
+def enqueue(kind, payload=None, user=None, church=None, upload=None):
+    """Queue a job and return it. ``upload`` is an uploaded file the handler can read from job.upload"""
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+        church=church,
+    )
+    if upload is not None:
+        job.upload.save(os.path.basename(upload.name), upload, save=False)
+    job.save()
+    return job
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_stale():
+    """Put jobs abandoned by a dead worker back on the queue, or fail them after MAX_ATTEMPTS"""
+    cutoff = timezone.now() - JOB_TIMEOUT
+    stale = Job.admin_objects.filter(status='running', started_at__lt=cutoff)
+    stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued', worker='')
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed', error='Worker stopped before the job finished', finished_at=timezone.now()
+    )
+
+
+def claim_next(worker=None):
+    """Atomically take the oldest queued job, or return None when the queue is empty"""
+    worker = worker or worker_name()
+    while True:
+        candidate = Job.admin_objects.filter(status='queued').order_by('created_at', 'pk').values_list('pk', flat=True).first()
+        if candidate is None:
+            return None
+        # The status check makes the claim safe against other workers racing for the same row
+        claimed = Job.admin_objects.filter(pk=candidate, status='queued').update(
+            status='running', worker=worker, started_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.admin_objects.select_related('church', 'created_by').get(pk=candidate)
+
+
+def run(job):
+    """Run a claimed job's handler and record the outcome"""
+    handler = _registry.get(job.kind)
+    set_current_church(job.church)
+    try:
+        if handler is None:
+            raise JobError(f"No handler registered for '{job.kind}'")
+        result = handler(job)
+        job.status = 'completed'
+        job.progress = 100
+        job.result = result
+    except Exception as e:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        clear_current_church()
+
+    job.finished_at = timezone.now()
+    if job.upload:
+        job.upload.delete(save=False)
+    job.save(update_fields=['status', 'progress', 'result', 'error', 'finished_at', 'upload'])
+    return job
+
+
+def run_pending(max_jobs=None, worker=None):
+    """Run queued jobs until the queue is empty (or ``max_jobs`` ran). Returns the number run"""
+    autodiscover()
+    requeue_stale()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_next(worker)
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def iter_upload_lines(job, every=500, message='Processing rows'):
+    """Yield the lines of the job's uploaded CSV, reporting progress by bytes read"""
+    job.upload.open('rb')
+    size = job.upload.size or 1
+    with io.TextIOWrapper(job.upload.file, encoding='utf-8-sig', newline='') as lines:
+        for number, line in enumerate(lines, start=1):
+            if number % every == 0:
+                job.set_progress(lines.buffer.tell() * 100 / size, f'{message}: {number}')
+            yield line
+
+
+# Handlers
+
+@register('core.create_backup')
+def create_backup(job):
+    from core import backup_utils
+
+    creators = {
+        'database': backup_utils.create_database_backup,
+        'media': backup_utils.create_media_backup,
+        'differential': backup_utils.create_differential_backup,
+        'full': backup_utils.create_full_backup,
+    }
+    backup_type = job.payload.get('backup_type', 'full')
+    if backup_type not in creators:
+        raise JobError(f"Unknown backup type '{backup_type}'")
+
+    job.set_progress(0, f'Creating {backup_type} backup')
+    backup, filepath = creators[backup_type](user=job.created_by, notes=job.payload.get('notes', ''))
+    backup_utils.cleanup_old_backups()
+    return {'backup_id': backup.id, 'filename': backup.filename, 'file_size': backup.file_size}
+
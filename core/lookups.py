@@ -0,0 +1,118 @@
+"""
+Per-church read-through cache of small reference tables.
+
+Categories, sections, positions and bank accounts are read over and over by
+imports and by the views that create finance records on the side, yet they
+rarely change. The rows of one church are loaded with one query on first use
+and kept in Django's cache (the local-memory backend unless CACHES says
+otherwise). Saving or deleting a row of a registered model drops its
+church's entry (see ``register``, called from the apps' ``ready()``); writes
+that skip the signals (bulk_create, queryset.update) call ``clear_lookups``
+themselves.
+
+With the local-memory backend every process keeps its own copy and sees a
+change made by another process once the entry expires; a shared backend
+makes the invalidation immediate everywhere. Callers looking up particular
+rows pass their keys (``pks``/``names``) and the rows are read again from the
+database when one is missing, so a row just added elsewhere is still found;
+code that needs every row (e.g. to seed budget lines) passes ``fresh=True``.
+
+Cached rows are meant for lookups (ids, names, flags): figures kept current
+with F() updates, such as ``BankAccount.current_balance``, go stale in them.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import get_current_church
+
+TIMEOUT = 60 * 5
+
+_registered = set()
+
+
+def normalize_name(name):
+    """Names match regardless of case and spacing"""
+    return ' '.join(str(name).split()).casefold()
+
+
+def _cache_key(model, church_id):
+    return f'lookups:{model._meta.label_lower}:{church_id}'
+
+
+def _church_id(church_id):
+    # Default to the church of the current request or job
+    if church_id is None:
+        church = get_current_church()
+        return church.pk if church else None
+    return church_id
+
+
+def clear_lookups(model, church_id):
+    key = _cache_key(model, church_id)
+    cache.delete(key)
+    # Again once the write commits, in case the old rows were read back in the meantime
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _row_changed(sender, instance, **kwargs):
+    clear_lookups(sender, instance.church_id)
+
+
+def register(model):
+    """Serve ``model`` (a TenantModel) from the lookup cache, invalidated by its save and delete signals"""
+    _registered.add(model)
+    label = model._meta.label_lower
+    post_save.connect(_row_changed, sender=model, dispatch_uid=f'lookups_save_{label}')
+    post_delete.connect(_row_changed, sender=model, dispatch_uid=f'lookups_delete_{label}')
+
+
+def lookup_rows(model, church_id=None, fresh=False):
+    """Every row of the church (default: the current church) in the model's default order.
+
+    ``fresh`` reads the rows from the database and replaces the cached copy.
+    """
+    if model not in _registered:
+        raise LookupError(f'{model._meta.label} is not a registered lookup table')
+    church_id = _church_id(church_id)
+    key = _cache_key(model, church_id)
+    rows = None if fresh else cache.get(key)
+    if rows is None:
+        rows = list(model._base_manager.filter(church_id=church_id))
+        cache.set(key, rows, TIMEOUT)
+    return rows
+
+
+def lookup_by_pk(model, church_id=None, pks=()):
+    """{pk: row}, read again from the database if any of ``pks`` is missing from the cached rows"""
+    rows = {row.pk: row for row in lookup_rows(model, church_id)}
+    if not rows.keys() >= set(pks):
+        rows = {row.pk: row for row in lookup_rows(model, church_id, fresh=True)}
+    return rows
+
+
+def _by_name(rows, field):
+    by_name = {}
+    for row in rows:
+        by_name.setdefault(normalize_name(getattr(row, field)), row)
+    return by_name
+
+
+def lookup_by_name(model, church_id=None, field='name', names=()):
+    """{normalized name: row}; the first row in the default order wins.
+
+    Read again from the database if any of ``names`` is missing from the cached rows.
+    """
+    rows = _by_name(lookup_rows(model, church_id), field)
+    if not rows.keys() >= {normalize_name(name) for name in names}:
+        rows = _by_name(lookup_rows(model, church_id, fresh=True), field)
+    return rows
+
+
+def lookup_or_create(model, name, church_id=None, field='name', defaults=None):
+    """The church's row named ``name``, created with ``defaults`` when it has none"""
+    church_id = _church_id(church_id)
+    row = lookup_by_name(model, church_id, field).get(normalize_name(name))
+    if row is None:
+        row, _ = model._base_manager.get_or_create(church_id=church_id, **{field: name}, defaults=defaults or {})
+    return row
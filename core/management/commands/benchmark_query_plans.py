@@ -0,0 +1,252 @@
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from committees.models import Committee, CommitteeMembership
+from core.models import Church
+from finance.models import BankAccount, Expense, ExpenseCategory, Income, IncomeCategory, Remittance, RemittanceSettings
+from groups.models import Group, GroupMembership
+from membership.models import Member
+from planner.models import Event
+from special_events.models import Donation, SpecialDay
+
+ALIAS = 'query_plan_benchmark'
+CHUNK = 20000
+TODAY = datetime.date(2026, 6, 15)
+FIRST_DAY = datetime.date(2021, 1, 1)
+
+# Models whose Meta.indexes serve the hot query shapes below
+INDEXED_MODELS = [
+    Income, Expense, Remittance, Event, SpecialDay, Donation, Member, GroupMembership, CommitteeMembership,
+]
+
+
+def _total(queryset, key, **aggregates):
+    """A lazy aggregate: the filtered rows grouped on a key they all share"""
+    return queryset.order_by().values(key).annotate(**aggregates)
+
+
+def _hot_queries(db, ids):
+    """(label, queryset) of the query shapes behind the list views, dashboard and reports.
+
+    Every tenant query is scoped to one church, as TenantManager scopes them.
+    """
+    church = ids['church']
+    month = (TODAY.replace(day=1), TODAY)
+    return [
+        ('Income list page (IncomeViewSet)',
+         Income.objects.using(db).filter(church=church).order_by('-transaction_date')[:20]),
+        ('Income of a month (dashboard rollup)',
+         _total(Income.objects.using(db).filter(church=church, transaction_date__range=month), 'church',
+                total=Sum('amount'), count=Count('id'))),
+        ('Expenses of a year by category and month (budget performance)',
+         Expense.objects.using(db).filter(church=church, transaction_date__year=TODAY.year)
+         .annotate(month=TruncMonth('transaction_date')).values('category_id', 'month')
+         .annotate(total=Sum('amount')).order_by()),
+        ('Account income since a snapshot (bank balance as of a date)',
+         _total(Income.objects.using(db).filter(
+             bank_account=ids['account'], transaction_date__gt=TODAY.replace(day=1) - datetime.timedelta(days=1),
+             transaction_date__lte=TODAY,
+         ), 'bank_account', total=Sum('amount'))),
+        ('Unpaid remittances (remittance summary)',
+         _total(Remittance.objects.using(db).filter(church=church, paid=False), 'church', total=Sum('amount'))),
+        ('Upcoming events (dashboard)',
+         Event.objects.using(db).filter(church=church, start_date__gte=TODAY, status__in=['planned', 'confirmed'])
+         .order_by('start_date')[:5]),
+        ('Upcoming special days (dashboard)',
+         SpecialDay.objects.using(db).filter(church=church, date__gte=TODAY, is_active=True).order_by('date')[:5]),
+        ('Donations of a month',
+         _total(Donation.objects.using(db).filter(church=church, date__range=month), 'church', total=Sum('amount'))),
+        ('New members of a month (dashboard rollup)',
+         _total(Member.objects.using(db).filter(church=church, date_joined__range=month), 'church', count=Count('id'))),
+        ('Active members of a group (group list counts)',
+         _total(GroupMembership.objects.using(db).filter(group=ids['group'], is_active=True), 'group', count=Count('id'))),
+        ('Active members of a committee (committee list counts)',
+         _total(CommitteeMembership.objects.using(db).filter(committee=ids['committee'], is_active=True), 'committee',
+                count=Count('id'))),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Seeds a scratch database and compares the query plans of the hot query shapes without and with their indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=1000000, help='Incomes and expenses to seed')
+        parser.add_argument('--churches', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per query (best time is reported)')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch SQLite database')
+
+    def handle(self, *args, **options):
+        work_dir = tempfile.mkdtemp(prefix='query_plan_benchmark_')
+        connections.settings[ALIAS] = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(work_dir, 'benchmark.sqlite3'),
+        }
+        try:
+            self.stdout.write(f'Migrating a scratch database in {work_dir}...')
+            call_command('migrate', database=ALIAS, verbosity=0)
+            started = time.perf_counter()
+            ids = self._seed(options['transactions'], options['churches'])
+            self.stdout.write(f'  seeded in {time.perf_counter() - started:.0f}s')
+
+            queries = _hot_queries(ALIAS, ids)
+            self._set_indexes(False)
+            before = [self._measure(queryset, options['repeat']) for _, queryset in queries]
+            self._set_indexes(True)
+            after = [self._measure(queryset, options['repeat']) for _, queryset in queries]
+
+            for (label, _), (before_ms, before_plan), (after_ms, after_plan) in zip(queries, before, after):
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}: {before_ms:.2f} ms -> {after_ms:.2f} ms'))
+                self.stdout.write('  without the indexes:')
+                self.stdout.write(self._indent(before_plan))
+                self.stdout.write('  with the indexes:')
+                self.stdout.write(self._indent(after_plan))
+        finally:
+            connections[ALIAS].close()
+            del connections.settings[ALIAS]
+            if options['keep']:
+                self.stdout.write(f'Kept {work_dir}')
+            else:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _indent(self, plan):
+        return '\n'.join(f'    {line}' for line in plan.splitlines())
+
+    def _set_indexes(self, present):
+        with connections[ALIAS].schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    if present:
+                        editor.add_index(model, index)
+                    else:
+                        editor.remove_index(model, index)
+        with connections[ALIAS].cursor() as cursor:
+            # Fresh planner statistics for the current set of indexes
+            cursor.execute('ANALYZE')
+
+    def _measure(self, queryset, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, queryset.explain()
+
+    def _bulk(self, model, rows):
+        model._base_manager.using(ALIAS).bulk_create(rows, batch_size=500)
+
+    def _seed(self, transactions, church_count):
+        """Churches with accounts, transactions over five years, remittances and the smaller tables"""
+        rng = random.Random(42)
+        days = (TODAY - FIRST_DAY).days + 365
+        churches = []
+        for n in range(church_count):
+            church = Church(name=f'Benchmark church {n}', slug=f'benchmark-{n}')
+            church.save(using=ALIAS)
+            churches.append(church)
+
+        accounts, income_categories, expense_categories, settings = {}, {}, {}, {}
+        for church in churches:
+            accounts[church.pk] = [
+                BankAccount(church=church, account_name=f'Account {n}', bank_name='Bank', account_number=str(n),
+                            account_type='savings')
+                for n in range(3)
+            ]
+            self._bulk(BankAccount, accounts[church.pk])
+            income_categories[church.pk] = [IncomeCategory(church=church, name=f'Income {n}') for n in range(8)]
+            self._bulk(IncomeCategory, income_categories[church.pk])
+            expense_categories[church.pk] = [ExpenseCategory(church=church, name=f'Expense {n}') for n in range(15)]
+            self._bulk(ExpenseCategory, expense_categories[church.pk])
+            settings[church.pk] = RemittanceSettings(church=church, remittance_type='synod', percentage=Decimal('10'))
+            self._bulk(RemittanceSettings, [settings[church.pk]])
+
+        self.stdout.write(f'Seeding {transactions} transactions...')
+        for start in range(0, transactions, CHUNK):
+            incomes, expenses = [], []
+            for _ in range(min(CHUNK, transactions - start)):
+                church = rng.choice(churches)
+                values = dict(
+                    church=church,
+                    bank_account=rng.choice(accounts[church.pk]),
+                    amount=Decimal(rng.randint(100, 500000)) / 100,
+                    transaction_date=FIRST_DAY + datetime.timedelta(days=rng.randrange(days)),
+                    payment_method='cash',
+                )
+                if rng.random() < 0.7:
+                    incomes.append(Income(category=rng.choice(income_categories[church.pk]), **values))
+                else:
+                    expenses.append(Expense(category=rng.choice(expense_categories[church.pk]), payee_name='Payee',
+                                            description='Benchmark', **values))
+            self._bulk(Income, incomes)
+            self._bulk(Expense, expenses)
+            # A synod remittance for every income; only the recent ones are still unpaid
+            self._bulk(Remittance, [
+                Remittance(church_id=income.church_id, income=income, remittance_setting=settings[income.church_id],
+                           amount=income.amount / 10, percentage_used=Decimal('10'),
+                           paid=income.transaction_date < TODAY - datetime.timedelta(days=90))
+                for income in incomes
+            ])
+            if (start + CHUNK) % 200000 == 0:
+                self.stdout.write(f'  {start + CHUNK}')
+
+        small = max(transactions // 50, 100)
+        members, groups, committees = {}, {}, {}
+        for church in churches:
+            self._bulk(Event, [
+                Event(church=church, title='Event', start_date=FIRST_DAY + datetime.timedelta(days=rng.randrange(days)),
+                      status=rng.choice(['planned', 'confirmed', 'completed', 'cancelled']))
+                for _ in range(small // church_count)
+            ])
+            special_days = [
+                SpecialDay(church=church, name='Special day', event_type='special', is_active=rng.random() < 0.2,
+                           date=FIRST_DAY + datetime.timedelta(days=rng.randrange(days)))
+                for _ in range(max(small // church_count // 20, 1))
+            ]
+            self._bulk(SpecialDay, special_days)
+            self._bulk(Donation, [
+                Donation(church=church, event=rng.choice(special_days), amount=Decimal(rng.randint(1, 1000)),
+                         date=FIRST_DAY + datetime.timedelta(days=rng.randrange(days)))
+                for _ in range(small // church_count)
+            ])
+            members[church.pk] = [
+                Member(church=church, membership_number=f'B{n}', first_name='Member', last_name=str(n), gender='F',
+                       date_of_birth=datetime.date(1980, 1, 1), address='-', membership_status='communicant',
+                       date_joined=FIRST_DAY + datetime.timedelta(days=rng.randrange(days)))
+                for n in range(small // church_count)
+            ]
+            self._bulk(Member, members[church.pk])
+            groups[church.pk] = [Group(church=church, name=f'Group {n}') for n in range(20)]
+            self._bulk(Group, groups[church.pk])
+            committees[church.pk] = [Committee(church=church, name=f'Committee {n}') for n in range(20)]
+            self._bulk(Committee, committees[church.pk])
+            # Members drift between groups over the years, so most memberships are inactive
+            for membership_model, parents, field in (
+                (GroupMembership, groups[church.pk], 'group'),
+                (CommitteeMembership, committees[church.pk], 'committee'),
+            ):
+                self._bulk(membership_model, [
+                    membership_model(church=church, member=member, joined_date=member.date_joined,
+                                     is_active=rng.random() < 0.1, **{field: parent})
+                    for member in members[church.pk]
+                    for parent in rng.sample(parents, 3)
+                ])
+
+        church = churches[0]
+        return {
+            'church': church.pk,
+            'account': accounts[church.pk][0].pk,
+            'group': groups[church.pk][0].pk,
+            'committee': committees[church.pk][0].pk,
+        }
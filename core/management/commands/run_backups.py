@@ -29,6 +29,8 @@ class Command(BaseCommand):
                 backup, filepath = backup_utils.create_database_backup(notes=notes)
             elif config.backup_type == 'media':
                 backup, filepath = backup_utils.create_media_backup(notes=notes)
+            elif config.backup_type == 'differential':
+                backup, filepath = backup_utils.create_differential_backup(notes=notes)
             else:
                 backup, filepath = backup_utils.create_full_backup(notes=notes)
             
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (backups, imports, payroll generation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the jobs currently queued and exit (for cron on shared hosting)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after running this many jobs')
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        remaining = options['max_jobs']
+        self.stdout.write(f'Job worker {worker} started')
+
+        try:
+            while True:
+                close_old_connections()
+                count = jobs.run_pending(max_jobs=remaining, worker=worker)
+                if count:
+                    self.stdout.write(self.style.SUCCESS(f'Ran {count} job(s)'))
+                if remaining is not None:
+                    remaining -= count
+                    if remaining <= 0:
+                        break
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Job worker stopped')
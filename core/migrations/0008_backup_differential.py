@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_numbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backup',
+            name='manifest',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Backup this differential builds on', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='core.backup'),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='snapshot_at',
+            field=models.DateTimeField(blank=True, help_text='Rows changed after this time belong to the next differential', null=True),
+        ),
+        migrations.AlterField(
+            model_name='backup',
+            name='backup_type',
+            field=models.CharField(choices=[('database', 'Database Only'), ('media', 'Media Files Only'), ('full', 'Full Backup (Database + Media)'), ('differential', 'Differential (Changes Since Last Backup)')], default='full', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='backupconfiguration',
+            name='backup_type',
+            field=models.CharField(choices=[('database', 'Database Only'), ('media', 'Media Files Only'), ('full', 'Full Backup (Database + Media)'), ('differential', 'Differential (Changes Since Last Backup)')], default='full', max_length=20),
+        ),
+    ]
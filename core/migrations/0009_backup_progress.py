@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_backup_differential'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backup',
+            name='bytes_processed',
+            field=models.BigIntegerField(default=0, help_text='Media bytes read so far'),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='duration',
+            field=models.FloatField(default=0, help_text='Seconds spent archiving media'),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='files_done',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='files_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -60,6 +60,68 @@ class TenantModel(models.Model):
         abstract = True
 
 
+class NumberSequence(models.Model):
+    """Per-church counter for human-readable numbers (membership numbers, asset codes, receipts...)
+
+    Use the helpers in core.sequences rather than touching rows directly.
+    """
+    church = models.ForeignKey(Church, on_delete=models.CASCADE, null=True, blank=True, related_name='number_sequences')
+    prefix = models.CharField(max_length=20)
+    last_value = models.PositiveBigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['church', 'prefix']
+    
+    def __str__(self):
+        return f"{self.prefix} #{self.last_value} ({self.church})"
+
+
+class Job(TenantModel):
+    """A unit of background work run by the run_job_worker command (see core.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict, blank=True)
+    upload = models.FileField(upload_to='job_uploads/', blank=True, null=True, help_text="File the job works on, removed when it finishes")
+    
+    progress = models.PositiveSmallIntegerField(default=0, help_text="Percent complete")
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    def set_progress(self, percent, message=''):
+        """Record progress without touching the rest of the row"""
+        self.progress = max(0, min(100, int(percent)))
+        self.progress_message = message[:255]
+        Job.admin_objects.filter(pk=self.pk).update(progress=self.progress, progress_message=self.progress_message)
+
+
 class UserProfile(models.Model):
     """Link Django users to a specific church"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -75,6 +137,7 @@ class Backup(models.Model):
         ('database', 'Database Only'),
         ('media', 'Media Files Only'),
         ('full', 'Full Backup (Database + Media)'),
+        ('differential', 'Differential (Changes Since Last Backup)'),
     ]
     
     STATUS_CHOICES = [
@@ -92,6 +155,18 @@ class Backup(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     notes = models.TextField(blank=True)
     
+    # Differential backups
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='children',
+                               help_text="Backup this differential builds on")
+    snapshot_at = models.DateTimeField(null=True, blank=True, help_text="Rows changed after this time belong to the next differential")
+    manifest = models.JSONField(default=dict, blank=True)
+    
+    # Media archiving progress
+    files_total = models.PositiveIntegerField(default=0)
+    files_done = models.PositiveIntegerField(default=0)
+    bytes_processed = models.BigIntegerField(default=0, help_text="Media bytes read so far")
+    duration = models.FloatField(default=0, help_text="Seconds spent archiving media")
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Backup'
@@ -104,6 +179,26 @@ class Backup(models.Model):
     def file_size_mb(self):
         """Return file size in MB"""
         return round(self.file_size / (1024 * 1024), 2)
+    
+    @property
+    def progress_percent(self):
+        if not self.files_total:
+            return 100 if self.status == 'completed' else 0
+        return int(self.files_done * 100 / self.files_total)
+    
+    @property
+    def throughput_mb(self):
+        """Media archiving throughput in MB/s"""
+        if not self.duration:
+            return 0
+        return round(self.bytes_processed / (1024 * 1024) / self.duration, 2)
+    
+    def chain(self):
+        """Backups needed to restore this one, from the base backup to this one"""
+        chain = [self]
+        while chain[-1].parent_id:
+            chain.append(chain[-1].parent)
+        return list(reversed(chain))
 
 
 class BackupConfiguration(models.Model):
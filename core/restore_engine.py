@@ -0,0 +1,335 @@
+"""
+Restore of backups written by core.backup_engine.
+
+Rows are inserted with multi-row INSERTs in dependency order, inside one
+transaction with constraint checks deferred to the end, instead of being
+saved one object at a time. Stored values are written as-is (raw inserts),
+so auto_now timestamps keep their backed-up values.
+
+A restore either replaces the whole database or a single church: in the
+latter case only that church's rows are deleted and reloaded, and every
+other tenant is left untouched. Archive checksums are verified before
+anything is changed.
+"""
+from itertools import islice
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from core import backup_engine
+
+BATCH_SIZE = 1000
+
+
+class RestoreError(Exception):
+    """The backup cannot be restored as requested"""
+
+
+# Catalogue
+
+def _flush_keeping_catalogue():
+    """Empty the database, returning the backup catalogue rows to put back afterwards"""
+    from django.core.management import call_command
+
+    catalogue = apps.get_model(backup_engine.CATALOGUE_MODEL)
+    rows = serializers.serialize('python', catalogue._base_manager.order_by('pk'))
+    call_command('flush', '--no-input', verbosity=0)
+    return rows
+
+
+def _reinstate_catalogue(rows):
+    catalogue = apps.get_model(backup_engine.CATALOGUE_MODEL)
+    user_model = catalogue._meta.get_field('created_by').related_model
+    users = set(user_model._base_manager.values_list('pk', flat=True))
+    for obj in serializers.deserialize('python', rows):
+        if obj.object.created_by_id not in users:
+            obj.object.created_by_id = None
+        obj.save()
+
+
+# Bulk loading
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _insert(model, objects):
+    """Raw multi-row INSERT, respecting the backend's query parameter limit"""
+    fields = model._meta.local_concrete_fields
+    batch_size = max(1, connection.ops.bulk_batch_size(fields, objects))
+    for batch in _batched(objects, batch_size):
+        model._base_manager._insert(batch, fields=fields, raw=True, using=connection.alias)
+
+
+def _m2m_links(model, objects, m2m_data):
+    """Through-table rows for the many-to-many values of freshly loaded objects"""
+    links = {}
+    for field in model._meta.local_many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            continue
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        for instance, data in zip(objects, m2m_data):
+            for value in data.get(field.name, []):
+                links.setdefault(through, []).append(through(**{source: instance.pk, target: value}))
+    return links
+
+
+def load_rows(model, rows, batch_size=BATCH_SIZE, replace=False, load_m2m=True, references=None):
+    """Bulk insert serialized rows of one model and return the primary keys loaded.
+
+    ``replace`` deletes existing rows with the same keys first (used to apply
+    differential rows on top of a base). ``references`` resolves foreign keys
+    to rows outside the restored data.
+    """
+    loaded = set()
+    for batch in _batched(rows, batch_size):
+        objects = []
+        m2m_data = []
+        for obj in serializers.deserialize('python', batch):
+            objects.append(obj.object)
+            m2m_data.append(obj.m2m_data or {})
+        if references is not None:
+            objects, m2m_data = references.resolve(model, objects, m2m_data)
+        if not objects:
+            continue
+
+        if replace:
+            model._base_manager.filter(pk__in=[o.pk for o in objects])._raw_delete(connection.alias)
+        _insert(model, objects)
+        if load_m2m:
+            for through, links in _m2m_links(model, objects, m2m_data).items():
+                through._base_manager.bulk_create(links, batch_size=batch_size)
+        loaded.update(o.pk for o in objects)
+    return loaded
+
+
+def reset_sequences(models):
+    """Move primary key sequences past the restored rows (a no-op on SQLite)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+# Tenant scope
+
+class TenantScope:
+    """Decides which rows of each model belong to one church.
+
+    A model is in scope when it is the Church model, has a ``church`` foreign
+    key, or (for tables such as many-to-many links) references a model that
+    is in scope. Everything else (users, groups, configuration) is global and
+    left alone by a single-church restore.
+    """
+
+    def __init__(self, church_id, models):
+        from core.models import Church
+
+        self.church_model = Church
+        self.church_id = church_id
+        self.loaded = {}
+        self.rules = {}
+        for model in models:
+            self._rule(model)
+
+    def _rule(self, model):
+        if model in self.rules:
+            return self.rules[model]
+        self.rules[model] = None  # guards self-references while resolving
+
+        if model is self.church_model:
+            rule = ('self', None)
+        else:
+            foreign_keys = [f for f in model._meta.concrete_fields if f.many_to_one]
+            church_fields = [f for f in foreign_keys if f.name == 'church' and f.related_model is self.church_model]
+            if church_fields:
+                rule = ('church', church_fields[0])
+            else:
+                parents = [f for f in foreign_keys if f.related_model is not model and self._rule(f.related_model)]
+                rule = ('parent', parents) if parents else None
+        self.rules[model] = rule
+        return rule
+
+    def contains(self, model):
+        return self._rule(model) is not None
+
+    def keep(self, model):
+        """Predicate selecting the serialized rows that belong to the church"""
+        kind, detail = self._rule(model)
+        church_id = self.church_id
+        if kind == 'self':
+            return lambda row: row['pk'] == church_id
+        if kind == 'church':
+            return lambda row: row['fields'].get(detail.name) == church_id
+        parents = [(f.name, self.loaded.get(f.related_model, set())) for f in detail]
+        return lambda row: any(row['fields'].get(name) in keys for name, keys in parents)
+
+    def queryset(self, model):
+        """Current rows that belong to the church"""
+        kind, detail = self._rule(model)
+        manager = model._base_manager
+        if kind == 'self':
+            return manager.filter(pk=self.church_id)
+        if kind == 'church':
+            return manager.filter(**{detail.attname: self.church_id})
+        qs = manager.none()
+        for field in detail:
+            qs = qs | manager.filter(**{f'{field.name}__in': self.queryset(field.related_model).values('pk')})
+        return qs
+
+
+class GlobalReferences:
+    """Reconciles tenant rows with global rows (users) that may have changed since the backup.
+
+    References to rows that no longer exist are cleared when the foreign key
+    is nullable; rows that cannot do without them are skipped and counted.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.existing = {}
+        self.skipped = {}
+
+    def _exists(self, model, values):
+        known = self.existing.setdefault(model, {})
+        unknown = [v for v in values if v not in known]
+        for batch in _batched(unknown, 500):
+            found = set(model._base_manager.filter(pk__in=batch).values_list('pk', flat=True))
+            known.update((v, v in found) for v in batch)
+        return known
+
+    def resolve(self, model, objects, m2m_data):
+        fields = [
+            f for f in model._meta.concrete_fields
+            if f.many_to_one and not self.scope.contains(f.related_model)
+        ]
+        if not fields:
+            return objects, m2m_data
+
+        kept_objects, kept_m2m = [], []
+        for field in fields:
+            self._exists(field.related_model, {getattr(o, field.attname) for o in objects} - {None})
+        for instance, data in zip(objects, m2m_data):
+            keep = True
+            for field in fields:
+                value = getattr(instance, field.attname)
+                if value is None or self.existing[field.related_model][value]:
+                    continue
+                if field.null:
+                    setattr(instance, field.attname, None)
+                else:
+                    keep = False
+            if keep:
+                kept_objects.append(instance)
+                kept_m2m.append(data)
+            else:
+                label = model._meta.label_lower
+                self.skipped[label] = self.skipped.get(label, 0) + 1
+        return kept_objects, kept_m2m
+
+
+# Restores
+
+def _models(manifest):
+    return [apps.get_model(entry['model']) for entry in manifest['database']]
+
+
+def restore_database(zipf, manifest, batch_size=BATCH_SIZE):
+    """Replace the whole database with the rows stored in a backup. Returns rows loaded per model"""
+    backup_engine.verify_archive(zipf, manifest)
+    models = _models(manifest)
+    counts = {}
+
+    with transaction.atomic():
+        catalogue = _flush_keeping_catalogue()
+        with connection.constraint_checks_disabled():
+            for model, entry in zip(models, manifest['database']):
+                rows = backup_engine.iter_member_rows(zipf, entry['member'])
+                counts[entry['model']] = len(load_rows(model, rows, batch_size))
+            _reinstate_catalogue(catalogue)
+        connection.check_constraints()
+        reset_sequences(models)
+    return counts
+
+
+def restore_church(zipf, manifest, church_id, batch_size=BATCH_SIZE):
+    """Replace one church's data with its rows from a backup, leaving other churches untouched.
+
+    Returns (rows loaded per model, rows skipped per model).
+    """
+    backup_engine.verify_archive(zipf, manifest)
+    models = _models(manifest)
+    candidates = models + backup_engine.through_models(models)
+    scope = TenantScope(church_id, candidates)
+    scoped = [model for model in candidates if scope.contains(model)]
+    references = GlobalReferences(scope)
+    counts = {}
+
+    with transaction.atomic():
+        with connection.constraint_checks_disabled():
+            # Link tables first, while the rows they are scoped through still exist
+            for model in reversed(scoped):
+                scope.queryset(model)._raw_delete(connection.alias)
+
+            for model, entry in zip(models, manifest['database']):
+                if not scope.contains(model):
+                    continue
+                rows = filter(scope.keep(model), backup_engine.iter_member_rows(zipf, entry['member']))
+                scope.loaded[model] = load_rows(model, rows, batch_size, references=references)
+                counts[entry['model']] = len(scope.loaded[model])
+
+            if not scope.loaded.get(scope.church_model):
+                raise RestoreError("This church is not in the backup")
+        connection.check_constraints(table_names=[model._meta.db_table for model in scoped])
+        reset_sequences(scoped)
+    return counts, references.skipped
+
+
+def restore_chain(archives, batch_size=BATCH_SIZE):
+    """Replace the database contents with the state captured by a chain of differential backups.
+
+    ``archives`` is a list of (zipfile, manifest) pairs from the base backup to
+    the backup being restored. Each model is loaded from the last backup that
+    holds a full copy of it, changed rows from the later backups are applied on
+    top, and rows missing from the final key list are removed.
+    """
+    for zipf, manifest in archives:
+        backup_engine.verify_archive(zipf, manifest)
+
+    # model -> [(zipfile, entry)] to apply, starting at the latest full copy
+    plan = {}
+    for zipf, manifest in archives:
+        for entry in manifest['database']:
+            if entry['mode'] == 'full':
+                plan[entry['model']] = []
+            plan.setdefault(entry['model'], []).append((zipf, entry))
+
+    target_zip, target = archives[-1]
+    models = _models(target)
+
+    with transaction.atomic():
+        catalogue = _flush_keeping_catalogue()
+        with connection.constraint_checks_disabled():
+            for model, target_entry in zip(models, target['database']):
+                for zipf, entry in plan.get(target_entry['model'], []):
+                    rows = backup_engine.iter_member_rows(zipf, entry['member'])
+                    load_rows(model, rows, batch_size, replace=entry['mode'] == 'delta', load_m2m=False)
+
+            # Replay deletions against the key list of the restored backup
+            for model, entry in zip(models, target['database']):
+                if 'keys' not in entry:
+                    continue
+                to_python = model._meta.pk.to_python
+                keep = {to_python(row['pk']) for row in backup_engine.iter_member_rows(target_zip, entry['keys']['member'])}
+                stale = [pk for pk in model._base_manager.values_list('pk', flat=True).iterator() if pk not in keep]
+                for batch in _batched(stale, batch_size):
+                    model._base_manager.filter(pk__in=batch)._raw_delete(connection.alias)
+            _reinstate_catalogue(catalogue)
+        connection.check_constraints()
+        reset_sequences(models)
@@ -0,0 +1,68 @@
+"""
+Race-free allocation of sequential, human-readable numbers (UCZ-00001, AST-0001...).
+
+Each church/prefix pair has one NumberSequence row. Allocation is a single
+UPDATE ... SET last_value = last_value + n followed by a read of the new value
+inside the same transaction, so concurrent workers never hand out the same
+number and no scan of the numbered table is needed.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NumberSequence
+
+
+def format_number(prefix, value, width):
+    return f"{prefix}-{value:0{width}d}"
+
+
+def existing_number_seed(queryset, field, prefix):
+    """Return a callable giving the highest number already used for ``prefix`` in ``queryset``.
+
+    Only evaluated the first time a sequence is created, so numbering carries
+    on from records created before the sequence existed.
+    """
+    def seed():
+        highest = 0
+        for value in queryset.filter(**{f'{field}__startswith': f'{prefix}-'}).values_list(field, flat=True):
+            try:
+                highest = max(highest, int(value.split('-', 1)[1]))
+            except (IndexError, ValueError):
+                continue
+        return highest
+    return seed
+
+
+def _advance(sequence, count):
+    # update() skips auto_now; differential backups select sequences by updated_at
+    return sequence.update(last_value=F('last_value') + count, updated_at=timezone.now())
+
+
+def reserve(church, prefix, count=1, seed=None):
+    """Atomically reserve ``count`` consecutive values and return them as a range"""
+    church_id = getattr(church, 'pk', church)
+    sequence = NumberSequence.objects.filter(church_id=church_id, prefix=prefix)
+
+    with transaction.atomic():
+        if not _advance(sequence, count):
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    NumberSequence.objects.create(church_id=church_id, prefix=prefix, last_value=start + count)
+                return range(start + 1, start + count + 1)
+            except IntegrityError:
+                # Another worker created the sequence first
+                _advance(sequence, count)
+        last = sequence.values_list('last_value', flat=True).get()
+    return range(last - count + 1, last + 1)
+
+
+def reserve_numbers(church, prefix, count, width, seed=None):
+    """Reserve ``count`` formatted numbers in one call, for bulk paths"""
+    return [format_number(prefix, value, width) for value in reserve(church, prefix, count, seed)]
+
+
+def next_number(church, prefix, width, seed=None):
+    """Allocate the next formatted number for ``prefix``"""
+    return reserve_numbers(church, prefix, 1, width, seed)[0]
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    is_finished = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'progress_message', 'result', 'error',
+                  'is_finished', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,362 @@
+import io
+import itertools
+import os
+import random
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from membership.models import Member, Position, PositionHistory, Section
+from . import backup_engine, backup_utils, jobs, sequences
+from .lookups import lookup_by_name, lookup_by_pk, lookup_rows
+from .models import Backup, BackupConfiguration, Church, Job, NumberSequence, UserProfile, get_current_church
+
+
+class MediaArchiveTests(TestCase):
+    """Media archived by MediaZipFile.write_compressed reads back intact with the standard zipfile module"""
+
+    FILES = {
+        'members/photos/photo.jpg': random.Random(1).randbytes(2000),
+        'receipts/note.txt': b'Sunday offering receipt\n' * 100,
+        'receipts/noise.bin': random.Random(2).randbytes(3000),
+        'reports/large.csv': b'date,amount\n' + b'2026-03-01,100.00\n' * 300,
+        'empty.txt': b'',
+    }
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.media_root = media_root.name
+        for name, data in self.FILES.items():
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+    def test_round_trip(self):
+        buffer = io.BytesIO()
+        # Files above the limit go through ZipFile.write() instead of the worker threads
+        with mock.patch.object(backup_engine, 'MAX_BUFFERED_SIZE', 4000):
+            with backup_engine.MediaZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                zipf.writestr('manifest.json', '{}')
+                count, size = backup_engine.write_media(zipf, self.media_root, prefix='media', workers=3)
+
+        self.assertEqual((count, size), (len(self.FILES), sum(map(len, self.FILES.values()))))
+        with zipfile.ZipFile(buffer) as zipf:
+            self.assertIsNone(zipf.testzip())
+            for name, data in self.FILES.items():
+                self.assertEqual(zipf.read(f'media/{name}'), data)
+            compression = {info.filename: info.compress_type for info in zipf.infolist()}
+        self.assertEqual(compression['media/members/photos/photo.jpg'], zipfile.ZIP_STORED)
+        self.assertEqual(compression['media/receipts/note.txt'], zipfile.ZIP_DEFLATED)
+        self.assertEqual(compression['media/receipts/noise.bin'], zipfile.ZIP_STORED)
+        self.assertEqual(compression['media/reports/large.csv'], zipfile.ZIP_DEFLATED)
+
+
+class BackupTestCase(TestCase):
+    """Backups written to a temporary directory, one second apart"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        backup_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(backup_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        BackupConfiguration.objects.create(storage_path=backup_dir.name)
+        # Archive names have one-second precision: give each backup its own second
+        seconds = itertools.count()
+        clock = mock.patch.object(backup_utils, 'datetime', **{
+            'now.side_effect': lambda: datetime(2026, 3, 1) + timedelta(seconds=next(seconds)),
+        })
+        clock.start()
+        self.addCleanup(clock.stop)
+
+        self.church = Church.objects.create(name='Restore Church')
+
+    def add_member(self, first_name, church=None):
+        return Member.objects.create(
+            church=church or self.church, first_name=first_name, last_name='Test', gender='F',
+            date_of_birth=date(1990, 1, 1), address='-', membership_status='communicant',
+            date_joined=date(2020, 1, 1),
+        )
+
+
+
+class DifferentialRestoreTests(BackupTestCase):
+    """Restoring a chain of differential backups"""
+
+    def test_sequences_carry_on_after_a_restore(self):
+        self.add_member('First')
+        backup_utils.create_differential_backup()
+        self.add_member('Second')
+        self.add_member('Third')
+        backup, _ = backup_utils.create_differential_backup()
+
+        backup_utils.restore_differential_backup(backup)
+
+        sequence = NumberSequence.objects.get(church=self.church, prefix=Member.NUMBER_PREFIX)
+        self.assertEqual(sequence.last_value, 3)
+        self.assertEqual(self.add_member('Fourth').membership_number, 'UCZ-00004')
+
+    def test_closed_position_history_reaches_the_next_differential(self):
+        user = User.objects.create_user('restore-admin', password='x')
+        UserProfile.objects.create(user=user, church=self.church)
+        self.client.force_login(user)
+        member = self.add_member('Elder')
+        elder, deacon = [
+            Position.objects.create(church=self.church, title=title, level='congregation')
+            for title in ('Elder', 'Deacon')
+        ]
+        PositionHistory.objects.create(church=self.church, member=member, position=elder, start_date=date(2020, 1, 1))
+        backup_utils.create_differential_backup()
+
+        response = self.client.post(
+            f'/api/membership/members/{member.pk}/change_position/',
+            {'position_ids': [deacon.pk], 'start_date': '2026-01-01'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        backup, _ = backup_utils.create_differential_backup()
+
+        backup_utils.restore_differential_backup(backup)
+
+        history = {h.position_id: h.end_date for h in PositionHistory.objects.filter(member=member)}
+        self.assertEqual(history, {elder.pk: date(2026, 1, 1), deacon.pk: None})
+
+
+class DatabaseRestoreTests(BackupTestCase):
+    """Restoring a database backup, whole or for a single church"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = Church.objects.create(name='Other Church')
+        self.elder = Position.objects.create(church=self.church, title='Elder', level='congregation')
+        self.kept = self.add_member('Kept')
+        self.kept.current_positions.add(self.elder)
+        self.removed = self.add_member('Removed')
+        self.neighbour = self.add_member('Neighbour', church=self.other)
+        self.backup, self.path = backup_utils.create_database_backup()
+
+        self.removed.delete()
+        self.kept.current_positions.clear()
+        self.add_member('Added')
+        Member.objects.filter(pk=self.neighbour.pk).update(first_name='Renamed')
+        self.add_member('Newcomer', church=self.other)
+
+    def names(self, church):
+        return set(Member.objects.filter(church=church).values_list('first_name', flat=True))
+
+    def test_whole_restore(self):
+        backup_utils.restore_database(self.path)
+
+        self.assertEqual(self.names(self.church), {'Kept', 'Removed'})
+        self.assertEqual(self.names(self.other), {'Neighbour'})
+        self.assertEqual(list(Member.objects.get(pk=self.kept.pk).current_positions.all()), [self.elder])
+        # The catalogue survives the flush, and new rows don't collide with restored keys
+        self.assertTrue(Backup.objects.filter(pk=self.backup.pk).exists())
+        self.assertEqual(self.add_member('After').membership_number, 'UCZ-00003')
+
+    def test_single_church_restore_leaves_other_churches_alone(self):
+        backup_utils.restore_database(self.path, church=self.church)
+
+        self.assertEqual(self.names(self.church), {'Kept', 'Removed'})
+        self.assertEqual(self.names(self.other), {'Renamed', 'Newcomer'})
+        self.assertEqual(list(Member.objects.get(pk=self.kept.pk).current_positions.all()), [self.elder])
+
+    def test_single_church_restore_of_a_church_not_in_the_backup(self):
+        late = Church.objects.create(name='Late Church')
+
+        with self.assertRaisesMessage(Exception, 'This church is not in the backup'):
+            backup_utils.restore_database(self.path, church=late)
+        self.assertEqual(self.names(self.church), {'Kept', 'Added'})
+
+class NumberSequenceTests(TestCase):
+    """Sequential numbers are reserved in blocks from one row per church and prefix"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Sequence Church')
+        cls.other = Church.objects.create(name='Other Church')
+
+    def test_blocks_are_consecutive(self):
+        self.assertEqual(list(sequences.reserve(self.church, 'AST', 3)), [1, 2, 3])
+        self.assertEqual(sequences.reserve_numbers(self.church, 'AST', 2, 4), ['AST-0004', 'AST-0005'])
+        self.assertEqual(sequences.next_number(self.other, 'AST', 4), 'AST-0001')
+        self.assertEqual(NumberSequence.objects.get(church=self.church, prefix='AST').last_value, 5)
+
+    def test_new_sequences_carry_on_from_existing_numbers(self):
+        for number in ('UCZ-00007', 'UCZ-00012', 'UCZ-bad'):
+            Member.objects.create(
+                church=self.church, membership_number=number, first_name='Old', last_name='Member', gender='M',
+                date_of_birth=date(1980, 1, 1), address='-', membership_status='communicant',
+                date_joined=date(2010, 1, 1),
+            )
+        seed = sequences.existing_number_seed(Member.admin_objects.filter(church=self.church), 'membership_number', 'UCZ')
+
+        self.assertEqual(sequences.reserve_numbers(self.church, 'UCZ', 2, 5, seed), ['UCZ-00013', 'UCZ-00014'])
+        # The seed is only consulted when the sequence is created
+        Member.admin_objects.filter(membership_number='UCZ-00012').update(membership_number='UCZ-00099')
+        self.assertEqual(sequences.next_number(self.church, 'UCZ', 5, seed), 'UCZ-00015')
+
+
+class LookupCacheTests(TestCase):
+    """Cached lookup rows fall back to the database for keys they don't have"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Lookup Church')
+        cls.men = Section.objects.create(church=cls.church, name='Men')
+
+    def setUp(self):
+        cache.clear()
+        self.assertEqual(list(lookup_by_pk(Section, self.church.pk)), [self.men.pk])
+        # bulk_create skips the signals, as a write in another process would for this one
+        self.youth, = Section.admin_objects.bulk_create([Section(church=self.church, name='Youth')])
+
+    def test_missing_pk_reloads_the_rows(self):
+        self.assertEqual(set(lookup_by_pk(Section, self.church.pk)), {self.men.pk})
+        self.assertEqual(set(lookup_by_pk(Section, self.church.pk, [self.youth.pk])), {self.men.pk, self.youth.pk})
+        self.assertEqual(len(lookup_rows(Section, self.church.pk)), 2)
+
+    def test_missing_name_reloads_the_rows(self):
+        self.assertEqual(lookup_by_name(Section, self.church.pk, names=[' youth '])['youth'], self.youth)
+
+    def test_fresh_reads_the_database(self):
+        self.assertEqual(len(lookup_rows(Section, self.church.pk, fresh=True)), 2)
+
+
+class JobQueueTests(TestCase):
+    """Queueing, claiming and running background jobs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Job Church')
+        cls.other = Church.objects.create(name='Other Job Church')
+        cls.user = User.objects.create_user('job-user', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.seen_church = []
+        registry = mock.patch.dict(jobs._registry, {
+            'tests.echo': lambda job: self.seen_church.append(get_current_church()) or {'echo': job.payload},
+            'tests.fail': mock.Mock(side_effect=jobs.JobError('Nothing to import')),
+        })
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def test_enqueue(self):
+        job = jobs.enqueue(
+            'tests.echo', {'rows': 3}, user=self.user, church=self.church,
+            upload=SimpleUploadedFile('members.csv', b'First Name\nRuth\n'),
+        )
+
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.payload, job.created_by, job.church), ('queued', {'rows': 3}, self.user, self.church)
+        )
+        self.assertTrue(job.upload.name.startswith('job_uploads/members'))
+        self.assertEqual(list(jobs.iter_upload_lines(job)), ['First Name\n', 'Ruth\n'])
+        self.assertIsNone(jobs.enqueue('tests.echo', user=AnonymousUser()).created_by)
+
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        first, second = jobs.enqueue('tests.echo'), jobs.enqueue('tests.echo')
+
+        self.assertEqual(jobs.claim_next('worker-1'), first)
+        claimed = jobs.claim_next('worker-2')
+        self.assertEqual((claimed, claimed.status, claimed.worker, claimed.attempts), (second, 'running', 'worker-2', 1))
+        self.assertIsNone(jobs.claim_next('worker-3'))
+
+    def test_a_job_taken_by_another_worker_is_skipped(self):
+        first, second = jobs.enqueue('tests.echo'), jobs.enqueue('tests.echo')
+        update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another worker claims the first job between our select and our update
+            if not Job.admin_objects.filter(worker='worker-2').exists():
+                update(Job.admin_objects.filter(pk=first.pk), status='running', worker='worker-2')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            claimed = jobs.claim_next('worker-1')
+
+        self.assertEqual((claimed, claimed.worker), (second, 'worker-1'))
+        first.refresh_from_db()
+        self.assertEqual(first.worker, 'worker-2')
+
+    def test_run_records_the_result(self):
+        jobs.enqueue('tests.echo', {'rows': 3}, church=self.church, upload=SimpleUploadedFile('a.csv', b'x'))
+        job = jobs.claim_next()
+        path = job.upload.path
+
+        jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.result), ('completed', 100, {'echo': {'rows': 3}}))
+        self.assertEqual(self.seen_church, [self.church])
+        self.assertIsNone(get_current_church())
+        self.assertFalse(job.upload)
+        self.assertFalse(os.path.exists(path))
+
+    def test_run_records_failures(self):
+        jobs.enqueue('tests.fail')
+        jobs.enqueue('tests.missing')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 2)
+
+        self.assertEqual(dict(Job.objects.values_list('kind', 'error')), {
+            'tests.fail': 'Nothing to import',
+            'tests.missing': "No handler registered for 'tests.missing'",
+        })
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {'failed'})
+        self.assertTrue(all(Job.objects.values_list('finished_at', flat=True)))
+
+    def test_stale_jobs_are_requeued_then_failed(self):
+        started = timezone.now() - jobs.JOB_TIMEOUT - timedelta(minutes=1)
+        retry, give_up, busy = [
+            Job.objects.create(kind='tests.echo', status='running', started_at=start, attempts=attempts, worker='gone')
+            for start, attempts in ((started, 1), (started, jobs.MAX_ATTEMPTS), (timezone.now(), 1))
+        ]
+
+        jobs.requeue_stale()
+
+        for job in (retry, give_up, busy):
+            job.refresh_from_db()
+        self.assertEqual((retry.status, retry.worker), ('queued', ''))
+        self.assertEqual((give_up.status, give_up.error), ('failed', 'Worker stopped before the job finished'))
+        self.assertEqual((busy.status, busy.worker), ('running', 'gone'))
+
+    def test_job_status_is_scoped_to_the_church(self):
+        colleague = User.objects.create_user('job-colleague', password='x')
+        UserProfile.objects.create(user=colleague, church=self.church)
+        staff = User.objects.create_user('job-staff', password='x', is_staff=True)
+        UserProfile.objects.create(user=staff, church=self.church)
+        mine = jobs.enqueue('tests.echo', user=self.user, church=self.church)
+        theirs = jobs.enqueue('tests.echo', user=colleague, church=self.church)
+        elsewhere = jobs.enqueue('tests.echo', user=staff, church=self.other)
+
+        def visible(user):
+            self.client.force_login(user)
+            return {job['id'] for job in self.client.get('/api/core/jobs/').json()['results']}
+
+        self.assertEqual(visible(self.user), {mine.pk})
+        self.assertEqual(visible(staff), {mine.pk, theirs.pk})
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(f'/api/core/jobs/{theirs.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/core/jobs/{mine.pk}/').json()['status'], 'queued')
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(f'/api/core/jobs/{elsewhere.pk}/').status_code, 404)
@@ -0,0 +1,24 @@
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from .models import Job
+from .serializers import JobSerializer
+
+
+def job_accepted(job):
+    """Response for an API call that queued a background job"""
+    return Response({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/core/jobs/{job.id}/',
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of background jobs. Staff see every job of their church, others only their own"""
+    serializer_class = JobSerializer
+    
+    def get_queryset(self):
+        qs = Job.objects.all()
+        if not self.request.user.is_staff:
+            qs = qs.filter(created_by=self.request.user)
+        return qs
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import MonthlySummary
 
-# Dashboard app doesn't need admin registration
+
+@admin.register(MonthlySummary)
+class MonthlySummaryAdmin(admin.ModelAdmin):
+    list_display = ['month', 'church', 'income_total', 'expense_total', 'remittance_unpaid', 'new_members', 'updated_at']
+    list_filter = ['church']
+    readonly_fields = ['updated_at']
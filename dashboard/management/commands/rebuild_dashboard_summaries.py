@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Church
+from dashboard.summaries import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the dashboard monthly summary rollups from the transaction tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', help='Slug of a single church to rebuild (default: all churches)')
+
+    def handle(self, *args, **options):
+        church_id = None
+        if options['church']:
+            try:
+                church_id = Church.objects.get(slug=options['church']).id
+            except Church.DoesNotExist:
+                raise CommandError(f"Church '{options['church']}' not found")
+
+        count = rebuild_summaries(church_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} monthly summaries'))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0006_backup_absolute_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('income_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('income_count', models.PositiveIntegerField(default=0)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('expense_count', models.PositiveIntegerField(default=0)),
+                ('remittance_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('remittance_unpaid', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('new_members', models.PositiveIntegerField(default=0)),
+                ('new_communicants', models.PositiveIntegerField(default=0)),
+                ('new_catechumens', models.PositiveIntegerField(default=0)),
+                ('new_adherents', models.PositiveIntegerField(default=0)),
+                ('projects_created', models.PositiveIntegerField(default=0)),
+                ('active_projects', models.PositiveIntegerField(default=0)),
+                ('project_budget', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('church', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.church')),
+            ],
+            options={
+                'verbose_name': 'Monthly Summary',
+                'verbose_name_plural': 'Monthly Summaries',
+                'ordering': ['-month'],
+                'unique_together': {('church', 'month')},
+            },
+        ),
+    ]
@@ -1,3 +1,43 @@
 from django.db import models
+from core.models import TenantModel
 
-# Dashboard app doesn't need models
+
+class MonthlySummary(TenantModel):
+    """Per-church, per-month rollup of the figures shown on the dashboard.
+
+    Rows are kept up to date by the signal handlers in dashboard.signals and
+    can be rebuilt from scratch with the rebuild_dashboard_summaries command.
+    """
+    month = models.DateField(help_text="First day of the month")
+
+    # Finance (bucketed by transaction date)
+    income_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    income_count = models.PositiveIntegerField(default=0)
+    expense_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    expense_count = models.PositiveIntegerField(default=0)
+
+    # Remittances (bucketed by the transaction date of their income)
+    remittance_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    remittance_unpaid = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    # Membership (bucketed by date joined)
+    new_members = models.PositiveIntegerField(default=0)
+    new_communicants = models.PositiveIntegerField(default=0)
+    new_catechumens = models.PositiveIntegerField(default=0)
+    new_adherents = models.PositiveIntegerField(default=0)
+
+    # Projects (bucketed by creation date)
+    projects_created = models.PositiveIntegerField(default=0)
+    active_projects = models.PositiveIntegerField(default=0)
+    project_budget = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Summary {self.month.strftime('%B %Y')}"
+
+    class Meta:
+        ordering = ['-month']
+        unique_together = ['church', 'month']
+        verbose_name = 'Monthly Summary'
+        verbose_name_plural = 'Monthly Summaries'
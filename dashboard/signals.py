@@ -0,0 +1,53 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from finance.models import Income, Expense, Remittance
+from membership.models import Member
+from projects.models import Project
+from .summaries import schedule_refresh
+
+# Model -> (bucket date field, rollup sections affected by a write)
+TRACKED_MODELS = {
+    Income: ('transaction_date', ('income', 'remittances')),
+    Expense: ('transaction_date', ('expense',)),
+    Member: ('date_joined', ('members',)),
+    Project: ('created_at', ('projects',)),
+}
+
+
+def _remember_previous_date(sender, instance, raw=False, **kwargs):
+    """Keep the old bucket date so a moved transaction refreshes both months"""
+    if raw or not instance.pk:
+        return
+    date_field = TRACKED_MODELS[sender][0]
+    instance._summary_previous_date = (
+        sender.admin_objects.filter(pk=instance.pk).values_list(date_field, flat=True).first()
+    )
+
+
+def _refresh_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    date_field, sections = TRACKED_MODELS[sender]
+    dates = {getattr(instance, date_field), getattr(instance, '_summary_previous_date', None)}
+    schedule_refresh(instance.church_id, dates, sections)
+
+
+for model in (Income, Expense, Member):
+    pre_save.connect(_remember_previous_date, sender=model, dispatch_uid=f'summary_pre_save_{model.__name__}')
+
+for model in TRACKED_MODELS:
+    post_save.connect(_refresh_summary, sender=model, dispatch_uid=f'summary_post_save_{model.__name__}')
+    post_delete.connect(_refresh_summary, sender=model, dispatch_uid=f'summary_post_delete_{model.__name__}')
+
+
+@receiver([post_save, post_delete], sender=Remittance, dispatch_uid='summary_remittance')
+def refresh_remittance_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        income = instance.income
+    except Income.DoesNotExist:
+        # Cascade delete of the income; its own signal refreshes the bucket
+        return
+    schedule_refresh(instance.church_id, [income.transaction_date], ('remittances',))
@@ -0,0 +1,181 @@
+"""
+Maintenance of the dashboard MonthlySummary rollups.
+
+Each rollup row is split into sections (income, expense, remittances, members,
+projects). A write to a source table only recomputes the affected section of
+the affected church/month bucket, and the recomputation is deferred until the
+surrounding transaction commits so a batch of writes refreshes each bucket once.
+"""
+import datetime
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import MonthlySummary
+
+ACTIVE_PROJECT_STATUSES = ['approved', 'in_progress']
+
+_pending = threading.local()
+
+
+def _sections():
+    """Source model, bucket date field and aggregates for each rollup section"""
+    # Imported lazily so the source apps never depend on dashboard at import time
+    from finance.models import Income, Expense, Remittance
+    from membership.models import Member
+    from projects.models import Project
+
+    return {
+        'income': (Income, 'transaction_date', {
+            'income_total': Sum('amount'),
+            'income_count': Count('id'),
+        }),
+        'expense': (Expense, 'transaction_date', {
+            'expense_total': Sum('amount'),
+            'expense_count': Count('id'),
+        }),
+        'remittances': (Remittance, 'income__transaction_date', {
+            'remittance_total': Sum('amount'),
+            'remittance_unpaid': Sum('amount', filter=Q(paid=False)),
+        }),
+        'members': (Member, 'date_joined', {
+            'new_members': Count('id'),
+            'new_communicants': Count('id', filter=Q(membership_status='communicant')),
+            'new_catechumens': Count('id', filter=Q(membership_status='catechumen')),
+            'new_adherents': Count('id', filter=Q(membership_status='adherent')),
+        }),
+        'projects': (Project, 'created_at', {
+            'projects_created': Count('id'),
+            'active_projects': Count('id', filter=Q(status__in=ACTIVE_PROJECT_STATUSES)),
+            'project_budget': Sum('total_budget'),
+        }),
+    }
+
+
+SECTION_NAMES = ('income', 'expense', 'remittances', 'members', 'projects')
+
+
+def month_start(value):
+    """Return the first day of the month containing a date or datetime"""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def _next_month(month):
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def _date_lookup(model, date_field):
+    """created_at style timestamps are bucketed on their local date"""
+    field = model._meta.get_field(date_field.split('__')[0])
+    if date_field == field.name and field.get_internal_type() == 'DateTimeField':
+        return f'{date_field}__date'
+    return date_field
+
+
+def _clean(values):
+    return {key: value or 0 for key, value in values.items()}
+
+
+def _aggregate_month(name, church_id, month):
+    model, date_field, aggregates = _sections()[name]
+    lookup = _date_lookup(model, date_field)
+    qs = model.admin_objects.filter(**{
+        'church': church_id,
+        f'{lookup}__gte': month,
+        f'{lookup}__lt': _next_month(month),
+    })
+    return _clean(qs.aggregate(**aggregates))
+
+
+def _aggregate_grouped(name, church_id=None):
+    """Yield (church_id, month, values) for every bucket of a section"""
+    model, date_field, aggregates = _sections()[name]
+    qs = model.admin_objects.all()
+    if church_id is not None:
+        qs = qs.filter(church=church_id)
+    rows = (
+        qs.annotate(bucket=TruncMonth(date_field, output_field=DateField()))
+        .values('church', 'bucket')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    for row in rows:
+        church = row.pop('church')
+        bucket = row.pop('bucket')
+        if bucket is not None:
+            yield church, bucket, _clean(row)
+
+
+def refresh_month(church_id, month, sections=SECTION_NAMES):
+    """Recompute the given sections of one church/month rollup row"""
+    month = month_start(month)
+    values = {}
+    for name in sections:
+        values.update(_aggregate_month(name, church_id, month))
+    MonthlySummary.admin_objects.update_or_create(church_id=church_id, month=month, defaults=values)
+
+
+def _flush_queued():
+    return any(callback[1] is flush_pending for callback in transaction.get_connection().run_on_commit)
+
+
+def schedule_refresh(church_id, dates, sections):
+    """Queue a refresh of the buckets covering ``dates``, run once the transaction commits.
+
+    Bulk write paths (bulk_create, queryset.update) bypass model signals and
+    must call this themselves.
+    """
+    pending = getattr(_pending, 'buckets', None)
+    if pending is None or (pending and not _flush_queued()):
+        # Buckets left by a transaction that rolled back (taking its callback with it)
+        pending = _pending.buckets = defaultdict(set)
+
+    added = False
+    for value in dates:
+        if value is None:
+            continue
+        key = (church_id, month_start(value))
+        missing = set(sections) - pending[key]
+        if missing:
+            pending[key] |= missing
+            added = True
+
+    if added:
+        transaction.on_commit(flush_pending)
+
+
+def flush_pending():
+    """Refresh every bucket queued by schedule_refresh"""
+    pending = getattr(_pending, 'buckets', None)
+    if not pending:
+        return
+    _pending.buckets = defaultdict(set)
+    for (church_id, month), sections in pending.items():
+        refresh_month(church_id, month, [name for name in SECTION_NAMES if name in sections])
+
+
+def rebuild_summaries(church_id=None):
+    """Recompute all rollups, optionally for a single church. Returns the number of rows written"""
+    rows = defaultdict(dict)
+    for name in SECTION_NAMES:
+        for church, bucket, values in _aggregate_grouped(name, church_id):
+            rows[(church, bucket)].update(values)
+
+    with transaction.atomic():
+        existing = MonthlySummary.admin_objects.all()
+        if church_id is not None:
+            existing = existing.filter(church=church_id)
+        existing.delete()
+        MonthlySummary.admin_objects.bulk_create(
+            [MonthlySummary(church_id=church, month=month, **values) for (church, month), values in rows.items()],
+            batch_size=500
+        )
+    return len(rows)
@@ -0,0 +1,77 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from core.models import Church
+from finance.models import BankAccount, Expense, ExpenseCategory, Income, IncomeCategory
+from .models import MonthlySummary
+from .summaries import rebuild_summaries
+
+
+class MonthlySummaryTests(TestCase):
+    """Incrementally refreshed rollups must match a full rebuild"""
+
+    FIELDS = ['church_id', 'month', 'income_total', 'income_count', 'expense_total', 'expense_count']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Summary Church')
+        cls.account = BankAccount.objects.create(
+            church=cls.church, account_name='Main', bank_name='Bank', account_number='1', account_type='checking',
+        )
+        cls.income_category = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.expense_category = ExpenseCategory.objects.create(church=cls.church, name='Fuel')
+
+    def add_income(self, amount, day):
+        return Income.objects.create(
+            church=self.church, category=self.income_category, bank_account=self.account,
+            amount=Decimal(amount), transaction_date=day, payment_method='cash',
+        )
+
+    def rollups(self):
+        return list(MonthlySummary.admin_objects.order_by('month').values(*self.FIELDS))
+
+    def test_incremental_refresh_matches_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = self.add_income('100.00', date(2026, 1, 10))
+            self.add_income('50.00', date(2026, 1, 20))
+            deleted = self.add_income('70.00', date(2026, 2, 5))
+            Expense.objects.create(
+                church=self.church, category=self.expense_category, bank_account=self.account,
+                amount=Decimal('30.00'), transaction_date=date(2026, 2, 7), payment_method='cash',
+                payee_name='Garage', description='Fuel',
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.transaction_date = date(2026, 3, 1)
+            moved.save()
+            deleted.delete()
+
+        incremental = self.rollups()
+        rebuild_summaries()
+
+        self.assertEqual(incremental, self.rollups())
+        totals = {row['month']: (row['income_total'], row['expense_total']) for row in incremental}
+        self.assertEqual(totals[date(2026, 1, 1)], (Decimal('50.00'), Decimal('0.00')))
+        self.assertEqual(totals[date(2026, 2, 1)], (Decimal('0.00'), Decimal('30.00')))
+        self.assertEqual(totals[date(2026, 3, 1)], (Decimal('100.00'), Decimal('0.00')))
+
+    def test_each_bucket_is_refreshed_once_per_transaction(self):
+        with mock.patch('dashboard.summaries.refresh_month') as refresh_month:
+            with self.captureOnCommitCallbacks(execute=True):
+                for day in (1, 2, 3):
+                    self.add_income('10.00', date(2026, 4, day))
+
+        refresh_month.assert_called_once_with(self.church.pk, date(2026, 4, 1), ['income', 'remittances'])
+
+    def test_buckets_of_a_rolled_back_transaction_are_dropped(self):
+        with mock.patch('dashboard.summaries.refresh_month') as refresh_month:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.add_income('10.00', date(2026, 5, 1))
+                raise RuntimeError
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_income('20.00', date(2026, 5, 2))
+
+        refresh_month.assert_called_once_with(self.church.pk, date(2026, 5, 1), ['income', 'remittances'])
@@ -1,13 +1,12 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum
-from membership.models import Member, Dependent
-from finance.models import Income, Expense, BankAccount, Remittance
+from django.db.models import Sum
+from finance.models import BankAccount
 from groups.models import Group, GroupMembership
 from committees.models import Committee, CommitteeMembership
-from projects.models import Project
 from planner.models import Event
 from special_events.models import SpecialDay
+from .models import MonthlySummary
 from datetime import datetime, timedelta
 
 
@@ -18,27 +17,43 @@ def dashboard_home(request):
     today = datetime.today()
     current_month_start = today.replace(day=1)
     
+    # Membership, finance and project figures come from the monthly rollups
+    # (see dashboard.summaries) instead of scanning the transaction tables.
+    summaries = MonthlySummary.objects.all()
+    rollup_fields = [
+        'income_total', 'expense_total', 'remittance_unpaid', 'new_members',
+        'new_communicants', 'new_catechumens', 'new_adherents', 'active_projects', 'project_budget',
+    ]
+    totals = {key: value or 0 for key, value in summaries.aggregate(**{f: Sum(f) for f in rollup_fields}).items()}
+    this_month = summaries.filter(month__gte=current_month_start.date()).aggregate(
+        income=Sum('income_total'), expense=Sum('expense_total'), members=Sum('new_members')
+    )
+    
     # Membership stats
-    total_members = Member.objects.count()
-    new_members_this_month = Member.objects.filter(date_joined__gte=current_month_start).count()
-    members_by_status = Member.objects.values('membership_status').annotate(count=Count('id'))
+    total_members = totals['new_members']
+    new_members_this_month = this_month['members'] or 0
+    members_by_status = [
+        {'membership_status': 'communicant', 'count': totals['new_communicants']},
+        {'membership_status': 'catechumen', 'count': totals['new_catechumens']},
+        {'membership_status': 'adherent', 'count': totals['new_adherents']},
+    ]
     
     # Finance stats
-    total_income = Income.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_expense = Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
-    income_this_month = Income.objects.filter(transaction_date__gte=current_month_start).aggregate(total=Sum('amount'))['total'] or 0
-    expense_this_month = Expense.objects.filter(transaction_date__gte=current_month_start).aggregate(total=Sum('amount'))['total'] or 0
+    total_income = totals['income_total']
+    total_expense = totals['expense_total']
+    income_this_month = this_month['income'] or 0
+    expense_this_month = this_month['expense'] or 0
     
     # Bank account balances
     bank_accounts = BankAccount.objects.filter(is_active=True)
     total_bank_balance = bank_accounts.aggregate(total=Sum('current_balance'))['total'] or 0
     
     # Remittances pending
-    unpaid_remittances = Remittance.objects.filter(paid=False).aggregate(total=Sum('amount'))['total'] or 0
+    unpaid_remittances = totals['remittance_unpaid']
     
     # Projects stats
-    active_projects = Project.objects.filter(status__in=['approved', 'in_progress']).count()
-    total_project_budget = Project.objects.aggregate(total=Sum('total_budget'))['total'] or 0
+    active_projects = totals['active_projects']
+    total_project_budget = totals['project_budget']
     
     # Groups and Committees
     total_groups = Group.objects.count()
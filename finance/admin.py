@@ -11,6 +11,7 @@ class BankAccountAdmin(admin.ModelAdmin):
     list_display = ['account_name', 'bank_name', 'account_type', 'current_balance', 'is_active']
     list_filter = ['account_type', 'is_active']
     search_fields = ['account_name', 'bank_name', 'account_number']
+    readonly_fields = ['current_balance']
 
 
 @admin.register(IncomeCategory)
@@ -5,3 +5,11 @@ class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finance'
     verbose_name = 'Church Finance'
+
+    def ready(self):
+        from core import lookups
+        from . import signals  # noqa: F401
+        from .models import BankAccount, ExpenseCategory, IncomeCategory
+
+        for model in (IncomeCategory, ExpenseCategory, BankAccount):
+            lookups.register(model)
@@ -0,0 +1,196 @@
+"""
+Budget-vs-actual engine.
+
+Actuals are read with one grouped query per side (income and expense): the
+year's transactions summed by category and TruncMonth(transaction_date). They
+are joined in memory to the jan..dec columns of the budget lines, which gives
+monthly and year-to-date variances, burn rates and a run-rate projection for
+the year end.
+
+The actuals are cached per budget together with a stamp of the year's
+transactions (count and latest ``updated_at`` on each side), so they are
+recomputed as soon as a transaction of that year is added, edited or deleted.
+The budget lines themselves are small and always read fresh.
+"""
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MONTHS, Expense, Income
+
+CACHE_TIMEOUT = 60 * 60 * 24
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _percent(part, whole):
+    return round(float(part) / float(whole) * 100, 1) if whole else None
+
+
+def _transactions(model, budget):
+    return model._base_manager.filter(church_id=budget.church_id, transaction_date__year=budget.year)
+
+
+def _stamp(budget):
+    return tuple(
+        tuple(_transactions(model, budget).aggregate(Count('pk'), Max('updated_at')).values())
+        for model in (Income, Expense)
+    )
+
+
+def _monthly_actuals(model, budget):
+    """{category_id: (category name, [12 monthly totals])} of the year's transactions"""
+    rows = (
+        _transactions(model, budget)
+        .annotate(month=TruncMonth('transaction_date'))
+        .values('category_id', 'category__name', 'month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    actuals = {}
+    for row in rows:
+        name, months = actuals.setdefault(row['category_id'], (row['category__name'], [ZERO] * 12))
+        months[row['month'].month - 1] = row['total']
+    return actuals
+
+
+def budget_actuals(budget):
+    """{'income': ..., 'expense': ...} monthly actuals by category, cached until the year's transactions change"""
+    key = f'finance:budget-actuals:{budget.pk}'
+    stamp = _stamp(budget)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    actuals = {
+        'income': _monthly_actuals(Income, budget),
+        'expense': _monthly_actuals(Expense, budget),
+    }
+    cache.set(key, (stamp, actuals), CACHE_TIMEOUT)
+    return actuals
+
+
+def elapsed_months(year, as_of=None):
+    """Completed months of ``year`` on ``as_of`` (default: today), 0-12.
+
+    The current month only counts once its last day is reached: a partly
+    recorded month would drag the run-rate projection down.
+    """
+    as_of = as_of or datetime.date.today()
+    if as_of.year < year:
+        return 0
+    if as_of.year > year:
+        return 12
+    if (as_of + datetime.timedelta(days=1)).month != as_of.month:
+        return as_of.month
+    return as_of.month - 1
+
+
+def _figures(budgeted, actual, elapsed, side):
+    """Totals, variance, burn rate and projection of one line (or a side's totals)"""
+    annual = sum(budgeted)
+    realised = sum(actual)
+    ytd_budgeted = sum(budgeted[:elapsed])
+    ytd_actual = sum(actual[:elapsed])
+    projected = _money(ytd_actual / elapsed * 12) if elapsed else ZERO
+    # Positive variance is good news: income above target, spending below the limit
+    sign = 1 if side == 'income' else -1
+    return {
+        'budgeted': _money(annual),
+        'actual': _money(realised),
+        'variance': _money(sign * (realised - annual)),
+        'ytd_budgeted': _money(ytd_budgeted),
+        'ytd_actual': _money(ytd_actual),
+        'ytd_variance': _money(sign * (ytd_actual - ytd_budgeted)),
+        # Share of the annual budget used (or collected) by the cut-off month
+        'burn_rate': _percent(ytd_actual, annual),
+        'projected': projected,
+        'projected_variance': _money(sign * (projected - annual)),
+    }
+
+
+def _side(items, actuals, elapsed, side):
+    lines = []
+    total_budgeted = [ZERO] * 12
+    total_actual = [ZERO] * 12
+    budgeted_categories = set()
+    for item in items:
+        budgeted = [getattr(item, month) for month in MONTHS]
+        actual = actuals[item.category_id][1] if item.category_id in actuals else [ZERO] * 12
+        budgeted_categories.add(item.category_id)
+        lines.append({
+            'id': item.pk,
+            'category_id': item.category_id,
+            'category': item.category.name,
+            'department_id': item.department_id,
+            'department': item.department.name if item.department else None,
+            **_figures(budgeted, actual, elapsed, side),
+            'months': [
+                {'month': month, 'budgeted': b, 'actual': _money(a)}
+                for month, b, a in zip(MONTHS, budgeted, actual)
+            ],
+        })
+        total_budgeted = [t + b for t, b in zip(total_budgeted, budgeted)]
+        total_actual = [t + a for t, a in zip(total_actual, actual)]
+
+    # Transactions in categories the budget has no line for
+    unbudgeted = []
+    for category_id, (name, actual) in actuals.items():
+        if category_id in budgeted_categories:
+            continue
+        unbudgeted.append({
+            'category_id': category_id,
+            'category': name,
+            'actual': _money(sum(actual)),
+        })
+        total_actual = [t + a for t, a in zip(total_actual, actual)]
+    unbudgeted.sort(key=lambda line: line['category'] or '')
+
+    totals = _figures(total_budgeted, total_actual, elapsed, side)
+    totals['months'] = [
+        {'month': month, 'budgeted': _money(b), 'actual': _money(a)}
+        for month, b, a in zip(MONTHS, total_budgeted, total_actual)
+    ]
+    return lines, unbudgeted, totals
+
+
+def budget_performance(budget, as_of=None, elapsed=None):
+    """Budget vs actual of every line of ``budget``.
+
+    ``elapsed`` (months, 0-12) overrides the year-to-date cut-off, which
+    defaults to the months completed by ``as_of``; the projection
+    extrapolates the year-to-date actuals. Transactions in categories without
+    a budget line are reported under ``unbudgeted_*`` and included in the
+    totals.
+    """
+    if elapsed is None:
+        elapsed = elapsed_months(budget.year, as_of)
+    actuals = budget_actuals(budget)
+
+    income, unbudgeted_income, income_totals = _side(
+        budget.income_items.select_related('category', 'department'), actuals['income'], elapsed, 'income'
+    )
+    expense, unbudgeted_expense, expense_totals = _side(
+        budget.expense_items.select_related('category', 'department'), actuals['expense'], elapsed, 'expense'
+    )
+    return {
+        'budget_id': budget.pk,
+        'year': budget.year,
+        'months_elapsed': elapsed,
+        'income': income,
+        'expense': expense,
+        'unbudgeted_income': unbudgeted_income,
+        'unbudgeted_expense': unbudgeted_expense,
+        'totals': {
+            'income': income_totals,
+            'expense': expense_totals,
+            'net_actual': income_totals['actual'] - expense_totals['actual'],
+            'net_budgeted': income_totals['budgeted'] - expense_totals['budgeted'],
+        },
+    }
@@ -0,0 +1,133 @@
+"""
+Long-format store of the budget lines.
+
+Budget lines keep their jan..dec columns for editing (admin, CSV import,
+update_item), and every line is mirrored into twelve (item, month, amount)
+rows indexed on (budget, month). Totals, month ranges and year-on-year
+comparisons are then single indexed aggregates over one column instead of
+12-term sums.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Sum
+
+from core.aggregates import count_subquery, sum_subquery
+from core.lookups import lookup_rows
+
+from .models import (
+    MONTHS, BudgetExpenseItem, BudgetExpenseMonth, BudgetIncomeItem, BudgetIncomeMonth, ExpenseCategory, IncomeCategory
+)
+
+BATCH_SIZE = 500
+
+# Budget side -> (line model, month model)
+STORES = {
+    'income': (BudgetIncomeItem, BudgetIncomeMonth),
+    'expense': (BudgetExpenseItem, BudgetExpenseMonth),
+}
+CATEGORY_MODELS = {
+    'income': IncomeCategory,
+    'expense': ExpenseCategory,
+}
+# Line fields carried over when a budget is cloned
+CLONED_FIELDS = ['department_id', 'group_id', 'section_id', 'notes']
+CENT = Decimal('0.01')
+
+
+def _month_model(item_model):
+    return item_model._meta.get_field('monthly_amounts').related_model
+
+
+def month_rows(item):
+    """The twelve unsaved month rows mirroring a budget line"""
+    month_model = _month_model(type(item))
+    return [
+        month_model(item=item, budget_id=item.budget_id, church_id=item.church_id, month=number, amount=amount)
+        for number, amount in enumerate(item.month_values(), start=1)
+    ]
+
+
+def sync_month_amounts(items, batch_size=BATCH_SIZE):
+    """Write the month rows of saved budget lines (all of one model) with a bulk upsert"""
+    items = list(items)
+    if not items:
+        return 0
+    rows = [row for item in items for row in month_rows(item)]
+    _month_model(type(items[0]))._base_manager.bulk_create(
+        rows, batch_size=batch_size,
+        update_conflicts=True, unique_fields=['item', 'month'], update_fields=['amount', 'budget', 'church'],
+    )
+    return len(rows)
+
+
+def seed_budget_lines(budget, source=None, uplift=Decimal('0')):
+    """Create the lines of a new budget with one bulk insert per side.
+
+    Every active category gets a line. With a ``source`` budget, its lines are
+    copied (amounts raised by ``uplift`` percent, assignments and notes kept);
+    active categories it has no line for start at zero. Returns the number of
+    lines created.
+    """
+    factor = 1 + Decimal(uplift) / 100
+    count = 0
+    for side, (item_model, _) in STORES.items():
+        lines = {}
+        if source is not None:
+            for line in item_model._base_manager.filter(budget=source).order_by('pk'):
+                lines[line.category_id] = item_model(
+                    budget=budget, church_id=budget.church_id, category_id=line.category_id,
+                    **{field: getattr(line, field) for field in CLONED_FIELDS},
+                    **{month: (getattr(line, month) * factor).quantize(CENT, rounding=ROUND_HALF_UP)
+                       for month in MONTHS},
+                )
+        # Every active category gets a line, including ones the cached rows may not have yet
+        categories = [category for category in lookup_rows(CATEGORY_MODELS[side], budget.church_id, fresh=True)
+                      if category.is_active]
+        for category in sorted(categories, key=lambda category: category.name):
+            if category.pk not in lines:
+                lines[category.pk] = item_model(budget=budget, church_id=budget.church_id, category_id=category.pk)
+
+        created = item_model._base_manager.bulk_create(list(lines.values()), batch_size=BATCH_SIZE)
+        if any(item.pk is None for item in created):
+            # Not every backend returns primary keys from a bulk insert
+            created = list(item_model._base_manager.filter(budget=budget))
+        sync_month_amounts(created)
+        count += len(created)
+    return count
+
+
+def rebuild_month_amounts(budgets=None):
+    """Recreate the month rows from the jan..dec columns. Returns the number of rows written"""
+    written = 0
+    for item_model, month_model in STORES.values():
+        items = item_model._base_manager.all()
+        existing = month_model._base_manager.all()
+        if budgets is not None:
+            items = items.filter(budget__in=budgets)
+            existing = existing.filter(budget__in=budgets)
+        existing.delete()
+        written += sync_month_amounts(items.only('pk', 'budget_id', 'church_id', *MONTHS).iterator())
+    return written
+
+
+def with_budget_totals(budgets):
+    """Annotate an AnnualBudget queryset with ``income_total``, ``expense_total`` and line counts"""
+    return budgets.annotate(
+        income_total=sum_subquery(BudgetIncomeMonth._base_manager.all(), 'budget', 'amount'),
+        expense_total=sum_subquery(BudgetExpenseMonth._base_manager.all(), 'budget', 'amount'),
+        income_lines=count_subquery(BudgetIncomeItem._base_manager.all(), 'budget'),
+        expense_lines=count_subquery(BudgetExpenseItem._base_manager.all(), 'budget'),
+    )
+
+
+def period_totals(side, budgets, first_month=1, last_month=12):
+    """{year: budgeted total} of one side over a month range, for several budgets at once"""
+    month_model = STORES[side][1]
+    rows = (
+        month_model._base_manager
+        .filter(budget__in=budgets, month__gte=first_month, month__lte=last_month)
+        .values('budget__year')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    return {row['budget__year']: row['total'] for row in rows}
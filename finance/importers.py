@@ -0,0 +1,188 @@
+"""
+Import of budget lines from the budget CSV template (offline budget preparation).
+
+The whole file is parsed first. Categories (from the lookup cache), budgets
+and the existing lines of the years in the file are then loaded once and
+matched in memory (category names are compared case- and
+whitespace-insensitively), and the changes are
+written with one bulk_create and one bulk_update per line model. Each budget
+touched by an import gets a single audit entry holding the full diff.
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from core.lookups import lookup_rows, normalize_name
+from .budget_store import sync_month_amounts
+from .models import (
+    MONTHS, AnnualBudget, BudgetAuditLog, BudgetIncomeItem, BudgetExpenseItem, IncomeCategory, ExpenseCategory
+)
+
+BATCH_SIZE = 500
+
+# Line type in the CSV -> (category model, line model)
+LINE_TYPES = {
+    'income': (IncomeCategory, BudgetIncomeItem),
+    'expense': (ExpenseCategory, BudgetExpenseItem),
+}
+
+
+def _amount(value):
+    try:
+        return Decimal(str(value or 0).replace(',', '')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return Decimal('0.00')
+
+
+def _parse(reader, errors):
+    """Yield (row number, year, line type, category name, month amounts) for the usable rows"""
+    for index, row in enumerate(reader):
+        number = index + 1
+        category_name = (row.get('Category') or '').strip()
+        if not category_name:
+            continue
+        try:
+            year = int(row.get('Year'))
+        except (TypeError, ValueError):
+            errors.append((number, f"Invalid year '{row.get('Year')}'"))
+            continue
+        item_type = (row.get('Type') or '').strip().lower()
+        if item_type not in LINE_TYPES:
+            errors.append((number, f"Invalid type '{row.get('Type')}'"))
+            continue
+        amounts = {month: _amount(row.get(month.capitalize(), row.get(month, '0'))) for month in MONTHS}
+        yield number, year, item_type, category_name, amounts
+
+
+def _budgets(church, years):
+    """{year: budget} for the church, creating the missing years"""
+    budgets = {budget.year: budget for budget in AnnualBudget.objects.filter(church=church, year__in=years)}
+    for year in years:
+        if year not in budgets:
+            budgets[year] = AnnualBudget.objects.create(year=year, church=church, status='draft', is_locked=False)
+    return budgets
+
+
+def _categories(church, wanted):
+    """{line type: {normalized name: active category}} from the lookup cache.
+
+    The categories are read again from the database if one of the ``wanted``
+    (line type, normalized name) pairs is missing, in case it was just added
+    by another process.
+    """
+    for fresh in (False, True):
+        categories = {}
+        for item_type, (category_model, _) in LINE_TYPES.items():
+            categories[item_type] = {}
+            for category in sorted(lookup_rows(category_model, church.pk, fresh), key=lambda category: category.pk):
+                if category.is_active:
+                    categories[item_type].setdefault(normalize_name(category.name), category)
+        if all(name in categories[item_type] for item_type, name in wanted):
+            break
+    return categories
+
+
+def _save_lines(model, created, updated):
+    model._base_manager.bulk_create(created, batch_size=BATCH_SIZE)
+    if any(item.pk is None for item in created):
+        # Not every backend returns primary keys from a bulk insert
+        saved = {
+            (item.budget_id, item.category_id): item
+            for item in model._base_manager.filter(budget__in={item.budget_id for item in created})
+        }
+        for item in created:
+            item.pk = saved[(item.budget_id, item.category_id)].pk
+    model._base_manager.bulk_update(updated, MONTHS, batch_size=BATCH_SIZE)
+    sync_month_amounts(created + updated)
+
+
+def _audit_note(changes):
+    actions = [line['action'] for side in changes.values() for line in side.values()]
+    return f"CSV import: {actions.count('create')} lines created, {actions.count('update')} updated"
+
+
+def import_budget_items(lines, church, user=None):
+    """Create or update budget items from CSV lines and return the import report"""
+    reader = csv.DictReader(lines)
+    errors = []
+    rows = list(_parse(reader, errors))
+
+    imported_count = 0
+    created_count = 0
+    updated_count = 0
+
+    with transaction.atomic():
+        budgets = _budgets(church, sorted({year for _, year, _, _, _ in rows}))
+
+        categories = _categories(church, {(item_type, normalize_name(name)) for _, _, item_type, name, _ in rows})
+        lines_by_key = {}
+        for item_type, (_, line_model) in LINE_TYPES.items():
+            for item in line_model.objects.filter(budget__in=budgets.values()):
+                lines_by_key[(item_type, item.budget_id, item.category_id)] = item
+
+        created = {item_type: {} for item_type in LINE_TYPES}
+        updated = {item_type: {} for item_type in LINE_TYPES}
+        diffs = {}
+
+        for number, year, item_type, category_name, amounts in rows:
+            budget = budgets[year]
+            if budget.is_locked:
+                errors.append((number, f"Budget for {year} is locked"))
+                continue
+            category = categories[item_type].get(normalize_name(category_name))
+            if category is None:
+                errors.append((number, f"Category '{category_name}' not found or inactive"))
+                continue
+
+            key = (item_type, budget.pk, category.pk)
+            item = lines_by_key.get(key)
+            changes = {}
+            if item is None:
+                item = LINE_TYPES[item_type][1](budget=budget, category=category, church=church)
+                lines_by_key[key] = created[item_type][key] = item
+                action = 'create'
+            else:
+                action = 'create' if key in created[item_type] else 'update'
+            for month, amount in amounts.items():
+                old = getattr(item, month)
+                if amount != old:
+                    changes[month] = {'old': float(old), 'new': float(amount)}
+                    setattr(item, month, amount)
+            if changes and action == 'update':
+                updated[item_type][key] = item
+            if changes or action == 'create':
+                entry = diffs.setdefault(budget.pk, {}).setdefault(item_type, {}).setdefault(
+                    category.name, {'action': action, 'months': {}}
+                )
+                for month, change in changes.items():
+                    # A category listed twice keeps its first old value
+                    entry['months'].setdefault(month, {'old': change['old']})['new'] = change['new']
+            imported_count += 1
+
+        for item_type, (_, line_model) in LINE_TYPES.items():
+            _save_lines(line_model, list(created[item_type].values()), list(updated[item_type].values()))
+            created_count += len(created[item_type])
+            updated_count += len(updated[item_type])
+
+        budgets_by_pk = {budget.pk: budget for budget in budgets.values()}
+        BudgetAuditLog.objects.bulk_create([
+            BudgetAuditLog(
+                budget=budgets_by_pk[budget_id],
+                church=church,
+                item_type='budget',
+                action='import',
+                user=user,
+                changes=changes,
+                notes=_audit_note(changes),
+            )
+            for budget_id, changes in diffs.items()
+        ])
+
+    return {
+        'status': 'Import complete',
+        'imported': imported_count,
+        'created': created_count,
+        'updated': updated_count,
+        'errors': [f"Row {number}: {message}" for number, message in sorted(errors)]
+    }
@@ -0,0 +1,7 @@
+from core.jobs import register, iter_upload_lines
+from .importers import import_budget_items
+
+
+@register('finance.import_budget')
+def import_budget(job):
+    return import_budget_items(iter_upload_lines(job), job.church, user=job.created_by)
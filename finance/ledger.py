@@ -0,0 +1,175 @@
+"""
+Running bank balances.
+
+``BankAccount.current_balance`` is the account's opening balance plus every
+income minus every expense recorded against it. It is never recomputed from
+the full history: each income or expense that is created, edited or deleted
+adds its difference with an ``F()`` update (see finance.signals; bulk paths
+call ``record_transactions`` themselves), so concurrent writers can't lose
+each other's changes.
+
+Month-end ``BankBalanceSnapshot`` rows keep the balance at the close of a
+day. They are adjusted by the same ``F()`` updates when a transaction on or
+before their date changes, so the balance on any date is the latest snapshot
+before it plus the few transactions since. The ``reconcile_bank_balances``
+command checks both against the full history and writes missing snapshots.
+"""
+import calendar
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from core.aggregates import MONEY
+
+from .models import BankAccount, BankBalanceSnapshot, Expense, Income
+
+# Transaction model -> effect on the balance of its bank account
+SIGNS = {
+    Income: 1,
+    Expense: -1,
+}
+BATCH_SIZE = 500
+ZERO = Decimal('0')
+
+
+def balance_changes(transactions, sign):
+    """(account id, date, delta) of incomes (sign 1) or expenses (sign -1)"""
+    return [
+        (transaction.bank_account_id, transaction.transaction_date, sign * Decimal(transaction.amount))
+        for transaction in transactions
+    ]
+
+
+def apply_changes(changes):
+    """Add (account id, date, delta) changes to the running balances and to the snapshots on or after each date"""
+    by_account = defaultdict(lambda: defaultdict(Decimal))
+    for account_id, day, delta in changes:
+        if account_id is not None and delta:
+            by_account[account_id][day] += delta
+
+    for account_id, deltas in by_account.items():
+        total = sum(deltas.values(), ZERO)
+        if total:
+            # update() skips auto_now; differential backups select accounts by updated_at
+            BankAccount._base_manager.filter(pk=account_id).update(
+                current_balance=F('current_balance') + total, updated_at=timezone.now()
+            )
+
+        # A snapshot takes every change dated on or before it: one UPDATE per account
+        cumulative = ZERO
+        cases = []
+        for day in sorted(deltas):
+            cumulative += deltas[day]
+            cases.append(When(date__gte=day, then=Value(cumulative, output_field=MONEY)))
+        BankBalanceSnapshot._base_manager.filter(account_id=account_id, date__gte=min(deltas)).update(
+            balance=F('balance') + Case(*reversed(cases), default=Value(ZERO), output_field=MONEY)
+        )
+
+
+def record_transactions(transactions):
+    """Add newly saved incomes or expenses (all of one model) to the balances, for writes that skip the signals"""
+    transactions = list(transactions)
+    if transactions:
+        apply_changes(balance_changes(transactions, SIGNS[type(transactions[0])]))
+
+
+def _flow(model, since=None, through=None):
+    rows = model._base_manager.all()
+    if since:
+        rows = rows.filter(transaction_date__gt=since)
+    if through:
+        rows = rows.filter(transaction_date__lte=through)
+    return rows
+
+
+def balance_as_of(account, day):
+    """(balance at the end of ``day``, date of the snapshot it started from or None)"""
+    snapshot = (
+        BankBalanceSnapshot._base_manager.filter(account=account, date__lte=day)
+        .order_by('-date').values_list('date', 'balance').first()
+    )
+    since, balance = snapshot or (None, account.opening_balance)
+    for model, sign in SIGNS.items():
+        total = _flow(model, since, day).filter(bank_account=account).aggregate(total=Sum('amount'))['total']
+        balance += sign * (total or ZERO)
+    return balance, since
+
+
+def _net_flow(account_ref, through_ref=None):
+    """Income minus expenses of the account at ``OuterRef(account_ref)``, up to ``OuterRef(through_ref)`` if given"""
+    total = Value(ZERO, output_field=MONEY)
+    for model, sign in SIGNS.items():
+        rows = model._base_manager.filter(bank_account=OuterRef(account_ref))
+        if through_ref:
+            rows = rows.filter(transaction_date__lte=OuterRef(through_ref))
+        rows = rows.order_by().values('bank_account').annotate(total=Sum('amount')).values('total')
+        flow = Coalesce(Subquery(rows, output_field=MONEY), Value(ZERO), output_field=MONEY)
+        total = total + flow if sign > 0 else total - flow
+    return total
+
+
+def expected_balance():
+    """Expression over BankAccount: opening balance plus the full history"""
+    return F('opening_balance') + _net_flow('pk')
+
+
+def with_expected_balance(accounts):
+    return accounts.annotate(expected_balance=expected_balance())
+
+
+def with_expected_snapshot_balance(snapshots):
+    """Annotate BankBalanceSnapshots with ``expected_balance`` from the full history up to their date"""
+    return snapshots.annotate(expected_balance=F('account__opening_balance') + _net_flow('account', 'date'))
+
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def take_month_end_snapshots(accounts, until=None):
+    """Write the missing month-end snapshots of ``accounts`` from their first transaction up to ``until``.
+
+    ``until`` defaults to the end of the last completed month. Balances come
+    from one grouped query per transaction model. Returns the number of
+    snapshots written.
+    """
+    if until is None:
+        until = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+    accounts = {account.pk: account for account in accounts}
+    if not accounts:
+        return 0
+
+    monthly = defaultdict(lambda: defaultdict(Decimal))
+    for model, sign in SIGNS.items():
+        rows = (
+            _flow(model, through=until).filter(bank_account__in=accounts)
+            .annotate(month=TruncMonth('transaction_date'))
+            .values('bank_account', 'month')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for row in rows:
+            monthly[row['bank_account']][row['month']] += sign * Decimal(row['total'])
+
+    existing = set(
+        BankBalanceSnapshot._base_manager.filter(account__in=accounts).values_list('account_id', 'date')
+    )
+    snapshots = []
+    for account_id, months in monthly.items():
+        account = accounts[account_id]
+        balance = account.opening_balance
+        month = min(months)
+        while month_end(month) <= until:
+            balance += months.get(month, ZERO)
+            day = month_end(month)
+            if (account_id, day) not in existing:
+                snapshots.append(BankBalanceSnapshot(
+                    account=account, church_id=account.church_id, date=day, balance=balance
+                ))
+            month = day + datetime.timedelta(days=1)
+    BankBalanceSnapshot._base_manager.bulk_create(snapshots, batch_size=BATCH_SIZE)
+    return len(snapshots)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Church
+from finance.budget_store import rebuild_month_amounts
+from finance.models import AnnualBudget
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the long-format budget month rows from the jan..dec columns of the budget lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', help='Slug of a single church to rebuild (default: all churches)')
+        parser.add_argument('--year', type=int, help='Only rebuild the budgets of this year')
+
+    def handle(self, *args, **options):
+        budgets = None
+        if options['church'] or options['year']:
+            budgets = AnnualBudget.admin_objects.all()
+            if options['church']:
+                try:
+                    budgets = budgets.filter(church=Church.objects.get(slug=options['church']))
+                except Church.DoesNotExist:
+                    raise CommandError(f"Church '{options['church']}' not found")
+            if options['year']:
+                budgets = budgets.filter(year=options['year'])
+
+        with transaction.atomic():
+            count = rebuild_month_amounts(budgets)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} budget month rows'))
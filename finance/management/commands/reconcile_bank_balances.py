@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Church
+from finance.ledger import expected_balance, take_month_end_snapshots, with_expected_balance, with_expected_snapshot_balance
+from finance.models import BankAccount, BankBalanceSnapshot
+
+CENT = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Checks the running bank balances and balance snapshots against the full transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', help='Slug of a single church to check (default: all churches)')
+        parser.add_argument('--fix', action='store_true', help='Reset the balances and snapshots that differ')
+        parser.add_argument(
+            '--snapshot', action='store_true',
+            help='Also write the missing month-end snapshots up to the last completed month'
+        )
+
+    def handle(self, *args, **options):
+        accounts = BankAccount.admin_objects.all()
+        if options['church']:
+            try:
+                accounts = accounts.filter(church=Church.objects.get(slug=options['church']))
+            except Church.DoesNotExist:
+                raise CommandError(f"Church '{options['church']}' not found")
+        snapshots = BankBalanceSnapshot.admin_objects.filter(account__in=accounts)
+
+        # One query per table: stored balances next to the balances computed from the history
+        wrong_accounts = []
+        checked = 0
+        for account in with_expected_balance(accounts).iterator():
+            checked += 1
+            expected = Decimal(account.expected_balance).quantize(CENT)
+            if account.current_balance != expected:
+                wrong_accounts.append(account.pk)
+                self.stdout.write(f"{account}: balance {account.current_balance} != {expected}")
+
+        wrong_snapshots = []
+        for snapshot in with_expected_snapshot_balance(snapshots.select_related('account')).iterator():
+            checked += 1
+            expected = Decimal(snapshot.expected_balance).quantize(CENT)
+            if snapshot.balance != expected:
+                self.stdout.write(f"{snapshot.account} on {snapshot.date}: snapshot {snapshot.balance} != {expected}")
+                snapshot.balance = expected
+                wrong_snapshots.append(snapshot)
+
+        mismatched = len(wrong_accounts) + len(wrong_snapshots)
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f'All {checked} balances and snapshots are consistent'))
+        elif options['fix']:
+            with transaction.atomic():
+                # Recomputed in the UPDATE itself so transactions posted meanwhile are not lost
+                BankAccount.admin_objects.filter(pk__in=wrong_accounts).update(
+                    current_balance=expected_balance(), updated_at=timezone.now()
+                )
+                BankBalanceSnapshot.admin_objects.bulk_update(wrong_snapshots, ['balance'], batch_size=500)
+            self.stdout.write(self.style.SUCCESS(f'Reset {mismatched} of {checked} balances and snapshots'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{mismatched} of {checked} balances and snapshots are inconsistent (run with --fix to reset them)'
+            ))
+
+        if options['snapshot']:
+            written = take_month_end_snapshots(accounts)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {written} month-end snapshots'))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:19
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+        ('finance', '0006_alter_expensecategory_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetExpenseMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)])),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finance.annualbudget')),
+                ('church', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.church')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_amounts', to='finance.budgetexpenseitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['budget', 'month'], name='finance_expense_month_idx')],
+                'unique_together': {('item', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BudgetIncomeMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)])),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='finance.annualbudget')),
+                ('church', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.church')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_amounts', to='finance.budgetincomeitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['budget', 'month'], name='finance_income_month_idx')],
+                'unique_together': {('item', 'month')},
+            },
+        ),
+    ]
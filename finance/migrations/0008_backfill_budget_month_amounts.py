@@ -0,0 +1,37 @@
+from django.db import migrations
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+STORES = [
+    ('BudgetIncomeItem', 'BudgetIncomeMonth'),
+    ('BudgetExpenseItem', 'BudgetExpenseMonth'),
+]
+
+
+def backfill(apps, schema_editor):
+    db = schema_editor.connection.alias
+    for item_name, month_name in STORES:
+        Item = apps.get_model('finance', item_name)
+        Month = apps.get_model('finance', month_name)
+        rows = [
+            Month(item_id=item.pk, budget_id=item.budget_id, church_id=item.church_id,
+                  month=number, amount=getattr(item, month))
+            for item in Item.objects.using(db).iterator()
+            for number, month in enumerate(MONTHS, start=1)
+        ]
+        Month.objects.using(db).bulk_create(rows, batch_size=500)
+
+
+def clear(apps, schema_editor):
+    for _, month_name in STORES:
+        apps.get_model('finance', month_name).objects.using(schema_editor.connection.alias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_budget_month_amounts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_backfill_budget_month_amounts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='budgetauditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('delete', 'Deleted'), ('lock', 'Locked'), ('unlock', 'Unlocked'), ('import', 'Imported')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+        ('finance', '0009_budgetauditlog_import_action'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankaccount',
+            name='opening_balance',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Balance before the first transaction recorded in the system', max_digits=15),
+        ),
+        migrations.AlterField(
+            model_name='bankaccount',
+            name='current_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=15),
+        ),
+        migrations.CreateModel(
+            name='BankBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='finance.bankaccount')),
+                ('church', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.church')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('account', 'date')},
+            },
+        ),
+    ]
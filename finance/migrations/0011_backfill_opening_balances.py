@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def _totals(model, db):
+    rows = model.objects.using(db).values('bank_account').annotate(total=Sum('amount')).order_by()
+    return {row['bank_account']: row['total'] or Decimal('0') for row in rows}
+
+
+def backfill(apps, schema_editor):
+    # Keep the balance on record as today's balance and derive the opening
+    # balance from the transactions recorded so far
+    db = schema_editor.connection.alias
+    BankAccount = apps.get_model('finance', 'BankAccount')
+    incomes = _totals(apps.get_model('finance', 'Income'), db)
+    expenses = _totals(apps.get_model('finance', 'Expense'), db)
+    accounts = list(BankAccount.objects.using(db))
+    for account in accounts:
+        net = incomes.get(account.pk, Decimal('0')) - expenses.get(account.pk, Decimal('0'))
+        account.opening_balance = account.current_balance - net
+    BankAccount.objects.using(db).bulk_update(accounts, ['opening_balance'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_bank_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
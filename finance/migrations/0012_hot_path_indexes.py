@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+        ('finance', '0011_backfill_opening_balances'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['church', 'transaction_date'], name='expense_church_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['bank_account', 'transaction_date'], name='expense_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['church', 'transaction_date'], name='income_church_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['bank_account', 'transaction_date'], name='income_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='remittance',
+            index=models.Index(condition=models.Q(('paid', False)), fields=['church', 'income'], name='remittance_unpaid_idx'),
+        ),
+    ]
@@ -1,6 +1,11 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from core.models import TenantModel
+from core.sequences import existing_number_seed, next_number
 
 
 class BankAccount(TenantModel):
@@ -13,7 +18,12 @@ class BankAccount(TenantModel):
         ('checking', 'Checking Account'),
         ('project', 'Project Account'),
     ])
-    current_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    opening_balance = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0,
+        help_text="Balance before the first transaction recorded in the system"
+    )
+    # Running balance maintained by finance.ledger as incomes and expenses are recorded
+    current_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0, editable=False)
     is_active = models.BooleanField(default=True)
     notes = models.TextField(blank=True)
     
@@ -22,11 +32,50 @@ class BankAccount(TenantModel):
     
     def __str__(self):
         return f"{self.account_name} - {self.bank_name}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            if not self.opening_balance and self.current_balance:
+                # Accounts created with a balance (demo data, older scripts) open with it
+                self.opening_balance = self.current_balance
+            self.current_balance = self.opening_balance
+            return super().save(*args, **kwargs)
+
+        # Never write the running balance from memory: it may be stale against concurrent F() updates
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'current_balance'
+            ]
+        previous = BankAccount._base_manager.filter(pk=self.pk).values_list('opening_balance', flat=True).first()
+        super().save(*args, **kwargs)
+        if previous is not None and 'opening_balance' in kwargs['update_fields'] and previous != self.opening_balance:
+            delta = Decimal(self.opening_balance) - previous
+            BankAccount._base_manager.filter(pk=self.pk).update(
+                current_balance=F('current_balance') + delta, updated_at=timezone.now()
+            )
+            BankBalanceSnapshot._base_manager.filter(account=self).update(balance=F('balance') + delta)
+            self.refresh_from_db(fields=['current_balance', 'updated_at'])
     
     class Meta:
         ordering = ['account_name']
 
 
+class BankBalanceSnapshot(TenantModel):
+    """Balance of a bank account at the end of a day (month ends, see finance.ledger)"""
+    account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='balance_snapshots')
+    date = models.DateField()
+    balance = models.DecimalField(max_digits=15, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.account} on {self.date}: {self.balance}"
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['account', 'date']
+
+
 class IncomeCategory(TenantModel):
     """Income categories/streams"""
     name = models.CharField(max_length=100)
@@ -136,6 +185,12 @@ class Income(TenantModel):
     
     class Meta:
         ordering = ['-transaction_date']
+        indexes = [
+            # Tenant lists, date-range totals and dashboard rollups
+            models.Index(fields=['church', 'transaction_date'], name='income_church_date_idx'),
+            # Bank balances as of a date (finance.ledger)
+            models.Index(fields=['bank_account', 'transaction_date'], name='income_account_date_idx'),
+        ]
 
 
 class Expense(TenantModel):
@@ -168,6 +223,10 @@ class Expense(TenantModel):
     
     class Meta:
         ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['church', 'transaction_date'], name='expense_church_date_idx'),
+            models.Index(fields=['bank_account', 'transaction_date'], name='expense_account_date_idx'),
+        ]
 
 
 class Remittance(TenantModel):
@@ -188,6 +247,10 @@ class Remittance(TenantModel):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Outstanding remittances are a small, hot subset of an ever-growing table
+            models.Index(fields=['church', 'income'], condition=models.Q(paid=False), name='remittance_unpaid_idx'),
+        ]
 
 
 class Assessment(TenantModel):
@@ -223,6 +286,10 @@ class Assessment(TenantModel):
         ordering = ['-due_date']
 
 
+# Monthly columns of the budget lines, in calendar order
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
 class AnnualBudget(TenantModel):
     """Annual Budget for the church with approval control"""
     BUDGET_STATUS = [
@@ -265,7 +332,25 @@ class AnnualBudget(TenantModel):
         unique_together = ['church', 'year']
 
 
-class BudgetIncomeItem(TenantModel):
+class MonthlyBudgetLine:
+    """Mixin of the budget line models.
+
+    The jan..dec columns are the editing surface; every save mirrors them
+    into the long-format month rows (``monthly_amounts``) that budget totals
+    and period comparisons aggregate over. Bulk writes must call
+    finance.budget_store.sync_month_amounts() themselves.
+    """
+
+    def month_values(self):
+        return [getattr(self, month) for month in MONTHS]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .budget_store import sync_month_amounts
+        sync_month_amounts([self])
+
+
+class BudgetIncomeItem(MonthlyBudgetLine, TenantModel):
     """Budget targets for income categories"""
     budget = models.ForeignKey(AnnualBudget, on_delete=models.CASCADE, related_name='income_items')
     category = models.ForeignKey(IncomeCategory, on_delete=models.CASCADE)
@@ -301,7 +386,7 @@ class BudgetIncomeItem(TenantModel):
         unique_together = [['budget', 'category'], ['church', 'budget', 'category']]
 
 
-class BudgetExpenseItem(TenantModel):
+class BudgetExpenseItem(MonthlyBudgetLine, TenantModel):
     """Budget limits for expense categories"""
     budget = models.ForeignKey(AnnualBudget, on_delete=models.CASCADE, related_name='expense_items')
     category = models.ForeignKey(ExpenseCategory, on_delete=models.CASCADE)
@@ -336,6 +421,32 @@ class BudgetExpenseItem(TenantModel):
         unique_together = [['budget', 'category'], ['church', 'budget', 'category']]
 
 
+class BudgetMonthAmount(TenantModel):
+    """One month of a budget line, in long format (item, month, amount)"""
+    budget = models.ForeignKey(AnnualBudget, on_delete=models.CASCADE, related_name='+')
+    month = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(12)])
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class BudgetIncomeMonth(BudgetMonthAmount):
+    item = models.ForeignKey(BudgetIncomeItem, on_delete=models.CASCADE, related_name='monthly_amounts')
+
+    class Meta:
+        unique_together = ['item', 'month']
+        indexes = [models.Index(fields=['budget', 'month'], name='finance_income_month_idx')]
+
+
+class BudgetExpenseMonth(BudgetMonthAmount):
+    item = models.ForeignKey(BudgetExpenseItem, on_delete=models.CASCADE, related_name='monthly_amounts')
+
+    class Meta:
+        unique_together = ['item', 'month']
+        indexes = [models.Index(fields=['budget', 'month'], name='finance_expense_month_idx')]
+
+
 class BudgetAuditLog(TenantModel):
     """Audit trail for budget changes"""
     ACTION_CHOICES = [
@@ -344,6 +455,7 @@ class BudgetAuditLog(TenantModel):
         ('delete', 'Deleted'),
         ('lock', 'Locked'),
         ('unlock', 'Unlocked'),
+        ('import', 'Imported'),
     ]
     
     budget = models.ForeignKey(AnnualBudget, on_delete=models.CASCADE, related_name='audit_logs')
@@ -391,18 +503,13 @@ class Asset(TenantModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    CODE_PREFIX = 'AST'
+    CODE_WIDTH = 4
+    
     def save(self, *args, **kwargs):
         if not self.asset_code:
-            # simple auto-increment logic
-            last = Asset.objects.filter(church=self.church).order_by('-id').first()
-            if last and last.asset_code and last.asset_code.startswith('AST-'):
-                try:
-                    num = int(last.asset_code.split('-')[1])
-                    self.asset_code = f"AST-{num + 1:04d}"
-                except (IndexError, ValueError):
-                    self.asset_code = f"AST-{last.id + 1:04d}"
-            else:
-                self.asset_code = "AST-0001"
+            seed = existing_number_seed(Asset.admin_objects.filter(church=self.church), 'asset_code', self.CODE_PREFIX)
+            self.asset_code = next_number(self.church, self.CODE_PREFIX, self.CODE_WIDTH, seed)
         super().save(*args, **kwargs)
     
     def __str__(self):
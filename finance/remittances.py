@@ -0,0 +1,171 @@
+"""
+Remittance engine: the share of each income owed to the higher courts.
+
+The active RemittanceSettings of a church are resolved once into a map of
+income category -> [(setting, percentage)] and cached. Each cache entry is
+stored with a stamp of the church's settings (count and latest
+``updated_at``); saving or deleting a setting, or changing its categories,
+touches that stamp (see finance.signals), so every process picks up new
+percentages on its next lookup.
+
+Remittance rows for any number of incomes are then written with a single
+bulk insert, and ``recalculate_remittances`` re-applies the current rules to
+a date range when percentages change.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from core.models import get_current_church
+
+from .models import Income, Remittance, RemittanceSettings
+
+CACHE_TIMEOUT = 60 * 60 * 24
+CENT = Decimal('0.01')
+BATCH_SIZE = 500
+
+
+def _cache_key(church_id):
+    return f'finance:remittance-rules:{church_id}'
+
+
+def _stamp(church_id):
+    settings = RemittanceSettings._base_manager.filter(church_id=church_id)
+    return tuple(settings.aggregate(Count('pk'), Max('updated_at')).values())
+
+
+def clear_rules(church_id):
+    cache.delete(_cache_key(church_id))
+
+
+def remittance_rules(church_id):
+    """{income category id: [(setting id, percentage)]} of the church's active settings"""
+    key = _cache_key(church_id)
+    stamp = _stamp(church_id)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    Link = RemittanceSettings.applicable_to_categories.through
+    rules = defaultdict(list)
+    links = (
+        Link.objects
+        .filter(remittancesettings__church_id=church_id, remittancesettings__is_active=True)
+        .values_list('incomecategory_id', 'remittancesettings_id', 'remittancesettings__percentage')
+        .order_by('remittancesettings_id')
+    )
+    for category_id, setting_id, percentage in links:
+        rules[category_id].append((setting_id, percentage))
+    rules = dict(rules)
+    cache.set(key, (stamp, rules), CACHE_TIMEOUT)
+    return rules
+
+
+def remittance_amount(amount, percentage):
+    return (amount * percentage / Decimal('100')).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _church_id(income):
+    # Incomes entered without a church belong to the request's church
+    if income.church_id is None:
+        church = get_current_church()
+        return church.pk if church else None
+    return income.church_id
+
+
+def build_remittances(incomes, skip=None):
+    """Unsaved Remittance rows for saved incomes under their church's current rules.
+
+    ``skip`` is a set of (income id, setting id) pairs that already have a row.
+    """
+    skip = skip or set()
+    rules = {}
+    rows = []
+    for income in incomes:
+        church_id = _church_id(income)
+        if church_id not in rules:
+            rules[church_id] = remittance_rules(church_id)
+        for setting_id, percentage in rules[church_id].get(income.category_id, []):
+            if (income.pk, setting_id) in skip:
+                continue
+            rows.append(Remittance(
+                income=income,
+                church_id=church_id,
+                remittance_setting_id=setting_id,
+                amount=remittance_amount(income.amount, percentage),
+                percentage_used=percentage,
+            ))
+    return rows
+
+
+def _refresh_dashboard(incomes):
+    from dashboard.summaries import schedule_refresh
+
+    dates = defaultdict(set)
+    for income in incomes:
+        dates[_church_id(income)].add(income.transaction_date)
+    for church_id, days in dates.items():
+        # bulk_create/update bypass the rollup signals
+        schedule_refresh(church_id, days, ('remittances',))
+
+
+def _mark_calculated(incomes):
+    """Set remittances_calculated on an Income queryset.
+
+    update() skips auto_now, and differential backups select incomes by
+    updated_at, so it is set here too.
+    """
+    return incomes.update(remittances_calculated=True, updated_at=timezone.now())
+
+
+def calculate_remittances(incomes):
+    """Create the remittances of newly saved incomes and mark them calculated. Returns the rows created"""
+    incomes = list(incomes)
+    if not incomes:
+        return []
+    with transaction.atomic():
+        rows = Remittance._base_manager.bulk_create(build_remittances(incomes), batch_size=BATCH_SIZE)
+        income_ids = [income.pk for income in incomes]
+        for start in range(0, len(income_ids), BATCH_SIZE):
+            _mark_calculated(Income._base_manager.filter(pk__in=income_ids[start:start + BATCH_SIZE]))
+    for income in incomes:
+        income.remittances_calculated = True
+    _refresh_dashboard(incomes)
+    return rows
+
+
+def recalculate_remittances(incomes):
+    """Re-apply the current rules to an Income queryset (e.g. a date range after a percentage change).
+
+    Unpaid remittances are replaced. Paid ones (or ones already linked to a
+    payment expense) are history and are kept as they are; a rule that
+    already has such a row for an income is not added again. Returns a
+    report of the changes.
+    """
+    with transaction.atomic():
+        existing = Remittance._base_manager.filter(income__in=incomes.values('pk'))
+        unpaid = existing.filter(paid=False, expense__isnull=True)
+        kept = set(existing.exclude(paid=False, expense__isnull=True).values_list('income_id', 'remittance_setting_id'))
+        replaced = list(unpaid.values_list('amount', flat=True))
+        unpaid.delete()
+
+        income_list = list(incomes.only('pk', 'church_id', 'category_id', 'amount', 'transaction_date'))
+        rows = Remittance._base_manager.bulk_create(build_remittances(income_list, skip=kept), batch_size=BATCH_SIZE)
+        _mark_calculated(incomes)
+    _refresh_dashboard(income_list)
+
+    old_total = sum(replaced, Decimal('0'))
+    new_total = sum((row.amount for row in rows), Decimal('0'))
+    return {
+        'incomes': len(income_list),
+        'removed': len(replaced),
+        'created': len(rows),
+        'kept': len(kept),
+        'old_total': old_total,
+        'new_total': new_total,
+        'difference': new_total - old_total,
+    }
@@ -107,24 +107,39 @@ class BudgetAuditLogSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class AnnualBudgetSerializer(serializers.ModelSerializer):
-    income_items = BudgetIncomeItemSerializer(many=True, read_only=True)
-    expense_items = BudgetExpenseItemSerializer(many=True, read_only=True)
-    audit_logs = BudgetAuditLogSerializer(many=True, read_only=True)
+    """Budget header. Lines and audit logs are paged separately (BudgetViewSet.lines / .audit)"""
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     total_income = serializers.SerializerMethodField()
     total_expense = serializers.SerializerMethodField()
+    income_line_count = serializers.SerializerMethodField()
+    expense_line_count = serializers.SerializerMethodField()
     approved_by_name = serializers.CharField(source='approved_by.get_full_name', read_only=True)
     
     class Meta:
         model = AnnualBudget
         fields = '__all__'
         
+    # The figures below are annotated by BudgetViewSet (finance.budget_store.with_budget_totals)
     def get_total_income(self, obj):
+        if hasattr(obj, 'income_total'):
+            return obj.income_total
         return sum(item.total for item in obj.income_items.all())
 
     def get_total_expense(self, obj):
+        if hasattr(obj, 'expense_total'):
+            return obj.expense_total
         return sum(item.total for item in obj.expense_items.all())
 
+    def get_income_line_count(self, obj):
+        if hasattr(obj, 'income_lines'):
+            return obj.income_lines
+        return obj.income_items.count()
+
+    def get_expense_line_count(self, obj):
+        if hasattr(obj, 'expense_lines'):
+            return obj.expense_lines
+        return obj.expense_items.count()
+
 class AssetCategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = AssetCategory
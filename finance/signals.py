@@ -0,0 +1,62 @@
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .ledger import SIGNS, apply_changes, balance_changes
+from .models import RemittanceSettings
+from .remittances import clear_rules
+
+
+@receiver([post_save, post_delete], sender=RemittanceSettings, dispatch_uid='remittance_settings_changed')
+def remittance_settings_changed(sender, instance, raw=False, **kwargs):
+    clear_rules(instance.church_id)
+
+
+@receiver(m2m_changed, sender=RemittanceSettings.applicable_to_categories.through,
+          dispatch_uid='remittance_categories_changed')
+def remittance_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the category side: every setting of the category may be affected
+        settings = RemittanceSettings._base_manager.filter(pk__in=pk_set or [])
+    else:
+        settings = RemittanceSettings._base_manager.filter(pk=instance.pk)
+    # Touch the settings so other processes see the change in remittances._stamp()
+    church_ids = set(settings.values_list('church_id', flat=True))
+    settings.update(updated_at=timezone.now())
+    for church_id in church_ids:
+        clear_rules(church_id)
+
+
+def _remember_posting(sender, instance, raw=False, **kwargs):
+    """Keep what an edited transaction contributed to the balances before the edit"""
+    if raw or not instance.pk:
+        return
+    instance._ledger_previous = (
+        sender._base_manager.filter(pk=instance.pk)
+        .values_list('bank_account_id', 'transaction_date', 'amount').first()
+    )
+
+
+def _post_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sign = SIGNS[sender]
+    changes = balance_changes([instance], sign)
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        account_id, day, amount = previous
+        changes.append((account_id, day, -sign * amount))
+    instance._ledger_previous = None
+    apply_changes(changes)
+
+
+def _unpost_transaction(sender, instance, **kwargs):
+    apply_changes(balance_changes([instance], -SIGNS[sender]))
+
+
+for model in SIGNS:
+    pre_save.connect(_remember_posting, sender=model, dispatch_uid=f'ledger_pre_save_{model.__name__}')
+    post_save.connect(_post_transaction, sender=model, dispatch_uid=f'ledger_post_save_{model.__name__}')
+    post_delete.connect(_unpost_transaction, sender=model, dispatch_uid=f'ledger_post_delete_{model.__name__}')
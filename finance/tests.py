@@ -0,0 +1,619 @@
+import io
+import itertools
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import backup_utils
+from core.models import BackupConfiguration, Church, UserProfile
+from .budget_performance import ZERO, budget_performance, elapsed_months
+from .budget_store import period_totals, rebuild_month_amounts, sync_month_amounts, with_budget_totals
+from .importers import import_budget_items
+from .models import (
+    MONTHS, AnnualBudget, BankAccount, BankBalanceSnapshot, BudgetAuditLog, BudgetExpenseItem, BudgetIncomeItem,
+    Expense, ExpenseCategory, Income, IncomeCategory, Remittance, RemittanceSettings,
+)
+from .ledger import take_month_end_snapshots
+from .remittances import calculate_remittances, recalculate_remittances
+
+
+class LedgerBackupTests(TestCase):
+    """Running balances must survive a differential backup and restore"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        backup_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.addCleanup(backup_dir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        BackupConfiguration.objects.create(storage_path=backup_dir.name)
+        # Archive names have one-second precision: give each backup its own second
+        seconds = itertools.count()
+        clock = mock.patch.object(backup_utils, 'datetime', **{
+            'now.side_effect': lambda: datetime(2026, 3, 1) + timedelta(seconds=next(seconds)),
+        })
+        clock.start()
+        self.addCleanup(clock.stop)
+
+        self.church = Church.objects.create(name='Ledger Church')
+        self.account = BankAccount.objects.create(
+            church=self.church, account_name='Main', bank_name='Bank', account_number='1',
+            account_type='checking', opening_balance=Decimal('100.00'),
+        )
+        self.category = IncomeCategory.objects.create(church=self.church, name='Tithe')
+
+    def test_balance_change_reaches_the_next_differential(self):
+        backup_utils.create_differential_backup()
+        Income.objects.create(
+            church=self.church, category=self.category, bank_account=self.account,
+            amount=Decimal('250.00'), transaction_date=date(2026, 3, 1), payment_method='cash',
+        )
+        backup, _ = backup_utils.create_differential_backup()
+        self.assertIsNotNone(backup.parent_id)
+
+        backup_utils.restore_differential_backup(backup)
+
+        self.assertEqual(BankAccount.admin_objects.get(pk=self.account.pk).current_balance, Decimal('350.00'))
+
+
+class RemittanceEngineTests(TestCase):
+    """Remittances are built in bulk from the church's cached rules"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Remittance Church')
+        cls.account = BankAccount.objects.create(
+            church=cls.church, account_name='Main', bank_name='Bank', account_number='1', account_type='checking',
+        )
+        cls.tithe = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.rent = IncomeCategory.objects.create(church=cls.church, name='Hall rent')
+        cls.synod = RemittanceSettings.objects.create(church=cls.church, remittance_type='synod', percentage=10)
+        cls.synod.applicable_to_categories.set([cls.tithe, cls.rent])
+        cls.presbytery = RemittanceSettings.objects.create(church=cls.church, remittance_type='presbytery', percentage=5)
+        cls.presbytery.applicable_to_categories.set([cls.tithe])
+
+    def add_income(self, category, amount):
+        return Income.objects.create(
+            church=self.church, category=category, bank_account=self.account, amount=Decimal(amount),
+            transaction_date=date(2026, 3, 1), payment_method='cash',
+        )
+
+    def amounts(self, income):
+        return dict(Remittance.objects.filter(income=income).values_list('remittance_setting', 'amount'))
+
+    def test_calculate_creates_a_row_per_rule_and_marks_incomes(self):
+        tithe, rent = self.add_income(self.tithe, '200.00'), self.add_income(self.rent, '55.55')
+        before = timezone.now()
+
+        rows = calculate_remittances([tithe, rent])
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(self.amounts(tithe), {self.synod.pk: Decimal('20.00'), self.presbytery.pk: Decimal('10.00')})
+        self.assertEqual(self.amounts(rent), {self.synod.pk: Decimal('5.56')})
+        for income in Income.objects.filter(pk__in=[tithe.pk, rent.pk]):
+            self.assertTrue(income.remittances_calculated)
+            # Picked up by the next differential backup
+            self.assertGreaterEqual(income.updated_at, before)
+
+    def test_recalculate_replaces_unpaid_and_keeps_paid(self):
+        income = self.add_income(self.tithe, '200.00')
+        calculate_remittances([income])
+        Remittance.objects.filter(income=income, remittance_setting=self.presbytery).update(paid=True)
+        self.synod.percentage = 12
+        self.synod.save()
+        self.presbytery.percentage = 8
+        self.presbytery.save()
+
+        report = recalculate_remittances(Income.objects.filter(pk=income.pk))
+
+        self.assertEqual(self.amounts(income), {self.synod.pk: Decimal('24.00'), self.presbytery.pk: Decimal('10.00')})
+        self.assertEqual((report['removed'], report['created'], report['kept']), (1, 1, 1))
+        self.assertEqual(report['difference'], Decimal('4.00'))
+
+
+class BulkTransactionTests(TestCase):
+    """POST income/bulk/ creates rows exactly as one create per row would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Bulk Church')
+        cls.user = User.objects.create_user('finance-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.account = BankAccount.objects.create(
+            church=cls.church, account_name='Main', bank_name='Bank', account_number='1', account_type='checking',
+        )
+        cls.category = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        setting = RemittanceSettings.objects.create(church=cls.church, remittance_type='synod', percentage=10)
+        setting.applicable_to_categories.set([cls.category])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def row(self, amount):
+        return {
+            'category': self.category.pk, 'bank_account': self.account.pk, 'amount': amount,
+            'transaction_date': '2026-03-01', 'payment_method': 'cash',
+        }
+
+    def test_bulk_and_single_create_assign_the_requesting_church(self):
+        single = self.client.post('/api/finance/income/', self.row('100.00'), content_type='application/json')
+        bulk = self.client.post(
+            '/api/finance/income/bulk/', [self.row('20.00'), self.row('30.00')], content_type='application/json'
+        )
+
+        self.assertEqual(single.status_code, 201)
+        self.assertEqual(bulk.status_code, 201)
+        self.assertEqual([row['row'] for row in bulk.json()['results']], [1, 2])
+        incomes = Income.objects.order_by('pk')
+        self.assertEqual([income.church_id for income in incomes], [self.church.pk] * 3)
+        self.assertEqual([income.created_by_id for income in incomes], [self.user.pk] * 3)
+        self.assertTrue(all(income.remittances_calculated for income in incomes))
+        self.assertEqual(Remittance.objects.filter(church=self.church).count(), 3)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.current_balance, Decimal('150.00'))
+
+    def test_an_invalid_row_saves_nothing(self):
+        response = self.client.post(
+            '/api/finance/income/bulk/', [self.row('20.00'), self.row('-5')], content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [2])
+        self.assertFalse(Income.objects.exists())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.current_balance, Decimal('0.00'))
+
+
+class BudgetImportTests(TestCase):
+    """The budget CSV import matches rows in memory and audits each budget once"""
+
+    HEADER = 'Year,Type,Category,Jan,Feb,Mar\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Budget Church')
+        cls.tithe = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        IncomeCategory.objects.create(church=cls.church, name='Retired', is_active=False)
+        cls.fuel = ExpenseCategory.objects.create(church=cls.church, name='Fuel and Transport')
+        cls.budget = AnnualBudget.objects.create(church=cls.church, year=2026)
+        cls.line = BudgetIncomeItem.objects.create(church=cls.church, budget=cls.budget, category=cls.tithe, jan=10)
+        AnnualBudget.objects.create(church=cls.church, year=2025, is_locked=True)
+
+    def run_import(self, rows):
+        return import_budget_items([self.HEADER] + [row + '\n' for row in rows], self.church)
+
+    def test_lines_are_created_and_updated(self):
+        report = self.run_import([
+            '2026,income,  TITHE ,100,"1,000",0',
+            '2026,Expense,fuel  and transport,0,20,0',
+            '2027,income,Tithe,0,0,5',
+        ])
+
+        self.assertEqual(report['errors'], [])
+        self.assertEqual((report['imported'], report['created'], report['updated']), (3, 2, 1))
+        self.line.refresh_from_db()
+        self.assertEqual((self.line.jan, self.line.feb), (Decimal('100'), Decimal('1000')))
+        self.assertEqual(BudgetIncomeItem.objects.filter(budget=self.budget).count(), 1)
+        self.assertEqual(BudgetExpenseItem.objects.get(budget=self.budget, category=self.fuel).feb, Decimal('20'))
+        self.assertEqual(BudgetIncomeItem.objects.get(budget__year=2027, category=self.tithe).mar, Decimal('5'))
+
+    def test_each_budget_gets_one_audit_entry(self):
+        self.run_import([
+            '2026,income,Tithe,100,0,0',
+            '2026,income,Tithe,100,50,0',
+            '2026,expense,Fuel and Transport,0,20,0',
+            '2027,income,Tithe,0,0,5',
+        ])
+
+        logs = {log.budget.year: log for log in BudgetAuditLog.objects.filter(action='import')}
+        self.assertEqual(sorted(logs), [2026, 2027])
+        self.assertEqual(logs[2026].notes, 'CSV import: 1 lines created, 1 updated')
+        self.assertEqual(logs[2026].changes['income']['Tithe'], {
+            'action': 'update', 'months': {'jan': {'old': 10.0, 'new': 100.0}, 'feb': {'old': 0.0, 'new': 50.0}},
+        })
+        self.assertEqual(logs[2026].changes['expense']['Fuel and Transport']['action'], 'create')
+
+    def test_categories_added_elsewhere_are_found(self):
+        cache.clear()
+        self.run_import(['2026,income,Tithe,1,0,0'])
+        # Created without the signals that drop the cached categories, as in another process
+        ExpenseCategory.admin_objects.bulk_create([ExpenseCategory(church=self.church, name='Electricity')])
+
+        report = self.run_import(['2026,expense,Electricity,0,0,40'])
+
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(BudgetExpenseItem.objects.get(budget=self.budget, category__name='Electricity').mar, Decimal('40'))
+
+    def test_bad_rows_are_reported(self):
+        report = self.run_import([
+            'soon,income,Tithe,1,0,0',
+            '2026,gift,Tithe,1,0,0',
+            '2026,income,Retired,1,0,0',
+            '2026,income,Building Fund,1,0,0',
+            '2025,income,Tithe,1,0,0',
+            '2026,income,,1,0,0',
+        ])
+
+        self.assertEqual(report['imported'], 0)
+        self.assertEqual(report['errors'], [
+            "Row 1: Invalid year 'soon'",
+            "Row 2: Invalid type 'gift'",
+            "Row 3: Category 'Retired' not found or inactive",
+            "Row 4: Category 'Building Fund' not found or inactive",
+            'Row 5: Budget for 2025 is locked',
+        ])
+        self.assertFalse(BudgetAuditLog.objects.exists())
+        self.line.refresh_from_db()
+        self.assertEqual(self.line.jan, Decimal('10'))
+
+
+class LedgerReconcileTests(TestCase):
+    """Balances kept by the ledger's F() updates agree with reconcile_bank_balances"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Reconcile Church')
+        cls.main, cls.savings = [
+            BankAccount.objects.create(
+                church=cls.church, account_name=name, bank_name='Bank', account_number=name,
+                account_type='checking', opening_balance=Decimal('100.00'),
+            )
+            for name in ('Main', 'Savings')
+        ]
+        cls.income_category = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.expense_category = ExpenseCategory.objects.create(church=cls.church, name='Fuel')
+
+    def add_income(self, amount, day):
+        return Income.objects.create(
+            church=self.church, category=self.income_category, bank_account=self.main,
+            amount=Decimal(amount), transaction_date=day, payment_method='cash',
+        )
+
+    def add_expense(self, amount, day):
+        return Expense.objects.create(
+            church=self.church, category=self.expense_category, bank_account=self.main,
+            amount=Decimal(amount), transaction_date=day, payment_method='cash', payee_name='Garage',
+            description='Fuel',
+        )
+
+    def reconcile(self, *args):
+        out = io.StringIO()
+        call_command('reconcile_bank_balances', *args, stdout=out)
+        return out.getvalue()
+
+    def balances(self):
+        return list(BankAccount.objects.order_by('pk').values_list('current_balance', flat=True))
+
+    def test_edits_and_deletes_keep_balances_and_snapshots_consistent(self):
+        edited = self.add_income('200.00', date(2026, 1, 5))
+        moved = self.add_expense('50.00', date(2026, 1, 10))
+        deleted = self.add_income('30.00', date(2026, 2, 1))
+        self.assertEqual(take_month_end_snapshots(BankAccount.objects.all(), until=date(2026, 2, 28)), 2)
+
+        edited.amount = Decimal('150.00')
+        edited.save()
+        moved.bank_account = self.savings
+        moved.transaction_date = date(2026, 2, 3)
+        moved.save()
+        deleted.delete()
+
+        self.assertEqual(self.balances(), [Decimal('250.00'), Decimal('50.00')])
+        snapshots = BankBalanceSnapshot.objects.filter(account=self.main).order_by('date')
+        self.assertEqual([s.balance for s in snapshots], [Decimal('250.00'), Decimal('250.00')])
+        self.assertIn('All 4 balances and snapshots are consistent', self.reconcile())
+
+    def test_fix_resets_a_corrupted_balance(self):
+        self.add_income('200.00', date(2026, 3, 1))
+        self.add_expense('20.00', date(2026, 3, 2))
+        BankAccount.objects.filter(pk=self.main.pk).update(current_balance=Decimal('999.00'))
+
+        self.assertIn('1 of 2 balances and snapshots are inconsistent', self.reconcile())
+        self.assertEqual(self.balances()[0], Decimal('999.00'))
+        self.assertIn('Reset 1 of 2', self.reconcile('--fix'))
+        self.assertEqual(self.balances(), [Decimal('280.00'), Decimal('100.00')])
+        self.assertIn('consistent', self.reconcile())
+
+
+class BudgetPerformanceTests(TestCase):
+    """Year-to-date variance and run-rate projection against the completed months"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Performance Church')
+        cls.account = BankAccount.objects.create(
+            church=cls.church, account_name='Main', bank_name='Bank', account_number='1', account_type='checking',
+        )
+        cls.tithe = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.gift = IncomeCategory.objects.create(church=cls.church, name='Gift')
+        cls.fuel = ExpenseCategory.objects.create(church=cls.church, name='Fuel')
+        cls.budget = AnnualBudget.objects.create(church=cls.church, year=2026)
+        BudgetIncomeItem.objects.create(
+            church=cls.church, budget=cls.budget, category=cls.tithe, **{month: 100 for month in MONTHS}
+        )
+        BudgetExpenseItem.objects.create(
+            church=cls.church, budget=cls.budget, category=cls.fuel, **{month: 50 for month in MONTHS}
+        )
+        for category, amount, day in (
+            (cls.tithe, '120.00', date(2026, 1, 4)),
+            (cls.tithe, '80.00', date(2026, 2, 1)),
+            (cls.tithe, '10.00', date(2026, 3, 1)),
+            (cls.gift, '30.00', date(2026, 1, 18)),
+        ):
+            Income.objects.create(
+                church=cls.church, category=category, bank_account=cls.account, amount=Decimal(amount),
+                transaction_date=day, payment_method='cash',
+            )
+        for amount, day in (('60.00', date(2026, 1, 9)), ('40.00', date(2026, 2, 9))):
+            Expense.objects.create(
+                church=cls.church, category=cls.fuel, bank_account=cls.account, amount=Decimal(amount),
+                transaction_date=day, payment_method='cash', payee_name='Garage', description='Fuel',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_only_completed_months_count_as_elapsed(self):
+        self.assertEqual(elapsed_months(2026, date(2025, 12, 31)), 0)
+        self.assertEqual(elapsed_months(2026, date(2026, 1, 10)), 0)
+        self.assertEqual(elapsed_months(2026, date(2026, 3, 5)), 2)
+        self.assertEqual(elapsed_months(2026, date(2026, 3, 31)), 3)
+        self.assertEqual(elapsed_months(2026, date(2026, 12, 31)), 12)
+        self.assertEqual(elapsed_months(2026, date(2027, 1, 1)), 12)
+
+    def test_variance_and_projection(self):
+        report = budget_performance(self.budget, as_of=date(2026, 3, 5))
+
+        self.assertEqual(report['months_elapsed'], 2)
+        tithe, = report['income']
+        self.assertEqual(
+            (tithe['ytd_budgeted'], tithe['ytd_actual'], tithe['ytd_variance']), (Decimal('200.00'), Decimal('200.00'), ZERO)
+        )
+        self.assertEqual((tithe['actual'], tithe['variance']), (Decimal('210.00'), Decimal('-990.00')))
+        self.assertEqual((tithe['projected'], tithe['projected_variance']), (Decimal('1200.00'), ZERO))
+        self.assertEqual(tithe['burn_rate'], 16.7)
+        # Spending under the limit is a positive variance
+        fuel, = report['expense']
+        self.assertEqual((fuel['ytd_actual'], fuel['ytd_variance']), (Decimal('100.00'), ZERO))
+        self.assertEqual((fuel['variance'], fuel['projected']), (Decimal('500.00'), Decimal('600.00')))
+        self.assertEqual(
+            report['unbudgeted_income'], [{'category_id': self.gift.pk, 'category': 'Gift', 'actual': Decimal('30.00')}]
+        )
+        totals = report['totals']['income']
+        self.assertEqual((totals['ytd_actual'], totals['projected']), (Decimal('230.00'), Decimal('1380.00')))
+
+    def test_nothing_is_projected_before_the_first_month_ends(self):
+        report = budget_performance(self.budget, as_of=date(2026, 1, 20))
+
+        self.assertEqual(report['totals']['income']['projected'], ZERO)
+        self.assertEqual(budget_performance(self.budget, elapsed=3)['income'][0]['projected'], Decimal('840.00'))
+
+
+class BudgetStoreTests(TestCase):
+    """The month rows mirror the jan..dec columns however a line is written"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Store Church')
+        cls.tithe = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.fuel = ExpenseCategory.objects.create(church=cls.church, name='Fuel')
+        cls.budget = AnnualBudget.objects.create(church=cls.church, year=2026)
+
+    def setUp(self):
+        self.income = BudgetIncomeItem.objects.create(
+            church=self.church, budget=self.budget, category=self.tithe, jan=100, mar=Decimal('25.50'),
+        )
+        self.expense = BudgetExpenseItem.objects.create(
+            church=self.church, budget=self.budget, category=self.fuel, **{month: 40 for month in MONTHS}
+        )
+
+    def stored_months(self, item):
+        return list(item.monthly_amounts.order_by('month').values_list('amount', flat=True))
+
+    def assertMirrored(self, item):
+        item.refresh_from_db()
+        self.assertEqual(self.stored_months(item), item.month_values())
+        self.assertEqual(
+            list(item.monthly_amounts.values_list('budget_id', 'church_id').distinct()),
+            [(self.budget.pk, self.church.pk)],
+        )
+
+    def test_saving_a_line_updates_its_month_rows(self):
+        self.assertMirrored(self.income)
+
+        self.income.jan = Decimal('80.00')
+        self.income.dec = Decimal('12.25')
+        self.income.save()
+
+        self.assertMirrored(self.income)
+        self.assertEqual(self.income.monthly_amounts.count(), 12)
+
+    def test_bulk_updates_are_mirrored_by_sync_month_amounts(self):
+        self.income.jan, self.income.feb = Decimal('0.00'), Decimal('60.00')
+        self.expense.jun = Decimal('5.00')
+        BudgetIncomeItem.objects.bulk_update([self.income], MONTHS)
+        BudgetExpenseItem.objects.bulk_update([self.expense], MONTHS)
+        # bulk_update skips save(), so the rows are stale until they are synced
+        self.assertEqual(self.stored_months(self.income)[:2], [Decimal('100.00'), Decimal('0.00')])
+
+        self.assertEqual(sync_month_amounts([self.income]), 12)
+        sync_month_amounts([self.expense])
+
+        self.assertMirrored(self.income)
+        self.assertMirrored(self.expense)
+        self.assertEqual(self.income.monthly_amounts.count(), 12)
+
+    def test_totals_read_from_the_month_rows(self):
+        budget = with_budget_totals(AnnualBudget.objects.filter(pk=self.budget.pk)).get()
+
+        self.assertEqual((budget.income_total, budget.expense_total), (Decimal('125.50'), Decimal('480.00')))
+        self.assertEqual((budget.income_lines, budget.expense_lines), (1, 1))
+        self.assertEqual(period_totals('income', [self.budget], 2, 3), {2026: Decimal('25.50')})
+        self.assertEqual(period_totals('expense', [self.budget], 1, 6), {2026: Decimal('240.00')})
+
+    def test_rebuild_restores_missing_rows(self):
+        self.income.monthly_amounts.filter(month__gt=6).delete()
+
+        self.assertEqual(rebuild_month_amounts([self.budget]), 24)
+
+        self.assertMirrored(self.income)
+        self.assertMirrored(self.expense)
+
+
+class BudgetCloneTests(TestCase):
+    """POST budgets/ seeds the lines of a new budget, optionally copied from an earlier year"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Clone Church')
+        cls.user = User.objects.create_user('budget-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.tithe = IncomeCategory.objects.create(church=cls.church, name='Tithe')
+        cls.building = IncomeCategory.objects.create(church=cls.church, name='Building Fund')
+        IncomeCategory.objects.create(church=cls.church, name='Retired', is_active=False)
+        cls.fuel = ExpenseCategory.objects.create(church=cls.church, name='Fuel')
+        cls.source = AnnualBudget.objects.create(church=cls.church, year=2025)
+        BudgetIncomeItem.objects.create(
+            church=cls.church, budget=cls.source, category=cls.tithe, notes='Weekly tithe',
+            jan=Decimal('100.00'), feb=Decimal('33.33'), mar=Decimal('12.35'),
+        )
+        BudgetExpenseItem.objects.create(church=cls.church, budget=cls.source, category=cls.fuel, jan=Decimal('10.00'))
+        other = Church.objects.create(name='Other Church')
+        AnnualBudget.objects.create(church=other, year=2024)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def create(self, **data):
+        return self.client.post('/api/finance/budgets/', data, content_type='application/json')
+
+    def test_lines_are_cloned_with_the_uplift(self):
+        response = self.create(year=2026, clone_previous=True, uplift='10')
+
+        self.assertEqual(response.status_code, 201)
+        budget = AnnualBudget.objects.get(church=self.church, year=2026)
+        self.assertEqual(response.json()['id'], budget.pk)
+        tithe = BudgetIncomeItem.objects.get(budget=budget, category=self.tithe)
+        # 33.33 and 12.35 raised by 10% are 36.663 and 13.585, rounded half up to the cent
+        self.assertEqual(tithe.month_values()[:4], [Decimal('110.00'), Decimal('36.66'), Decimal('13.59'), ZERO])
+        self.assertEqual(tithe.notes, 'Weekly tithe')
+        # Active categories without a line in the source start at zero; inactive ones get none
+        building = BudgetIncomeItem.objects.get(budget=budget, category=self.building)
+        self.assertEqual(building.total, ZERO)
+        self.assertEqual(BudgetIncomeItem.objects.filter(budget=budget).count(), 2)
+        self.assertEqual(BudgetExpenseItem.objects.get(budget=budget).jan, Decimal('11.00'))
+        self.assertEqual(Decimal(str(response.json()['total_income'])), Decimal('160.25'))
+        log = BudgetAuditLog.objects.get(budget=budget)
+        self.assertEqual(log.changes, {'lines': 3, 'cloned_from': 2025, 'uplift': 10.0})
+
+    def test_a_new_budget_gets_a_zero_line_per_active_category(self):
+        response = self.create(year=2026)
+
+        self.assertEqual(response.status_code, 201)
+        budget = AnnualBudget.objects.get(church=self.church, year=2026)
+        self.assertEqual(
+            set(BudgetIncomeItem.objects.filter(budget=budget).values_list('category__name', flat=True)),
+            {'Tithe', 'Building Fund'},
+        )
+        self.assertEqual(response.json()['total_income'], 0)
+
+    def test_a_budget_of_another_church_is_not_copied(self):
+        response = self.create(year=2026, clone_from=2024)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'No budget for 2024 to copy from'})
+        self.assertFalse(AnnualBudget.objects.filter(church=self.church, year=2026).exists())
+
+    def test_invalid_requests_are_rejected(self):
+        for data, error in (
+            ({'year': 2025}, 'Budget for 2025 already exists'),
+            ({'year': 2026, 'clone_from': 2025, 'uplift': '-100'}, 'uplift must be greater than -100%'),
+            ({'year': 2026, 'clone_from': 2025, 'uplift': 'ten'}, 'year and clone_from must be years and uplift a percentage'),
+        ):
+            response = self.create(**data)
+            self.assertEqual((response.status_code, response.json()), (400, {'error': error}))
+        self.assertEqual(AnnualBudget.objects.filter(church=self.church).count(), 1)
+
+
+class BudgetPagingTests(TestCase):
+    """Budget lines and audit logs are served in pages, only for the user's church"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Paging Church')
+        cls.user = User.objects.create_user('paging-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.budget = AnnualBudget.objects.create(church=cls.church, year=2026)
+        categories = IncomeCategory.objects.bulk_create([
+            IncomeCategory(church=cls.church, name=f'Category {number:02}') for number in range(55)
+        ])
+        BudgetIncomeItem.objects.bulk_create([
+            BudgetIncomeItem(church=cls.church, budget=cls.budget, category=category) for category in categories
+        ])
+        BudgetAuditLog.objects.bulk_create([
+            BudgetAuditLog(
+                church=cls.church, budget=cls.budget, item_type='budget', action='update', user=cls.user,
+                changes={'step': step},
+            )
+            for step in range(55)
+        ])
+        other = Church.objects.create(name='Other Church')
+        cls.foreign = AnnualBudget.objects.create(church=other, year=2026)
+        BudgetAuditLog.objects.create(church=other, budget=cls.foreign, item_type='budget', action='create', changes={})
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get(self, budget, action, **params):
+        return self.client.get(f'/api/finance/budgets/{budget.pk}/{action}/', params)
+
+    def test_lines_are_paged(self):
+        page = self.get(self.budget, 'lines').json()
+
+        self.assertEqual(page['count'], 55)
+        self.assertEqual(len(page['results']), 50)
+        self.assertEqual(page['results'][0]['category'], BudgetIncomeItem.objects.order_by('category__name')[0].category_id)
+        self.assertIn('page=2', page['next'])
+        self.assertIsNone(page['previous'])
+
+        last = self.client.get(page['next']).json()
+        self.assertEqual(len(last['results']), 5)
+        self.assertIsNone(last['next'])
+
+    def test_page_size_type_and_search_can_be_chosen(self):
+        page = self.get(self.budget, 'lines', page_size=20, search='category 0').json()
+        self.assertEqual((page['count'], len(page['results'])), (10, 10))
+
+        page = self.get(self.budget, 'lines', page_size=20).json()
+        self.assertEqual(len(page['results']), 20)
+        self.assertIn('page_size=20', page['next'])
+
+        page = self.get(self.budget, 'lines', page_size=100000, type='expense').json()
+        self.assertEqual((page['count'], page['results']), (0, []))
+        self.assertEqual(self.get(self.budget, 'lines', type='capital').status_code, 400)
+
+    def test_audit_logs_are_paged_newest_first(self):
+        page = self.get(self.budget, 'audit').json()
+
+        self.assertEqual(page['count'], 55)
+        self.assertEqual(len(page['results']), 50)
+        self.assertEqual(page['results'][0]['changes'], {'step': 54})
+        self.assertIn('page=2', page['next'])
+        last = self.client.get(page['next']).json()
+        self.assertEqual([log['changes'] for log in last['results']], [{'step': step} for step in range(4, -1, -1)])
+
+    def test_budgets_of_other_churches_are_not_served(self):
+        for action in ('lines', 'audit'):
+            self.assertEqual(self.get(self.foreign, action).status_code, 404, action)
+        self.assertEqual(self.client.get(f'/api/finance/budgets/{self.foreign.pk}/').status_code, 404)
+        listed = self.client.get('/api/finance/budgets/').json()
+        self.assertEqual([budget['id'] for budget in listed['results']], [self.budget.pk])
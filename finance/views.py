@@ -1,9 +1,13 @@
+import datetime
+
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Sum
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from .models import (
     BankAccount, IncomeCategory, ExpenseCategory, RemittanceSettings,
     BankAccount, IncomeCategory, ExpenseCategory, RemittanceSettings,
@@ -14,10 +18,17 @@ from .serializers import (
     BankAccountSerializer, IncomeCategorySerializer, ExpenseCategorySerializer,
     RemittanceSettingsSerializer, IncomeSerializer, IncomeListSerializer,
     ExpenseSerializer, ExpenseListSerializer, RemittanceSerializer, AssessmentSerializer,
-    AnnualBudgetSerializer, BudgetIncomeItemSerializer, BudgetExpenseItemSerializer,
+    AnnualBudgetSerializer, BudgetIncomeItemSerializer, BudgetAuditLogSerializer, BudgetExpenseItemSerializer,
     AssetSerializer, AssetCategorySerializer
 )
 from django.shortcuts import render
+from core import jobs
+from .budget_performance import budget_performance
+from .budget_store import period_totals, seed_budget_lines, with_budget_totals
+from .ledger import balance_as_of, record_transactions
+from .remittances import calculate_remittances, recalculate_remittances
+from core.views import job_accepted
+from dashboard.summaries import schedule_refresh
 
 def budget_dashboard_view(request):
     """Render the budget dashboard"""
@@ -31,6 +42,23 @@ class BankAccountViewSet(viewsets.ModelViewSet):
     search_fields = ['account_name', 'bank_name']
     filterset_fields = ['account_type', 'is_active']
 
+    @action(detail=True, methods=['get'])
+    def balance(self, request, pk=None):
+        """Balance at the end of ``?date=`` (default: today), from the latest snapshot before it"""
+        account = self.get_object()
+        try:
+            day = datetime.date.fromisoformat(request.query_params['date']) if 'date' in request.query_params else datetime.date.today()
+        except ValueError:
+            return Response({'error': 'date must be YYYY-MM-DD'}, status=400)
+        balance, snapshot_date = balance_as_of(account, day)
+        return Response({
+            'account': account.pk,
+            'date': day,
+            'balance': balance,
+            'snapshot_date': snapshot_date,
+            'current_balance': account.current_balance,
+        })
+
 
 class IncomeCategoryViewSet(viewsets.ModelViewSet):
     queryset = IncomeCategory.objects.all()
@@ -54,13 +82,74 @@ class RemittanceSettingsViewSet(viewsets.ModelViewSet):
     filterset_fields = ['remittance_type', 'is_active']
 
 
-class IncomeViewSet(viewsets.ModelViewSet):
+class BulkCreateMixin:
+    """``POST <list>/bulk/``: create many transactions in one request.
+
+    The body is a list of rows (or ``{"rows": [...]}``) in the format of a
+    single create. Every row is validated first; if any fails, nothing is
+    saved and the errors are returned by row number. Otherwise all rows are
+    inserted with one bulk_create in a single transaction (bank balances
+    included) and returned in order, each with its row number. Rows get the
+    same server-set fields as a single create (``get_create_kwargs``).
+    """
+    bulk_max_rows = 500
+    # Dashboard rollup section of the model, refreshed explicitly since bulk_create skips the signals
+    summary_section = None
+
+    def get_create_kwargs(self):
+        """Fields the server sets on every created row, by perform_create and by bulk alike"""
+        kwargs = {'created_by': self.request.user}
+        if getattr(self.request, 'church', None):
+            kwargs['church'] = self.request.church
+        return kwargs
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        rows = request.data if isinstance(request.data, list) else request.data.get('rows')
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Send a non-empty list of rows'}, status=400)
+        if len(rows) > self.bulk_max_rows:
+            return Response({'error': f'At most {self.bulk_max_rows} rows per request'}, status=400)
+
+        serializer = self.get_serializer(data=rows, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, list):
+                errors = dict(enumerate(errors))
+            errors = [{'row': index + 1, 'errors': error} for index, error in sorted(errors.items()) if error]
+            return Response({'created': 0, 'errors': errors}, status=400)
+
+        model = self.get_queryset().model
+        extra = self.get_create_kwargs()
+        objects = [model(**{**row, **extra}) for row in serializer.validated_data]
+        with transaction.atomic():
+            model._base_manager.bulk_create(objects, batch_size=500)
+            record_transactions(objects)
+            self.perform_bulk_create(objects)
+            for church_id in {obj.church_id for obj in objects}:
+                schedule_refresh(
+                    church_id, [obj.transaction_date for obj in objects if obj.church_id == church_id],
+                    (self.summary_section,)
+                )
+
+        results = self.get_serializer(objects, many=True).data
+        return Response({
+            'created': len(objects),
+            'results': [{'row': number, **row} for number, row in enumerate(results, start=1)],
+        }, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, objects):
+        """Hook run on the saved rows inside the bulk transaction"""
+
+
+class IncomeViewSet(BulkCreateMixin, viewsets.ModelViewSet):
     queryset = Income.objects.select_related('category', 'bank_account', 'created_by').prefetch_related('remittances')
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['payer_name', 'receipt_number', 'description']
     filterset_fields = ['category', 'bank_account', 'payment_method', 'transaction_date']
     ordering_fields = ['transaction_date', 'amount']
     ordering = ['-transaction_date']
+    summary_section = 'income'
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -68,29 +157,12 @@ class IncomeViewSet(viewsets.ModelViewSet):
         return IncomeSerializer
     
     def perform_create(self, serializer):
-        income = serializer.save(created_by=self.request.user)
-       # Auto-calculate remittances
-        self._calculate_remittances(income)
-    
-    def _calculate_remittances(self, income):
-        """Calculate and create remittances for the income"""
-        # Get all active remittance settings applicable to this income category
-        applicable_settings = RemittanceSettings.objects.filter(
-            is_active=True,
-            applicable_to_categories=income.category
-        )
-        
-        for setting in applicable_settings:
-            remittance_amount = (income.amount * setting.percentage) / Decimal('100')
-            Remittance.objects.create(
-                income=income,
-                remittance_setting=setting,
-                amount=remittance_amount,
-                percentage_used=setting.percentage
-            )
-        
-        income.remittances_calculated = True
-        income.save()
+        income = serializer.save(**self.get_create_kwargs())
+        # Auto-calculate remittances
+        calculate_remittances([income])
+
+    def perform_bulk_create(self, incomes):
+        calculate_remittances(incomes)
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
@@ -102,13 +174,14 @@ class IncomeViewSet(viewsets.ModelViewSet):
         })
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(BulkCreateMixin, viewsets.ModelViewSet):
     queryset = Expense.objects.select_related('category', 'bank_account', 'created_by', 'related_income')
     filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
     search_fields = ['payee_name', 'voucher_number', 'description']
     filterset_fields = ['category', 'bank_account', 'payment_method', 'transaction_date']
     ordering_fields = ['transaction_date', 'amount']
     ordering = ['-transaction_date']
+    summary_section = 'expense'
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -116,7 +189,7 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         return ExpenseSerializer
     
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        serializer.save(**self.get_create_kwargs())
     
     @action(detail=False, methods=['get'])
     def summary(self, request):
@@ -149,6 +222,20 @@ class RemittanceViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'Remittance marked as paid'})
     
+    @action(detail=False, methods=['post'])
+    def recalculate(self, request):
+        """Re-apply the current remittance percentages to the incomes of a date range"""
+        try:
+            start_date = datetime.date.fromisoformat(request.data.get('start_date') or '')
+            end_date = datetime.date.fromisoformat(request.data.get('end_date') or '')
+        except ValueError:
+            return Response({'error': 'start_date and end_date are required (YYYY-MM-DD)'}, status=400)
+
+        incomes = Income.objects.filter(transaction_date__gte=start_date, transaction_date__lte=end_date)
+        if request.data.get('category'):
+            incomes = incomes.filter(category=request.data['category'])
+        return Response(recalculate_remittances(incomes))
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get remittance summary"""
@@ -186,48 +273,78 @@ class AssessmentViewSet(viewsets.ModelViewSet):
         return Response({'status': 'Assessment marked as paid'})
 
 
+class BudgetPagePagination(PageNumberPagination):
+    """Pages of budget lines and audit logs; the budget screen asks for large pages"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+# Budget line type -> (model, serializer)
+BUDGET_LINE_TYPES = {
+    'income': (BudgetIncomeItem, BudgetIncomeItemSerializer),
+    'expense': (BudgetExpenseItem, BudgetExpenseItemSerializer),
+}
+
+
 class BudgetViewSet(viewsets.ModelViewSet):
-    queryset = AnnualBudget.objects.prefetch_related('income_items', 'expense_items')
+    queryset = AnnualBudget.objects.select_related('approved_by')
     serializer_class = AnnualBudgetSerializer
-    filter_backends = [filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['year', 'status']
     ordering = ['-year']
+
+    def get_queryset(self):
+        # Built per request: the class-level queryset was created before any church was set
+        return with_budget_totals(AnnualBudget.objects.select_related('approved_by'))
     
     def perform_create(self, serializer):
         # Set the church from the logged-in user
         serializer.save(church=self.request.user.profile.church)
 
     def create(self, request, *args, **kwargs):
-        # Override create to auto-populate items based on existing categories
+        """Create a budget with a line for every active category.
+
+        Pass ``clone_from`` (a year) or ``clone_previous`` to copy that budget's
+        lines, raised by ``uplift`` percent. The response is the budget header.
+        """
         year = request.data.get('year')
         if AnnualBudget.objects.filter(year=year).exists():
             return Response({'error': f'Budget for {year} already exists'}, status=400)
-            
-        response = super().create(request, *args, **kwargs)
-        budget_id = response.data['id']
-        budget = AnnualBudget.objects.get(id=budget_id)
-        
-        # Populate Income Items
-        from .models import IncomeCategory, ExpenseCategory
-        church = budget.church
-        for category in IncomeCategory.objects.filter(is_active=True):
-            BudgetIncomeItem.objects.get_or_create(
-                budget=budget, 
-                category=category, 
-                church=church
-            )
-            
-        # Populate Expense Items
-        for category in ExpenseCategory.objects.filter(is_active=True):
-            BudgetExpenseItem.objects.get_or_create(
-                budget=budget, 
-                category=category, 
-                church=church
-            )
-            
-        # Refetch to get nested data
-        serializer = self.get_serializer(budget)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-        
+
+        clone_from = request.data.get('clone_from')
+        clone_previous = str(request.data.get('clone_previous', '')).lower() in ('1', 'true', 'yes')
+        try:
+            if clone_from:
+                clone_from = int(clone_from)
+            elif clone_previous:
+                clone_from = int(year) - 1
+            uplift = Decimal(str(request.data.get('uplift') or 0))
+        except (TypeError, ValueError, InvalidOperation):
+            return Response({'error': 'year and clone_from must be years and uplift a percentage'}, status=400)
+
+        source = None
+        if clone_from:
+            source = AnnualBudget.objects.filter(year=clone_from).first()
+            if source is None:
+                return Response({'error': f'No budget for {clone_from} to copy from'}, status=400)
+        if uplift <= -100:
+            return Response({'error': 'uplift must be greater than -100%'}, status=400)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            self.perform_create(serializer)
+            budget = serializer.instance
+            lines = seed_budget_lines(budget, source, uplift)
+            changes = {'lines': lines}
+            if source is not None:
+                changes.update({'cloned_from': source.year, 'uplift': float(uplift)})
+            self._log_audit(budget, 'budget', budget.id, 'create', request.user, changes)
+
+        budget = self.get_queryset().get(pk=budget.pk)
+        return Response(self.get_serializer(budget).data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def lock(self, request, pk=None):
         """Lock the budget for approval"""
@@ -248,36 +365,78 @@ class BudgetViewSet(viewsets.ModelViewSet):
     def performance(self, request, pk=None):
         """Analyze budget vs actual performance and burn rates"""
         budget = self.get_object()
-        month = request.query_params.get('month') # 1-12
-        
-        income_items = budget.income_items.all()
-        expense_items = budget.expense_items.all()
-        
-        # Calculate actuals (simplified for now, ideally links to Income/Expense tables)
-        # Note: Actual expenditure capture is a future enhancement per requirements
-        # but we can return the structure for it.
-        
-        perf_data = {
-            'income': [],
-            'expense': []
-        }
-        
-        for item in income_items:
-            perf_data['income'].append({
-                'category': item.category.name,
-                'budgeted': item.total,
-                # 'actual': ...
-            })
-            
-        for item in expense_items:
-            perf_data['expense'].append({
-                'category': item.category.name,
-                'budgeted': item.total,
-                'department': item.department.name if item.department else None,
-                # 'actual': ...
+        month = request.query_params.get('month') # 1-12, year-to-date cut-off
+
+        elapsed = None
+        if month:
+            if not month.isdigit() or not 1 <= int(month) <= 12:
+                return Response({'error': 'month must be between 1 and 12'}, status=400)
+            elapsed = int(month)
+
+        return Response(budget_performance(budget, elapsed=elapsed))
+
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """Budgeted income and expense of several years over a month range (?years=2024,2025&from=1&to=6)"""
+        try:
+            years = [int(year) for year in request.query_params.get('years', '').split(',') if year.strip()]
+            first_month = int(request.query_params.get('from', 1))
+            last_month = int(request.query_params.get('to', 12))
+        except ValueError:
+            return Response({'error': 'years, from and to must be numbers'}, status=400)
+        if not 1 <= first_month <= last_month <= 12:
+            return Response({'error': 'from and to must be months between 1 and 12, from <= to'}, status=400)
+
+        budgets = AnnualBudget.objects.all()
+        if years:
+            budgets = budgets.filter(year__in=years)
+        income = period_totals('income', budgets, first_month, last_month)
+        expense = period_totals('expense', budgets, first_month, last_month)
+
+        data = []
+        for year in sorted(set(budgets.values_list('year', flat=True))):
+            data.append({
+                'year': year,
+                'income': income.get(year, 0),
+                'expense': expense.get(year, 0),
+                'net': income.get(year, 0) - expense.get(year, 0),
             })
-            
-        return Response(perf_data)
+        return Response({'from': first_month, 'to': last_month, 'years': data})
+
+    @action(detail=True, methods=['get'])
+    def lines(self, request, pk=None):
+        """Paged lines of one side (?type=income|expense), filterable by department, group, section or category name"""
+        budget = self.get_object()
+        item_type = request.query_params.get('type', 'income')
+        if item_type not in BUDGET_LINE_TYPES:
+            return Response({'error': 'Invalid type'}, status=400)
+        model, serializer_cls = BUDGET_LINE_TYPES[item_type]
+
+        items = (
+            model.objects.filter(budget=budget)
+            .select_related('category', 'department', 'group', 'section')
+            .order_by('category__name', 'pk')
+        )
+        for field in ('department', 'group', 'section'):
+            value = request.query_params.get(field)
+            if value:
+                items = items.filter(**{field: value})
+        search = request.query_params.get('search')
+        if search:
+            items = items.filter(category__name__icontains=search)
+
+        paginator = BudgetPagePagination()
+        page = paginator.paginate_queryset(items, request, view=self)
+        return paginator.get_paginated_response(serializer_cls(page, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def audit(self, request, pk=None):
+        """Paged audit trail of the budget, newest first"""
+        budget = self.get_object()
+        logs = BudgetAuditLog.objects.filter(budget=budget).select_related('user').order_by('-timestamp', '-pk')
+        paginator = BudgetPagePagination()
+        page = paginator.paginate_queryset(logs, request, view=self)
+        return paginator.get_paginated_response(BudgetAuditLogSerializer(page, many=True).data)
 
     @action(detail=True, methods=['post'])
     def update_item(self, request, pk=None):
@@ -351,92 +510,17 @@ class BudgetViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def import_csv(self, request):
-        """Import budget items from CSV, supporting offline creation"""
-        import csv
-        import io
-        from decimal import Decimal
-        from django.db import transaction
-
+        """Queue an import of budget items from CSV, supporting offline creation.
+        
+        The import runs in the background job worker; poll the returned status_url for the report.
+        """
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=400)
 
         church = request.user.profile.church
-        
-        try:
-            decoded_file = file.read().decode('utf-8-sig') # Handle potential BOM
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-
-            imported_count = 0
-            errors = []
-            
-            months = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
-
-            with transaction.atomic():
-                for index, row in enumerate(reader):
-                    try:
-                        year = int(row.get('Year'))
-                        item_type = row.get('Type', '').lower() # 'income' or 'expense'
-                        category_name = row.get('Category')
-                        
-                        if not category_name:
-                            continue
-
-                        # Get or create budget for this church
-                        budget, created = AnnualBudget.objects.get_or_create(
-                            year=year, 
-                            church=church,
-                            defaults={'status': 'draft', 'is_locked': False}
-                        )
-
-                        if budget.is_locked:
-                            errors.append(f"Row {index + 1}: Budget for {year} is locked")
-                            continue
-                        
-                        # Use get_or_create with church context
-                        if item_type == 'income':
-                            category = IncomeCategory.objects.get(name__iexact=category_name, is_active=True)
-                            item, _ = BudgetIncomeItem.objects.get_or_create(budget=budget, category=category, church=church)
-                        elif item_type == 'expense':
-                            category = ExpenseCategory.objects.get(name__iexact=category_name, is_active=True)
-                            item, _ = BudgetExpenseItem.objects.get_or_create(budget=budget, category=category, church=church)
-                        else:
-                            errors.append(f"Row {index + 1}: Invalid type '{item_type}'")
-                            continue
-
-                        # Update monthly values
-                        for month in months:
-                            val = row.get(month.capitalize(), row.get(month, '0'))
-                            try:
-                                setattr(item, month, Decimal(str(val or 0).replace(',', '')))
-                            except:
-                                setattr(item, month, Decimal('0'))
-                        
-                        item.save()
-                        imported_count += 1
-
-                    except (IncomeCategory.DoesNotExist, ExpenseCategory.DoesNotExist):
-                        errors.append(f"Row {index + 1}: Category '{category_name}' not found or inactive")
-                    except Exception as e:
-                        errors.append(f"Row {index + 1}: {str(e)}")
-
-            # Log the bulk operation
-            if imported_count > 0:
-                first_row_year = reader.fieldnames and reader.fieldnames[0] # Just a placeholder
-                # We don't have a single budget PK if multiple years are in CSV, 
-                # but usually it's one year. We'll skip detailed item audit for bulk imports 
-                # to avoid performance issues, or just log the event.
-                pass
-
-            return Response({
-                'status': 'Import complete',
-                'imported': imported_count,
-                'errors': errors
-            })
-
-        except Exception as e:
-            return Response({'error': str(e)}, status=400)
+        job = jobs.enqueue('finance.import_budget', user=request.user, church=church, upload=file)
+        return job_accepted(job)
 
 class AssetCategoryViewSet(viewsets.ModelViewSet):
     queryset = AssetCategory.objects.all()
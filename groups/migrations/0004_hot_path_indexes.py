@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+        ('groups', '0003_alter_groupleadership_unique_together_and_more'),
+        ('membership', '0006_alter_member_membership_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['group'], name='groupmembership_active_idx'),
+        ),
+    ]
@@ -63,3 +63,7 @@ class GroupMembership(TenantModel):
     class Meta:
         ordering = ['group', 'member__last_name']
         unique_together = ['church', 'group', 'member']
+        indexes = [
+            # Active member counts per group; former members stay in the table
+            models.Index(fields=['group'], condition=models.Q(is_active=True), name='groupmembership_active_idx'),
+        ]
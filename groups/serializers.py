@@ -5,10 +5,21 @@ from .models import Group, GroupLeadership, GroupMembership
 class GroupSerializer(serializers.ModelSerializer):
     group_type_display = serializers.CharField(source='get_group_type_display', read_only=True)
     member_count = serializers.SerializerMethodField()
+    leader_count = serializers.SerializerMethodField()
+    convenor_name = serializers.CharField(read_only=True)
     
+    # The counts are annotated by core.aggregates.with_membership_stats on viewset
+    # querysets; freshly created or updated objects fall back to a query
     def get_member_count(self, obj):
+        if hasattr(obj, 'active_member_count'):
+            return obj.active_member_count
         return obj.memberships.filter(is_active=True).count()
     
+    def get_leader_count(self, obj):
+        if hasattr(obj, 'active_leader_count'):
+            return obj.active_leader_count
+        return obj.leadership.filter(is_active=True).count()
+    
     class Meta:
         model = Group
         fields = '__all__'
@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from core.models import Church, UserProfile
+from membership.models import Member
+from .models import Group, GroupLeadership, GroupMembership
+
+
+class GroupQueryCountTests(TestCase):
+    """Group lists and reports must not run a count query per group"""
+
+    # session, user, profile, church, page count, page of groups
+    LIST_QUERIES = 6
+    # session, user, profile, church, groups with their figures
+    SUMMARY_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Query Count Church')
+        cls.user = User.objects.create_user('groups-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.members = [
+            Member.objects.create(
+                church=cls.church, first_name=f'Member{i}', last_name='Test', gender='F',
+                date_of_birth=date(1990, 1, 1), address='-', membership_status='communicant',
+                date_joined=date(2020, 1, 1),
+            )
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_groups(self, count):
+        for i in range(count):
+            group = Group.objects.create(church=self.church, name=f'Group {Group.admin_objects.count()}')
+            for j, member in enumerate(self.members):
+                GroupMembership.objects.create(
+                    church=self.church, group=group, member=member,
+                    joined_date=date(2021, 1, 1), is_active=j != 0,
+                )
+            GroupLeadership.objects.create(
+                church=self.church, group=group, member=self.members[1], role='convenor',
+                start_date=date(2021, 1, 1),
+            )
+
+    def test_list_query_count_does_not_grow_with_groups(self):
+        self.add_groups(2)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            self.client.get('/api/groups/groups/')
+
+        self.add_groups(10)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/groups/groups/')
+
+        group = response.json()['results'][0]
+        self.assertEqual(group['member_count'], 3)
+        self.assertEqual(group['leader_count'], 1)
+        self.assertEqual(group['convenor_name'], 'Member1 Test')
+
+    def test_summary_query_count_does_not_grow_with_groups(self):
+        self.add_groups(12)
+        with self.assertNumQueries(self.SUMMARY_QUERIES):
+            response = self.client.get('/api/reports/generate/groups_summary/')
+
+        self.assertEqual(len(response.json()), 12)
+        self.assertEqual(response.json()[0]['active_members'], 3)
+        self.assertEqual(response.json()[0]['total_members'], 4)
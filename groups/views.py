@@ -1,5 +1,6 @@
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from core.aggregates import with_membership_stats
 from .models import Group, GroupLeadership, GroupMembership
 from .serializers import GroupSerializer, GroupLeadershipSerializer, GroupMembershipSerializer
 
@@ -9,6 +10,9 @@ class GroupViewSet(viewsets.ModelViewSet):
     serializer_class = GroupSerializer
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['name']
+    
+    def get_queryset(self):
+        return with_membership_stats(super().get_queryset())
 
 
 class GroupLeadershipViewSet(viewsets.ModelViewSet):
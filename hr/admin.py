@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Employee, PayrollPeriod, Payslip, PayGrade
+from .models import Employee, PayrollPeriod, Payslip, PayGrade, StatutoryRateTable, PayeBand
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
@@ -11,5 +11,14 @@ class EmployeeAdmin(admin.ModelAdmin):
 class PayGradeAdmin(admin.ModelAdmin):
     list_display = ('name', 'monthly_leave_days')
 
+class PayeBandInline(admin.TabularInline):
+    model = PayeBand
+    extra = 0
+
+@admin.register(StatutoryRateTable)
+class StatutoryRateTableAdmin(admin.ModelAdmin):
+    list_display = ('effective_from', 'napsa_rate', 'napsa_max_income', 'nhima_rate', 'notes')
+    inlines = [PayeBandInline]
+
 admin.site.register(PayrollPeriod)
 admin.site.register(Payslip)
@@ -0,0 +1,15 @@
+from core.jobs import register, JobError
+from .payroll import generate_payroll, PayrollError
+
+
+@register('hr.generate_payroll')
+def generate(job):
+    job.set_progress(0, 'Calculating payslips')
+    try:
+        period, generated_count = generate_payroll(job.payload['month'], user=job.created_by, church=job.church)
+    except PayrollError as e:
+        raise JobError(str(e))
+    return {
+        'message': f'Generated draft payroll for {generated_count} employees',
+        'id': period.id
+    }
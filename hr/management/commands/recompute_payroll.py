@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Church
+from hr.models import Payslip
+from hr.payroll import PayrollError, recompute_payslips
+
+
+def _month(value):
+    try:
+        year, month = value.split('-')[:2]
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise CommandError(f"'{value}' is not a month (YYYY-MM)")
+
+
+class Command(BaseCommand):
+    help = ('Recalculates statutory deductions of existing payslips with the rate tables in effect for each '
+            'month and reports the back pay difference per employee')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Recompute every month of this year')
+        parser.add_argument('--from', dest='start', help='First month (YYYY-MM)')
+        parser.add_argument('--to', dest='end', help='Last month (YYYY-MM)')
+        parser.add_argument('--church', help='Slug of a single church (default: all churches)')
+        parser.add_argument('--apply', action='store_true',
+                            help='Save the new figures on draft payrolls (locked and paid payrolls are only reported)')
+
+    def handle(self, *args, **options):
+        if options['year']:
+            start, end = date(options['year'], 1, 1), date(options['year'], 12, 1)
+        elif options['start']:
+            start = _month(options['start'])
+            end = _month(options['end']) if options['end'] else start
+        else:
+            raise CommandError('Give --year or --from/--to')
+
+        payslips = Payslip.admin_objects.filter(
+            payroll_period__month__gte=start,
+            payroll_period__month__lt=date(end.year + end.month // 12, end.month % 12 + 1, 1),
+        )
+        if options['church']:
+            try:
+                payslips = payslips.filter(church=Church.objects.get(slug=options['church']))
+            except Church.DoesNotExist:
+                raise CommandError(f"Church '{options['church']}' not found")
+
+        try:
+            with transaction.atomic():
+                changed = recompute_payslips(payslips, apply=options['apply'])
+        except PayrollError as e:
+            raise CommandError(str(e))
+
+        if not changed:
+            self.stdout.write(self.style.SUCCESS('All payslips already match the rate tables'))
+            return
+
+        per_period = {}
+        back_pay = {}
+        for slip, old_net in changed:
+            difference = slip.net_pay_calculated - old_net
+            period = slip.payroll_period
+            per_period.setdefault(period, []).append(difference)
+            if period.status != 'draft':
+                back_pay[slip.employee] = back_pay.get(slip.employee, Decimal('0')) + difference
+
+        for period, differences in sorted(per_period.items(), key=lambda item: item[0].month):
+            action = 'updated' if options['apply'] and period.status == 'draft' else period.status
+            self.stdout.write(f'{period} ({period.church}): {len(differences)} payslips, '
+                              f'net change K{sum(differences):,.2f} [{action}]')
+
+        if back_pay:
+            self.stdout.write('\nBack pay owed on locked/paid payrolls (negative = overpaid):')
+            for employee, amount in sorted(back_pay.items(), key=lambda item: item[0].full_name):
+                self.stdout.write(f'  {employee.full_name}: K{amount:,.2f}')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(changed)} payslips differ from the rate tables'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0005_alter_payrollperiod_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatutoryRateTable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField(unique=True)),
+                ('napsa_rate', models.DecimalField(decimal_places=4, help_text='Pension contribution, e.g. 0.05 for 5% of gross', max_digits=5)),
+                ('napsa_max_income', models.DecimalField(decimal_places=2, help_text='Gross income above which NAPSA is capped', max_digits=12)),
+                ('nhima_rate', models.DecimalField(decimal_places=4, help_text='Health insurance, e.g. 0.01 for 1% of basic', max_digits=5)),
+                ('notes', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-effective_from'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayeBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upper_limit', models.DecimalField(blank=True, decimal_places=2, help_text='Leave empty for the top band', max_digits=12, null=True)),
+                ('rate', models.DecimalField(decimal_places=4, help_text='e.g. 0.20 for 20%', max_digits=5)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paye_bands', to='hr.statutoryratetable')),
+            ],
+            options={
+                'ordering': [models.OrderBy(models.F('upper_limit'), nulls_last=True)],
+                'unique_together': {('table', 'upper_limit')},
+            },
+        ),
+    ]
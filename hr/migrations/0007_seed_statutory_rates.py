@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from hr.rates import DEFAULT_EFFECTIVE_FROM, seed_default_rates
+
+
+def seed_rates(apps, schema_editor):
+    seed_default_rates(using=schema_editor.connection.alias, apps=apps)
+
+
+def remove_rates(apps, schema_editor):
+    StatutoryRateTable = apps.get_model('hr', 'StatutoryRateTable')
+    StatutoryRateTable.objects.using(schema_editor.connection.alias).filter(
+        effective_from=DEFAULT_EFFECTIVE_FROM
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0006_statutory_rates'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_rates, remove_rates),
+    ]
@@ -4,6 +4,44 @@ from django.contrib.auth.models import User
 from core.models import TenantModel
 
 
+class StatutoryRateTable(models.Model):
+    """National statutory deduction rates (NAPSA, NHIMA, PAYE bands) in force from a date.
+
+    Payroll for a month uses the latest table whose effective date is on or
+    before that month. Lookups go through hr.rates, which caches them.
+    """
+    effective_from = models.DateField(unique=True)
+    napsa_rate = models.DecimalField(max_digits=5, decimal_places=4, help_text="Pension contribution, e.g. 0.05 for 5% of gross")
+    napsa_max_income = models.DecimalField(max_digits=12, decimal_places=2, help_text="Gross income above which NAPSA is capped")
+    nhima_rate = models.DecimalField(max_digits=5, decimal_places=4, help_text="Health insurance, e.g. 0.01 for 1% of basic")
+    notes = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-effective_from']
+    
+    def __str__(self):
+        return f"Statutory rates from {self.effective_from:%d %b %Y}"
+
+
+class PayeBand(models.Model):
+    """One monthly PAYE band: income up to ``upper_limit`` is taxed at ``rate``"""
+    table = models.ForeignKey(StatutoryRateTable, on_delete=models.CASCADE, related_name='paye_bands')
+    upper_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
+                                      help_text="Leave empty for the top band")
+    rate = models.DecimalField(max_digits=5, decimal_places=4, help_text="e.g. 0.20 for 20%")
+    
+    class Meta:
+        ordering = [models.F('upper_limit').asc(nulls_last=True)]
+        unique_together = ['table', 'upper_limit']
+    
+    def __str__(self):
+        limit = f"up to {self.upper_limit}" if self.upper_limit is not None else "above"
+        return f"{limit}: {float(self.rate) * 100:g}%"
+
+
 class PayGrade(TenantModel):
     """Employee Pay Grade and Leave Configuration"""
     name = models.CharField(max_length=50)
@@ -89,7 +127,11 @@ class PayrollPeriod(TenantModel):
         
     @property
     def total_payout(self):
-        return sum(slip.net_pay for slip in self.payslips.all())
+        # Annotated by hr.payroll.with_totals on list queries
+        if hasattr(self, 'payout_total'):
+            return self.payout_total
+        from .payroll import payslip_totals
+        return payslip_totals(self.payslips.all())['total_net']
 
 class Payslip(TenantModel):
     """Individual payslip for an employee"""
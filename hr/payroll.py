@@ -0,0 +1,241 @@
+"""
+Payroll engine, shared by the payroll API, the background job worker and the
+payroll history script.
+
+A whole payroll run is computed in one pass: active employees of every church
+in the run are read with a single query, payslips are calculated in exact
+Decimal arithmetic and written with one bulk insert, so the number of queries
+does not grow with the number of employees or churches.
+
+Statutory rates come from the effective-dated tables in hr.rates, so every
+month is calculated with the rates that applied to it.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Employee, PayrollPeriod, Payslip
+from .rates import MissingRatesError, money, rate_book, rates_for
+
+# Leave is valued at the daily rate (basic / working days) times the balance
+WORKING_DAYS_PER_MONTH = Decimal('22')
+
+ALLOWANCE_FIELDS = [
+    'housing_allowance',
+    'transport_allowance',
+    'education_allowance',
+    'medical_allowance',
+    'other_allowance',
+]
+
+
+class PayrollError(Exception):
+    """The payroll cannot be generated (e.g. the period is already locked)"""
+
+
+def calculate_paye(income, day=None):
+    """Monthly PAYE on ``income`` at the rates in effect on ``day`` (default: today)"""
+    return rates_for(day or date.today()).paye(income)
+
+
+def statutory_deductions(basic_salary, gross, rates):
+    """(pension, nhima, paye) for one month under a rate schedule"""
+    pension = rates.napsa(gross)
+    nhima = rates.nhima(basic_salary)
+    # Taxable income = Gross - Pension
+    paye = rates.paye(gross - pension)
+    return pension, nhima, paye
+
+
+def net_pay(payslip):
+    """Gross pay less every deduction on the slip, statutory and other"""
+    return payslip.gross_pay - payslip.total_deductions
+
+
+def calculate_payslip(employee, period, rates):
+    """Build (without saving) the payslip of one employee for a period"""
+    allowances = {field: getattr(employee, field) for field in ALLOWANCE_FIELDS}
+    gross = employee.basic_salary + sum(allowances.values())
+
+    pension, nhima, paye = statutory_deductions(employee.basic_salary, gross, rates)
+
+    # Leave accrual (projected, committed when the payroll is paid)
+    leave_balance = employee.leave_days_accrued
+    leave_value = Decimal('0.00')
+    if employee.pay_grade:
+        leave_balance += employee.pay_grade.monthly_leave_days
+        leave_value = money(employee.basic_salary / WORKING_DAYS_PER_MONTH * leave_balance)
+
+    payslip = Payslip(
+        payroll_period=period,
+        employee=employee,
+        church_id=period.church_id,
+        basic_salary=employee.basic_salary,
+        role_at_time=employee.role,
+        pension_deduction=pension,
+        nhima_deduction=nhima,
+        paye_tax=paye,
+        gross_pay=gross,
+        leave_days_balance=leave_balance,
+        leave_pay_value=leave_value,
+        **allowances
+    )
+    payslip.net_pay_calculated = net_pay(payslip)
+    return payslip
+
+
+def _church_filter(church_ids):
+    q = Q(church_id__in=[pk for pk in church_ids if pk is not None])
+    if None in church_ids:
+        q |= Q(church__isnull=True)
+    return q
+
+
+def _periods_for(month, church_ids):
+    """Payroll periods of ``month`` for each church, created where missing"""
+    periods = {
+        period.church_id: period
+        for period in PayrollPeriod.admin_objects.filter(_church_filter(church_ids), month=month)
+    }
+    missing = [PayrollPeriod(church_id=pk, month=month) for pk in church_ids if pk not in periods]
+    if missing:
+        PayrollPeriod.admin_objects.bulk_create(missing)
+        # Not every backend returns primary keys from a bulk insert
+        if any(period.pk is None for period in missing):
+            periods = {
+                period.church_id: period
+                for period in PayrollPeriod.admin_objects.filter(_church_filter(church_ids), month=month)
+            }
+        else:
+            periods.update((period.church_id, period) for period in missing)
+    return periods
+
+
+def run_payroll(month, churches, user=None):
+    """Generate (or regenerate) the draft payroll of a month for several churches at once.
+
+    ``churches`` are Church instances (or None for records without a church).
+    Returns {church_id: (period, payslip count)}. Raises PayrollError, and
+    changes nothing, if any of the periods is already locked or paid.
+    """
+    if isinstance(month, str):
+        month = date.fromisoformat(month)
+    church_ids = list(dict.fromkeys(getattr(church, 'pk', church) for church in churches))
+    try:
+        rates = rates_for(month)
+    except MissingRatesError as e:
+        raise PayrollError(str(e))
+
+    with transaction.atomic():
+        periods = _periods_for(month, church_ids)
+        locked = [period for period in periods.values() if period.status != 'draft']
+        if locked:
+            raise PayrollError('Cannot regenerate. Payroll is locked or paid.')
+
+        # Re-calculate from scratch: drop the existing draft slips
+        Payslip.admin_objects.filter(payroll_period__in=periods.values()).delete()
+
+        employees = (
+            Employee.admin_objects
+            .filter(_church_filter(church_ids), status='active')
+            .select_related('pay_grade')
+            .order_by('pk')
+        )
+        payslips = [calculate_payslip(emp, periods[emp.church_id], rates) for emp in employees]
+        Payslip.admin_objects.bulk_create(payslips, batch_size=500)
+
+        PayrollPeriod.admin_objects.filter(pk__in=[p.pk for p in periods.values()]).update(
+            processed_by=user, updated_at=timezone.now()
+        )
+
+    counts = {}
+    for slip in payslips:
+        counts[slip.church_id] = counts.get(slip.church_id, 0) + 1
+    results = {}
+    for church_id, period in periods.items():
+        period.processed_by = user
+        results[church_id] = (period, counts.get(church_id, 0))
+    return results
+
+
+def generate_payroll(month, user=None, church=None):
+    """Generate (or regenerate) the draft payroll of one church. Returns the period and payslip count"""
+    return run_payroll(month, [church], user=user)[getattr(church, 'pk', church)]
+
+
+def recompute_payslips(payslips, apply=False):
+    """Recalculate statutory deductions of existing payslips with the rates of their month.
+
+    Returns [(payslip, old net pay)] for the slips whose figures changed,
+    with the new figures set on the payslip. With ``apply``, changed slips of
+    draft periods are saved; locked and paid payslips are never rewritten
+    (the difference is back pay owed or recovered).
+    """
+    book = rate_book()
+    changed = []
+    for slip in payslips.select_related('payroll_period', 'employee'):
+        try:
+            rates = book.for_date(slip.payroll_period.month)
+        except MissingRatesError as e:
+            raise PayrollError(str(e))
+        old = (slip.pension_deduction, slip.nhima_deduction, slip.paye_tax, slip.net_pay_calculated)
+        slip.pension_deduction, slip.nhima_deduction, slip.paye_tax = statutory_deductions(
+            slip.basic_salary, slip.gross_pay, rates
+        )
+        slip.net_pay_calculated = net_pay(slip)
+        if (slip.pension_deduction, slip.nhima_deduction, slip.paye_tax, slip.net_pay_calculated) != old:
+            changed.append((slip, old[-1]))
+
+    if apply:
+        now = timezone.now()
+        drafts = [slip for slip, _ in changed if slip.payroll_period.status == 'draft']
+        for slip in drafts:
+            slip.updated_at = now
+        Payslip.admin_objects.bulk_update(
+            drafts, ['pension_deduction', 'nhima_deduction', 'paye_tax', 'net_pay_calculated', 'updated_at'],
+            batch_size=500
+        )
+    return changed
+
+
+def commit_leave_balances(period):
+    """Carry the leave balances on a period's payslips over to the employees"""
+    slips = period.payslips.select_related('employee')
+    now = timezone.now()
+    employees = []
+    for slip in slips:
+        emp = slip.employee
+        # The payslip balance already includes this month's accrual
+        emp.leave_days_accrued = slip.leave_days_balance
+        emp.updated_at = now
+        employees.append(emp)
+    Employee.admin_objects.bulk_update(employees, ['leave_days_accrued', 'updated_at'], batch_size=500)
+    return len(employees)
+
+
+def _total(field):
+    return Coalesce(Sum(field), Value(Decimal('0')), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def payslip_totals(payslips):
+    """Column totals of a payslip queryset, computed by the database"""
+    return payslips.aggregate(
+        total_staff=Count('pk'),
+        total_gross=_total('gross_pay'),
+        total_napsa=_total('pension_deduction'),
+        total_nhima=_total('nhima_deduction'),
+        total_paye=_total('paye_tax'),
+        total_net=_total('net_pay_calculated'),
+    )
+
+
+def with_totals(periods):
+    """Annotate a PayrollPeriod queryset with staff counts and payouts (read by the serializer)"""
+    return periods.annotate(
+        staff_count=Count('payslips', distinct=True),
+        payout_total=_total('payslips__net_pay_calculated'),
+    )
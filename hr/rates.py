@@ -0,0 +1,150 @@
+"""
+Statutory rate lookups for payroll.
+
+The effective-dated rate tables (hr.models.StatutoryRateTable and their PAYE
+bands) are loaded once per process and compiled into RateSchedule objects.
+A month's schedule is then found by binary search, and PAYE is computed from
+precomputed band totals without walking the bands.
+
+The cache is dropped when a table or band is saved or deleted in this process.
+Other processes (e.g. the job worker) notice the change through a cheap
+freshness check made by ``rate_book()``.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max
+
+from .models import StatutoryRateTable
+
+CENT = Decimal('0.01')
+
+# The rates payroll used before they moved into the database (2024/2025)
+DEFAULT_EFFECTIVE_FROM = date(2024, 1, 1)
+DEFAULT_PAYE_BANDS = [
+    (Decimal('5100'), Decimal('0')),
+    (Decimal('7100'), Decimal('0.20')),
+    (Decimal('9200'), Decimal('0.30')),
+    (None, Decimal('0.37')),
+]
+
+
+class MissingRatesError(LookupError):
+    """No statutory rate table is in effect for the requested date"""
+
+
+def money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class RateSchedule:
+    """Compiled form of one StatutoryRateTable"""
+
+    def __init__(self, table, bands):
+        self.effective_from = table.effective_from
+        self.napsa_rate = table.napsa_rate
+        self.napsa_max_income = table.napsa_max_income
+        self.nhima_rate = table.nhima_rate
+
+        # For band i: income above lowers[i] is taxed at rates[i], on top of
+        # base_tax[i] owed on the income below it
+        self.lowers = []
+        self.rates = []
+        self.base_tax = []
+        lower = tax = Decimal('0')
+        for band in bands:
+            self.lowers.append(lower)
+            self.rates.append(band.rate)
+            self.base_tax.append(tax)
+            if band.upper_limit is None:
+                break
+            tax += (band.upper_limit - lower) * band.rate
+            lower = band.upper_limit
+
+    def paye(self, taxable_income):
+        """Monthly PAYE on taxable income, rounded to the cent"""
+        income = Decimal(taxable_income)
+        i = bisect_left(self.lowers, income) - 1
+        if i < 0:
+            return Decimal('0.00')
+        return money(self.base_tax[i] + (income - self.lowers[i]) * self.rates[i])
+
+    def napsa(self, gross):
+        return money(min(gross, self.napsa_max_income) * self.napsa_rate)
+
+    def nhima(self, basic_salary):
+        return money(basic_salary * self.nhima_rate)
+
+
+class RateBook:
+    """All rate schedules, oldest first"""
+
+    def __init__(self, schedules):
+        self.schedules = schedules
+        self.dates = [s.effective_from for s in schedules]
+
+    def for_date(self, day):
+        """Schedule in effect on ``day``"""
+        i = bisect_right(self.dates, day) - 1
+        if i < 0:
+            raise MissingRatesError(f"No statutory rates are in effect for {day:%B %Y}")
+        return self.schedules[i]
+
+
+_cache = {'stamp': None, 'book': None}
+_lock = threading.Lock()
+
+
+def clear_cache(**kwargs):
+    """Drop the compiled schedules (connected to the rate models' save/delete signals)"""
+    with _lock:
+        _cache['stamp'] = None
+
+
+def _stamp():
+    # Saving or deleting a band touches its table, so tables alone tell us about changes
+    return tuple(StatutoryRateTable.objects.aggregate(Count('pk'), Max('updated_at')).values())
+
+
+def rate_book():
+    """The compiled rate schedules, reloaded if the tables changed since they were cached"""
+    stamp = _stamp()
+    with _lock:
+        if _cache['stamp'] != stamp:
+            tables = StatutoryRateTable.objects.prefetch_related('paye_bands').order_by('effective_from')
+            _cache['book'] = RateBook([RateSchedule(table, table.paye_bands.all()) for table in tables])
+            _cache['stamp'] = stamp
+        return _cache['book']
+
+
+def rates_for(day):
+    """Schedule in effect on ``day``"""
+    return rate_book().for_date(day)
+
+
+def seed_default_rates(using=DEFAULT_DB_ALIAS, apps=global_apps):
+    """Create the default 2024/2025 rate table and its PAYE bands if they are missing.
+
+    Data migrations pass their historical ``apps``. Returns (table, created).
+    """
+    RateTable = apps.get_model('hr', 'StatutoryRateTable')
+    PayeBand = apps.get_model('hr', 'PayeBand')
+
+    table, created = RateTable.objects.using(using).get_or_create(
+        effective_from=DEFAULT_EFFECTIVE_FROM,
+        defaults={
+            'napsa_rate': Decimal('0.05'),
+            'napsa_max_income': Decimal('27072.00'),
+            'nhima_rate': Decimal('0.01'),
+            'notes': 'Zambian PAYE 2024/2025 bands',
+        },
+    )
+    if created:
+        PayeBand.objects.using(using).bulk_create([
+            PayeBand(table=table, upper_limit=upper, rate=rate) for upper, rate in DEFAULT_PAYE_BANDS
+        ])
+    return table, created
@@ -27,4 +27,6 @@ class PayrollPeriodSerializer(serializers.ModelSerializer):
         fields = '__all__'
         
     def get_total_staff(self, obj):
+        if hasattr(obj, 'staff_count'):
+            return obj.staff_count
         return obj.payslips.count()
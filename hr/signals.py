@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import StatutoryRateTable, PayeBand
+from .rates import clear_cache
+
+
+@receiver([post_save, post_delete], sender=StatutoryRateTable, dispatch_uid='rates_table_changed')
+def rate_table_changed(sender, instance, raw=False, **kwargs):
+    clear_cache()
+
+
+@receiver([post_save, post_delete], sender=PayeBand, dispatch_uid='rates_band_changed')
+def paye_band_changed(sender, instance, raw=False, **kwargs):
+    # Touch the table so other processes see the change in rates._stamp()
+    StatutoryRateTable.objects.filter(pk=instance.table_id).update(updated_at=timezone.now())
+    clear_cache()
@@ -1,3 +1,101 @@
+from datetime import date
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import Church
+from .models import Employee, PayeBand, Payslip, StatutoryRateTable
+from .payroll import calculate_payslip, generate_payroll, recompute_payslips
+from .rates import MissingRatesError, rates_for, seed_default_rates
+
+
+class PayrollNetPayTests(TestCase):
+    """Generating and recomputing a payroll must agree on net pay"""
+
+    MONTH = date(2025, 3, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Payroll Church')
+        for salary in ('4000.00', '8500.00', '15000.00'):
+            Employee.objects.create(
+                church=cls.church, first_name='Staff', last_name=salary, role='Clerk',
+                date_joined=date(2020, 1, 1), basic_salary=Decimal(salary),
+                housing_allowance=Decimal('1200.00'), transport_allowance=Decimal('300.00'),
+            )
+
+    def test_recompute_leaves_generated_payslips_unchanged(self):
+        period, count = generate_payroll(self.MONTH, church=self.church)
+        self.assertEqual(count, 3)
+
+        self.assertEqual(recompute_payslips(period.payslips.all(), apply=True), [])
+
+    def test_recompute_matches_a_freshly_calculated_payslip(self):
+        period, _ = generate_payroll(self.MONTH, church=self.church)
+        rates = rates_for(self.MONTH)
+        for slip in period.payslips.select_related('employee'):
+            # Force every slip through the recompute path
+            slip.net_pay_calculated = Decimal('0')
+            slip.save()
+            fresh = calculate_payslip(slip.employee, period, rates)
+            [(recomputed, _)] = recompute_payslips(Payslip.objects.filter(pk=slip.pk))
+            self.assertEqual(recomputed.net_pay_calculated, fresh.net_pay_calculated)
+
+    def test_other_deductions_come_off_net_pay(self):
+        period, _ = generate_payroll(self.MONTH, church=self.church)
+        slip = period.payslips.first()
+        Payslip.objects.filter(pk=slip.pk).update(other_deductions=Decimal('250.00'))
+
+        [(recomputed, old_net)] = recompute_payslips(Payslip.objects.filter(pk=slip.pk))
+
+        self.assertEqual(recomputed.net_pay_calculated, old_net - Decimal('250.00'))
+        self.assertEqual(recomputed.net_pay_calculated, recomputed.gross_pay - recomputed.total_deductions)
+
+
+class StatutoryRateTests(TestCase):
+    """The statutory rate tables and the schedules compiled from them"""
+
+    def test_default_rates_are_seeded_once(self):
+        StatutoryRateTable.objects.all().delete()
+
+        table, created = seed_default_rates()
+        self.assertTrue(created)
+        self.assertEqual(seed_default_rates(), (table, False))
+        self.assertEqual(table.paye_bands.count(), 4)
+        self.assertEqual(rates_for(date(2025, 1, 1)).paye(Decimal('10000')), Decimal('1326.00'))
+
+    def test_paye_at_band_edges(self):
+        schedule = rates_for(date(2025, 6, 1))
+
+        for income, tax in (
+            ('0', '0.00'),
+            ('5100.00', '0.00'),
+            ('5100.01', '0.00'),
+            ('5105.00', '1.00'),
+            ('7100.00', '400.00'),
+            ('9200.00', '1030.00'),
+            ('9200.01', '1030.00'),
+            ('10000.00', '1326.00'),
+        ):
+            self.assertEqual(schedule.paye(Decimal(income)), Decimal(tax), income)
+        self.assertEqual(schedule.napsa(Decimal('30000')), Decimal('1353.60'))
+        self.assertEqual(schedule.nhima(Decimal('4321')), Decimal('43.21'))
+
+    def test_schedule_changes_on_the_effective_date(self):
+        table = StatutoryRateTable.objects.create(
+            effective_from=date(2026, 1, 1), napsa_rate=Decimal('0.05'), napsa_max_income=Decimal('30000'),
+            nhima_rate=Decimal('0.01'),
+        )
+        PayeBand.objects.bulk_create([
+            PayeBand(table=table, upper_limit=upper, rate=rate)
+            for upper, rate in ((None, Decimal('0.35')), (Decimal('6000'), Decimal('0')), (Decimal('8000'), Decimal('0.20')))
+        ])
+
+        before, after = rates_for(date(2025, 12, 31)), rates_for(date(2026, 1, 1))
+        self.assertEqual((before.effective_from, after.effective_from), (date(2024, 1, 1), date(2026, 1, 1)))
+        self.assertEqual(before.paye(Decimal('10000')), Decimal('1326.00'))
+        self.assertEqual(after.paye(Decimal('10000')), Decimal('1100.00'))
+        self.assertEqual(after.napsa(Decimal('40000')), Decimal('1500.00'))
+        self.assertEqual(rates_for(date(2030, 1, 1)), after)
+        with self.assertRaises(MissingRatesError):
+            rates_for(date(2023, 12, 31))
@@ -4,10 +4,14 @@ from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
 from django.utils import timezone
-from decimal import Decimal
+from django.utils.dateparse import parse_date
 from .models import Employee, PayrollPeriod, Payslip
 from .serializers import EmployeeSerializer, PayrollPeriodSerializer, PayslipSerializer
+from .payroll import commit_leave_balances, payslip_totals, with_totals
 from finance.models import Expense, ExpenseCategory
+from core import jobs
+from core.lookups import lookup_or_create
+from core.views import job_accepted
 
 from django.shortcuts import render
 
@@ -27,11 +31,7 @@ def payroll_report_view(request, period_id):
     context = {
         'period': period,
         'payslips': payslips,
-        'total_gross': sum(p.gross_pay for p in payslips),
-        'total_napsa': sum(p.pension_deduction for p in payslips),
-        'total_nhima': sum(p.nhima_deduction for p in payslips),
-        'total_paye': sum(p.paye_tax for p in payslips),
-        'total_net': sum(p.net_pay for p in payslips),
+        **payslip_totals(period.payslips.all()),
     }
     return render(request, 'dashboard/hr/payroll_report.html', context)
 
@@ -58,100 +58,29 @@ class PayrollViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['month', 'status']
     
+    def get_queryset(self):
+        return with_totals(super().get_queryset().select_related('processed_by'))
+    
     @action(detail=False, methods=['post'])
     def generate(self, request):
-        """Generate draft payroll for a specific month"""
+        """Queue generation of the draft payroll for a specific month (runs in the job worker)"""
         month_str = request.data.get('month') # YYYY-MM-DD
         if not month_str:
             return Response({'error': 'Month is required'}, status=400)
-            
-        with transaction.atomic():
-            # Create or Get Period
-            period, created = PayrollPeriod.objects.get_or_create(month=month_str)
-            
-            if period.status != 'draft':
-                return Response({'error': 'Cannot regenerate. Payroll is locked or paid.'}, status=400)
-            
-            # Delete existing draft slips to re-calculate
-            period.payslips.all().delete()
-            
-            # Generate Slips for Active Employees
-            active_employees = Employee.objects.filter(status='active')
-            generated_count = 0
-            
-            for emp in active_employees:
-                # 1. Allowances
-                housing = emp.housing_allowance
-                transport = emp.transport_allowance
-                education = emp.education_allowance
-                medical = emp.medical_allowance
-                other = emp.other_allowance
-                total_allowances = housing + transport + education + medical + other
-                
-                # 2. Gross
-                gross = emp.basic_salary + total_allowances
-                
-                # 3. Statutory Deductions
-                # NAPSA: 5% of Gross (Capped at ZMW 1353.60 as of 2024 <=> Max Income ZMW 27,072)
-                napsa_max_income = Decimal('27072.00')
-                napsa_income = min(gross, napsa_max_income)
-                pension = napsa_income * Decimal('0.05')
-                
-                # NHIMA: 1% of Basic
-                nhima = emp.basic_salary * Decimal('0.01')
-                
-                # 4. Tax (PAYE)
-                # Taxable Income = Gross - Pension
-                taxable_income = gross - pension
-                paye = Decimal(str(calculate_paye(taxable_income)))
-                
-                # 5. Net Pay
-                total_deductions = pension + nhima + paye
-                net_pay = gross - total_deductions
-                
-                # 6. Leave Accrual (Projected)
-                leave_balance = emp.leave_days_accrued
-                leave_value = Decimal('0.00')
-                if emp.pay_grade:
-                     current_accrual = emp.pay_grade.monthly_leave_days
-                     leave_balance += current_accrual
-                     # Calculate Value: (Basic / 22) * Balance
-                     daily_rate = emp.basic_salary / Decimal('22')
-                     leave_value = daily_rate * leave_balance
-                
-                Payslip.objects.create(
-                    payroll_period=period,
-                    employee=emp,
-                    basic_salary=emp.basic_salary,
-                    role_at_time=emp.role,
-                    
-                    housing_allowance=housing,
-                    transport_allowance=transport,
-                    education_allowance=education,
-                    medical_allowance=medical,
-                    other_allowance=other,
-                    
-                    pension_deduction=pension,
-                    nhima_deduction=nhima,
-                    paye_tax=paye,
-                    
-                    gross_pay=gross,
-                    net_pay_calculated=net_pay,
-                    
-                    leave_days_balance=leave_balance,
-                    leave_pay_value=leave_value
-                )
-                generated_count += 1
-            
-            period.processed_by = request.user
-            period.save()
-            
-            return Response({
-                'message': f'Generated draft payroll for {generated_count} employees',
-                'id': period.id
-            })
-
-
+        try:
+            month = parse_date(month_str)
+        except ValueError:
+            month = None
+        if month is None:
+            return Response({'error': 'Month must be a date (YYYY-MM-DD)'}, status=400)
+        
+        period = PayrollPeriod.objects.filter(month=month).first()
+        if period and period.status != 'draft':
+            return Response({'error': 'Cannot regenerate. Payroll is locked or paid.'}, status=400)
+        
+        job = jobs.enqueue('hr.generate_payroll', {'month': month.isoformat()},
+                           user=request.user, church=getattr(request, 'church', None))
+        return job_accepted(job)
 
     @action(detail=True, methods=['post'])
     def approve_and_pay(self, request, pk=None):
@@ -168,18 +97,14 @@ class PayrollViewSet(viewsets.ModelViewSet):
             period.save()
             
             # 1.5 Commit Leave Accruals
-            for slip in period.payslips.select_related('employee'):
-                emp = slip.employee
-                # Update employee balance to the value on the payslip (which included this month's accrual)
-                emp.leave_days_accrued = slip.leave_days_balance
-                emp.save()
+            commit_leave_balances(period)
             
             # 2. Integrate with Finance
-            total_amount = period.total_payout
+            total_amount = payslip_totals(period.payslips.all())['total_net']
             if total_amount > 0:
                 # Ensure Category Exists
-                category, _ = ExpenseCategory.objects.get_or_create(
-                    name="Salaries & Wages",
+                category = lookup_or_create(
+                    ExpenseCategory, "Salaries & Wages", period.church_id,
                     defaults={
                         'description': 'Automatic payroll expenses',
                         'expense_type': 'opex'
@@ -207,40 +132,5 @@ class PayrollViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 class PayslipViewSet(viewsets.ModelViewSet):
-    queryset = Payslip.objects.all()
+    queryset = Payslip.objects.all().select_related('employee')
     serializer_class = PayslipSerializer
-
-def calculate_paye(income):
-    """
-    Calculate Zambian PAYE (Monthly) - 2024/2025 Bands
-    0 - 5,100      : 0%
-    5,101 - 7,100  : 20%
-    7,101 - 9,200  : 30%
-    Over 9,200     : 37%
-    """
-    tax = 0
-    income = float(income)
-    
-    # Band 1: 0 - 5100
-    if income <= 5100:
-        return 0
-    
-    # Band 2: 5101 - 7100 (Max Tax: 2000 * 0.20 = 400)
-    taxable_band_2 = min(income - 5100, 2000)
-    tax += taxable_band_2 * 0.20
-    
-    if income <= 7100:
-        return tax
-        
-    # Band 3: 7101 - 9200 (Max Tax: 2100 * 0.30 = 630)
-    taxable_band_3 = min(income - 7100, 2100)
-    tax += taxable_band_3 * 0.30
-    
-    if income <= 9200:
-        return tax
-        
-    # Band 4: Over 9200
-    taxable_band_4 = income - 9200
-    tax += taxable_band_4 * 0.37
-    
-    return tax
@@ -5,3 +5,10 @@ class MembershipConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'membership'
     verbose_name = 'Church Membership'
+
+    def ready(self):
+        from core import lookups
+        from .models import Position, Section
+
+        lookups.register(Section)
+        lookups.register(Position)
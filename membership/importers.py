@@ -0,0 +1,245 @@
+"""
+Bulk import of members from the CSV register template.
+
+Rows are streamed from the file and validated one at a time, then written in
+chunks with bulk_create. Sections and positions are read once per import from
+the lookup cache, and membership numbers are reserved a block at a time from
+the church's number sequence, so a chunk of members costs a fixed handful of
+queries instead of several per row.
+"""
+import csv
+from datetime import datetime
+
+from django.db import transaction
+
+from core.lookups import clear_lookups, lookup_rows
+from .models import Section, Position, Member, Dependent
+
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y')
+GENDERS = {choice for choice, _ in Member.GENDER_CHOICES}
+MEMBER_STATUSES = {choice for choice, _ in Member.MEMBERSHIP_STATUS}
+
+
+class RowError(Exception):
+    """A row that cannot be imported"""
+
+
+def parse_date(value, default=None):
+    """Parse the date formats accepted by the import template"""
+    value = (value or '').strip()
+    if not value:
+        return default
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise RowError(f"Invalid date '{value}' (use YYYY-MM-DD or DD/MM/YYYY)")
+
+
+def _key(name):
+    return ' '.join(name.split()).lower()
+
+
+class MemberImporter:
+    """Validate and import members from a CSV reader in batched, transactional chunks"""
+    chunk_size = 500
+
+    def __init__(self, church=None, user=None, dry_run=False, chunk_size=None):
+        self.church = church
+        self.user = user
+        self.dry_run = dry_run
+        if chunk_size:
+            self.chunk_size = chunk_size
+
+        self.imported = 0
+        self.row_errors = []
+        self.sections_created = []
+        self.positions_created = []
+
+        self._sections = None
+        self._positions = None
+        self._fresh = False
+        self._chunk = []
+
+    # Caches
+
+    def _load_caches(self, fresh=False):
+        church_id = self.church.pk if self.church else None
+        sections = lookup_rows(Section, church_id, fresh)
+        positions = lookup_rows(Position, church_id, fresh)
+        self._sections = {_key(s.name): s for s in sections}
+        self._positions = {_key(p.title): p for p in positions}
+        self._fresh = fresh
+
+    def _reload_on_miss(self, rows, key):
+        # The cached rows may predate a section or position added by another
+        # process: read them from the database once before creating anything
+        if key not in rows and not self._fresh:
+            self._load_caches(fresh=True)
+
+    def _section(self, name):
+        key = _key(name)
+        self._reload_on_miss(self._sections, key)
+        if key not in self._sections:
+            self._sections[key] = Section(church=self.church, name=name.strip())
+            self.sections_created.append(name.strip())
+        return self._sections[key]
+
+    def _position(self, title):
+        key = _key(title)
+        self._reload_on_miss(self._positions, key)
+        if key not in self._positions:
+            self._positions[key] = Position(church=self.church, title=title.strip(), level='congregation')
+            self.positions_created.append(title.strip())
+        return self._positions[key]
+
+    # Row parsing
+
+    def _parse_member(self, row):
+        first_name = (row.get('First Name') or '').strip()
+        last_name = (row.get('Last Name') or '').strip()
+        if not first_name or not last_name:
+            raise RowError('First Name and Last Name are required')
+
+        gender = (row.get('Gender') or 'M').strip().upper()[:1]
+        if gender not in GENDERS:
+            raise RowError(f"Invalid gender '{row.get('Gender')}'")
+
+        status = (row.get('Status') or 'communicant').strip().lower()
+        if status not in MEMBER_STATUSES:
+            raise RowError(f"Invalid status '{row.get('Status')}'")
+
+        today = datetime.now().date()
+        member = Member(
+            church=self.church,
+            created_by=self.user,
+            first_name=first_name,
+            last_name=last_name,
+            middle_name=(row.get('Middle Name') or '').strip(),
+            gender=gender,
+            phone=(row.get('Phone') or '').strip(),
+            email=(row.get('Email') or '').strip(),
+            address=row.get('Address') or '',
+            membership_status=status,
+            date_of_birth=parse_date(row.get('Date of Birth'), today),
+            date_joined=parse_date(row.get('Date Joined'), today),
+        )
+
+        section_name = (row.get('Section') or '').strip()
+        if section_name:
+            member.section = self._section(section_name)
+
+        positions = []
+        for title in (row.get('Position') or '').split(';'):
+            if title.strip():
+                positions.append(self._position(title))
+
+        return member, positions
+
+    def _parse_dependents(self, row, member):
+        """Parse 'Full Name|Gender|DOB;...' entries. Bad entries are reported but do not reject the member"""
+        dependents = []
+        errors = []
+        for entry in (row.get('Dependents') or '').split(';'):
+            if not entry.strip():
+                continue
+            try:
+                parts = [p.strip() for p in entry.split('|')]
+                name_parts = parts[0].split()
+                if not name_parts:
+                    raise RowError('Dependent name is required')
+                gender = (parts[1] if len(parts) > 1 and parts[1] else 'M').upper()[:1]
+                if gender not in GENDERS:
+                    raise RowError(f"Invalid dependent gender '{parts[1]}'")
+                dependents.append(Dependent(
+                    church=self.church,
+                    first_name=name_parts[0],
+                    last_name=" ".join(name_parts[1:]) if len(name_parts) > 1 else member.last_name,
+                    gender=gender,
+                    date_of_birth=parse_date(parts[2] if len(parts) > 2 else None, datetime.now().date()),
+                ))
+            except RowError as e:
+                errors.append(f"Dependent '{entry.strip()}': {e}")
+        return dependents, errors
+
+    # Writing
+
+    def _flush(self):
+        chunk, self._chunk = self._chunk, []
+        if not chunk or self.dry_run:
+            self.imported += len(chunk)
+            return
+
+        # New sections and positions discovered in this chunk
+        new_sections = {id(m.section): m.section for m, _, _ in chunk if m.section and m.section.pk is None}
+        Section.admin_objects.bulk_create(new_sections.values())
+        new_positions = {id(p): p for _, positions, _ in chunk for p in positions if p.pk is None}
+        Position.admin_objects.bulk_create(new_positions.values())
+        # bulk_create skips the signals that keep the lookup cache current
+        church_id = self.church.pk if self.church else None
+        if new_sections:
+            clear_lookups(Section, church_id)
+        if new_positions:
+            clear_lookups(Position, church_id)
+
+        members = [member for member, _, _ in chunk]
+        for member, number in zip(members, Member.reserve_membership_numbers(self.church, len(members))):
+            member.membership_number = number
+        Member.admin_objects.bulk_create(members, batch_size=self.chunk_size)
+
+        dependents = []
+        position_links = []
+        Through = Member.current_positions.through
+        for member, positions, member_dependents in chunk:
+            for dependent in member_dependents:
+                dependent.principal_member = member
+                dependents.append(dependent)
+            for position in {p.pk: p for p in positions}.values():
+                position_links.append(Through(member_id=member.pk, position_id=position.pk))
+        Dependent.admin_objects.bulk_create(dependents, batch_size=self.chunk_size)
+        Through.objects.bulk_create(position_links, batch_size=self.chunk_size)
+
+        # bulk_create bypasses the dashboard rollup signals
+        from dashboard.summaries import schedule_refresh
+        schedule_refresh(self.church.id if self.church else None, {m.date_joined for m in members}, ('members',))
+
+        self.imported += len(members)
+
+    def run(self, lines):
+        """Import from an iterable of CSV text lines and return the import report"""
+        self._load_caches()
+        reader = csv.DictReader(lines)
+
+        with transaction.atomic():
+            for index, row in enumerate(reader):
+                row_number = index + 1
+                try:
+                    member, positions = self._parse_member(row)
+                except RowError as e:
+                    self.row_errors.append({'row': row_number, 'errors': [str(e)]})
+                    continue
+
+                dependents, dependent_errors = self._parse_dependents(row, member)
+                if dependent_errors:
+                    self.row_errors.append({'row': row_number, 'errors': dependent_errors})
+
+                self._chunk.append((member, positions, dependents))
+                if len(self._chunk) >= self.chunk_size:
+                    self._flush()
+            self._flush()
+
+        return self.report()
+
+    def report(self):
+        return {
+            'status': 'Validation complete' if self.dry_run else 'Import complete',
+            'dry_run': self.dry_run,
+            'imported': 0 if self.dry_run else self.imported,
+            'valid_rows': self.imported,
+            'sections_created': self.sections_created,
+            'positions_created': self.positions_created,
+            'errors': [f"Row {e['row']}: {message}" for e in self.row_errors for message in e['errors']],
+            'row_errors': self.row_errors,
+        }
@@ -0,0 +1,8 @@
+from core.jobs import register, iter_upload_lines
+from .importers import MemberImporter
+
+
+@register('membership.import_members')
+def import_members(job):
+    importer = MemberImporter(church=job.church, user=job.created_by, dry_run=job.payload.get('dry_run', False))
+    return importer.run(iter_upload_lines(job))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_numbersequence'),
+        ('membership', '0005_remove_member_current_position_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='membership_number',
+            field=models.CharField(blank=True, help_text='Auto-generated ID, unique within the church', max_length=20),
+        ),
+        migrations.AlterUniqueTogether(
+            name='member',
+            unique_together={('church', 'membership_number')},
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from core.models import TenantModel
+from core.sequences import existing_number_seed, reserve_numbers
 
 
 class Section(TenantModel):
@@ -54,7 +55,7 @@ class Member(TenantModel):
     ]
     
     # Personal Information
-    membership_number = models.CharField(max_length=20, unique=True, blank=True, help_text="Auto-generated unique ID")
+    membership_number = models.CharField(max_length=20, blank=True, help_text="Auto-generated ID, unique within the church")
     first_name = models.CharField(max_length=100)
     middle_name = models.CharField(max_length=100, blank=True)
     last_name = models.CharField(max_length=100)
@@ -88,32 +89,18 @@ class Member(TenantModel):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='members_created')
     
+    NUMBER_PREFIX = 'UCZ'
+    NUMBER_WIDTH = 5
+    
+    @classmethod
+    def reserve_membership_numbers(cls, church, count):
+        """Reserve a block of membership numbers (UCZ-00001...) for this church"""
+        seed = existing_number_seed(cls.admin_objects.filter(church=church), 'membership_number', cls.NUMBER_PREFIX)
+        return reserve_numbers(church, cls.NUMBER_PREFIX, count, cls.NUMBER_WIDTH, seed)
+    
     def save(self, *args, **kwargs):
         if not self.membership_number:
-            # Generate UCZ-00001
-            last = Member.objects.filter(church=self.church).order_by('-id').first()
-            if last and last.membership_number and last.membership_number.startswith('UCZ-'):
-                try:
-                    # Extract number part
-                    last_num = int(last.membership_number.split('-')[1])
-                    self.membership_number = f"UCZ-{last_num + 1:05d}"
-                except (IndexError, ValueError):
-                    # Fallback if format is somehow wrong
-                    self.membership_number = f"UCZ-{last.id + 1:05d}"
-            else:
-                 # Initial start or if no previous members have codes
-                 # If members exist but no codes, we might want to migrate them, 
-                 # but for new ones, we assume numbering starts or continues based on count?
-                 # Safer to query for any membership number to be sure
-                last_code = Member.objects.filter(church=self.church).exclude(membership_number='').order_by('-membership_number').first()
-                if last_code:
-                     try:
-                        last_num = int(last_code.membership_number.split('-')[1])
-                        self.membership_number = f"UCZ-{last_num + 1:05d}"
-                     except:
-                        self.membership_number = "UCZ-00001"
-                else:
-                    self.membership_number = "UCZ-00001"
+            self.membership_number = self.reserve_membership_numbers(self.church, 1)[0]
                     
         super().save(*args, **kwargs)
 
@@ -136,6 +123,11 @@ class Member(TenantModel):
         ordering = ['last_name', 'first_name']
         verbose_name = 'Member'
         verbose_name_plural = 'Members'
+        unique_together = ['church', 'membership_number']
+        indexes = [
+            # New members per month (dashboard rollups)
+            models.Index(fields=['church', 'date_joined'], name='member_church_joined_idx'),
+        ]
 
 
 class Dependent(TenantModel):
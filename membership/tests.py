@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.models import Church
+from .importers import MemberImporter
+from .models import Dependent, Member, Position, Section
+
+
+HEADER = 'First Name,Last Name,Gender,Status,Date of Birth,Date Joined,Section,Position,Dependents\n'
+
+
+class MemberImporterTests(TestCase):
+    """CSV register import: row validation, dry runs and chunked writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Import Church')
+        cls.men = Section.objects.create(church=cls.church, name='Men')
+
+    def run_import(self, rows, **kwargs):
+        importer = MemberImporter(church=self.church, **kwargs)
+        return importer.run([HEADER] + [row + '\n' for row in rows])
+
+    def test_rows_are_imported_in_chunks(self):
+        report = self.run_import([
+            'John,Banda,M,communicant,1980-05-01,01/02/2020,men,Elder,Ruth Banda|F|2010-01-01',
+            'Mary,Phiri,F,,,,Women,Elder;Deacon,',
+            'Peter,Mwale,M,adherent,,,Youth,,',
+        ], chunk_size=2)
+
+        self.assertEqual(report['imported'], 3)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['sections_created'], ['Women', 'Youth'])
+        self.assertEqual(report['positions_created'], ['Elder', 'Deacon'])
+        members = {m.first_name: m for m in Member.objects.filter(church=self.church)}
+        self.assertEqual(
+            sorted(m.membership_number for m in members.values()), ['UCZ-00001', 'UCZ-00002', 'UCZ-00003'],
+        )
+        self.assertEqual(members['John'].section, self.men)
+        self.assertEqual(set(members['Mary'].current_positions.values_list('title', flat=True)), {'Elder', 'Deacon'})
+        self.assertEqual(Position.objects.filter(church=self.church).count(), 2)
+        dependent = Dependent.objects.get(principal_member=members['John'])
+        self.assertEqual((dependent.first_name, dependent.last_name), ('Ruth', 'Banda'))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        report = self.run_import([
+            'John,Banda,M,communicant,,,,,',
+            ',Phiri,F,,,,,,',
+            'Peter,Mwale,X,,,,,,',
+            'Grace,Zulu,F,,31-12-1990,,,,',
+            'Ruth,Tembo,F,,,,,,Ben|Q|2015-01-01',
+        ])
+
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['errors'], [
+            'Row 2: First Name and Last Name are required',
+            "Row 3: Invalid gender 'X'",
+            "Row 4: Invalid date '31-12-1990' (use YYYY-MM-DD or DD/MM/YYYY)",
+            "Row 5: Dependent 'Ben|Q|2015-01-01': Invalid dependent gender 'Q'",
+        ])
+        self.assertEqual(
+            set(Member.objects.filter(church=self.church).values_list('first_name', flat=True)), {'John', 'Ruth'},
+        )
+        self.assertFalse(Dependent.objects.exists())
+
+    def test_dry_run_validates_without_saving(self):
+        report = self.run_import([
+            'John,Banda,M,communicant,,,Choir,Elder,',
+            'Mary,Phiri,F,unknown,,,,,',
+        ], dry_run=True)
+
+        self.assertEqual(report['status'], 'Validation complete')
+        self.assertEqual((report['imported'], report['valid_rows']), (0, 1))
+        self.assertEqual(report['errors'], ["Row 2: Invalid status 'unknown'"])
+        self.assertEqual(report['sections_created'], ['Choir'])
+        self.assertFalse(Member.objects.exists())
+        self.assertEqual(list(Section.objects.filter(church=self.church)), [self.men])
+        self.assertFalse(Position.objects.exists())
+
+    def test_sections_added_elsewhere_are_not_duplicated(self):
+        cache.clear()
+        self.run_import(['John,Banda,M,,,,Men,,'])
+        # Created without the signals that drop the cached sections, as in another process
+        choir, = Section.admin_objects.bulk_create([Section(church=self.church, name='Choir')])
+
+        report = self.run_import(['Mary,Phiri,F,,,,choir,,'])
+
+        self.assertEqual(report['sections_created'], [])
+        self.assertEqual(Member.objects.get(first_name='Mary').section, choir)
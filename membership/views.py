@@ -1,8 +1,12 @@
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Section, Position, Member, Dependent, PositionHistory, MemberTransfer
+from core import jobs
+from core.lookups import lookup_by_pk
+from core.views import job_accepted
 from .serializers import (
     SectionSerializer, PositionSerializer, MemberSerializer, MemberListSerializer,
     DependentSerializer, PositionHistorySerializer, MemberTransferSerializer
@@ -39,124 +43,20 @@ class MemberViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def import_csv(self, request):
-        """Import members from CSV file"""
-        import csv
-        import io
-        from datetime import datetime
+        """Queue an import of members from a CSV file. Pass dry_run=true to only validate the file.
         
+        The import runs in the background job worker; poll the returned status_url for the report.
+        """
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=400)
-            
-        try:
-            decoded_file = file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            imported_count = 0
-            errors = []
-            
-            for index, row in enumerate(reader):
-                try:
-                    # Basic fields
-                    member_data = {
-                        'first_name': row.get('First Name'),
-                        'last_name': row.get('Last Name'),
-                        'middle_name': row.get('Middle Name', ''),
-                        'gender': row.get('Gender', 'M'),
-                        'phone': row.get('Phone', ''),
-                        'email': row.get('Email', ''),
-                        'address': row.get('Address', ''),
-                        'membership_status': row.get('Status', 'communicant').lower(),
-                        'date_of_birth': row.get('Date of Birth'),
-                        'date_joined': row.get('Date Joined'),
-                    }
-                    
-                    # Handle Dates
-                    for date_field in ['date_of_birth', 'date_joined']:
-                        if member_data.get(date_field):
-                            try:
-                                member_data[date_field] = datetime.strptime(member_data[date_field], '%Y-%m-%d').date()
-                            except ValueError:
-                                # Try alternative format
-                                try:
-                                    member_data[date_field] = datetime.strptime(member_data[date_field], '%d/%m/%Y').date()
-                                except ValueError:
-                                    member_data[date_field] = datetime.now().date() # Fallback
-                        else:
-                            member_data[date_field] = datetime.now().date() # Default
-                            
-                    # Handle Section
-                    section_name = row.get('Section')
-                    if section_name:
-                        section, _ = Section.objects.get_or_create(name=section_name)
-                        member_data['section'] = section
-                        
-                    member = Member.objects.create(**member_data)
-                    
-                    # Handle Positions
-                    positions_str = row.get('Position')
-                    if positions_str:
-                        for pos_title in positions_str.split(';'):
-                            pos_title = pos_title.strip()
-                            if pos_title:
-                                position, _ = Position.objects.get_or_create(title=pos_title, defaults={'level': 'congregation'})
-                                member.current_positions.add(position)
-                    
-                    # Handle Dependents
-                    dependents_str = row.get('Dependents')
-                    if dependents_str:
-                        for dep_entry in dependents_str.split(';'):
-                            if not dep_entry.strip():
-                                continue
-                            
-                            try:
-                                parts = [p.strip() for p in dep_entry.split('|')]
-                                if len(parts) >= 1:
-                                    full_name = parts[0]
-                                    gender = parts[1] if len(parts) > 1 else 'M'
-                                    dob_str = parts[2] if len(parts) > 2 else None
-                                    
-                                    # Split name
-                                    name_parts = full_name.split()
-                                    first_name = name_parts[0]
-                                    last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else member.last_name
-                                    
-                                    dep_data = {
-                                        'principal_member': member,
-                                        'first_name': first_name,
-                                        'last_name': last_name,
-                                        'gender': gender,
-                                    }
-                                    
-                                    if dob_str:
-                                        try:
-                                            dep_data['date_of_birth'] = datetime.strptime(dob_str, '%Y-%m-%d').date()
-                                        except ValueError:
-                                            try:
-                                                dep_data['date_of_birth'] = datetime.strptime(dob_str, '%d/%m/%Y').date()
-                                            except ValueError:
-                                                dep_data['date_of_birth'] = datetime.now().date()
-                                    else:
-                                        dep_data['date_of_birth'] = datetime.now().date()
-                                        
-                                    Dependent.objects.create(**dep_data)
-                            except Exception as dep_e:
-                                errors.append(f"Row {index + 1} (Dependent): {str(dep_e)}")
-
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row {index + 1}: {str(e)}")
-                    
-            return Response({
-                'status': 'Import complete',
-                'imported': imported_count,
-                'errors': errors
-            })
-            
-        except Exception as e:
-            return Response({'error': str(e)}, status=400)
+        
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        job = jobs.enqueue(
+            'membership.import_members', {'dry_run': dry_run},
+            user=request.user, church=getattr(request, 'church', None), upload=file
+        )
+        return job_accepted(job)
 
     @action(detail=True, methods=['post'])
     def add_dependent(self, request, pk=None):
@@ -178,14 +78,17 @@ class MemberViewSet(viewsets.ModelViewSet):
         if not position_ids or not start_date:
             return Response({'error': 'position_ids and start_date are required'}, status=400)
         
-        # Close all current position histories
+        # Close all current position histories (update() skips auto_now;
+        # differential backups select rows by updated_at)
         PositionHistory.objects.filter(
             member=member,
             end_date__isnull=True
-        ).update(end_date=start_date)
+        ).update(end_date=start_date, updated_at=timezone.now())
         
         # Clear current positions and add new ones
-        new_positions = Position.objects.filter(id__in=position_ids)
+        position_ids = {int(pk) for pk in position_ids}
+        positions = lookup_by_pk(Position, member.church_id, position_ids)
+        new_positions = [positions[pk] for pk in position_ids if pk in positions]
         member.current_positions.set(new_positions)
         
         # Create new position histories
@@ -0,0 +1,215 @@
+"""
+Attendance and giving analytics over the Sunday reports.
+
+Reports are bucketed by week, month or quarter in the database (date
+truncation plus GROUP BY), so a multi-year series is a couple of small
+queries however many Sundays it covers. Rolling averages and year-over-year
+deltas are then derived from the bucketed rows.
+
+Results are cached per church. Each cache entry is stored with a stamp of the
+church's reports (count and latest ``updated_at``) and is only served while
+the stamp still matches, so editing, adding or deleting a report (or its
+section funds, see planner.signals) invalidates it in every process.
+"""
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Max, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek
+
+from .models import SectionFunds, SundayReport
+
+PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+# Number of buckets in the rolling average unless the caller asks otherwise
+DEFAULT_WINDOWS = {'week': 4, 'month': 3, 'quarter': 4}
+
+ATTENDANCE_FIELDS = {
+    'men': 'attendance_men',
+    'women': 'attendance_women',
+    'children': 'attendance_children',
+    'visitors': 'attendance_visitors',
+}
+GIVING_FIELDS = {
+    'offering': 'total_offering',
+    'tithe': 'total_tithe',
+}
+METRICS = [*ATTENDANCE_FIELDS, 'attendance', *GIVING_FIELDS, 'giving']
+
+CACHE_TIMEOUT = 60 * 60 * 24
+CENT = Decimal('0.01')
+
+
+class AnalyticsError(ValueError):
+    """Invalid analytics parameters"""
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _bucket_start(day, period):
+    """First day of the bucket ``day`` falls in (what the Trunc functions return)"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'quarter':
+        return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+    return day.replace(day=1)
+
+
+def _year_before(bucket, period):
+    if period == 'week':
+        # TruncWeek buckets start on Mondays; 52 weeks back is a Monday as well
+        return bucket - timedelta(weeks=52)
+    return bucket.replace(year=bucket.year - 1)
+
+
+def _stamp(church_id):
+    reports = SundayReport._base_manager.filter(church_id=church_id)
+    return tuple(reports.aggregate(Count('pk'), Max('updated_at')).values())
+
+
+def _buckets(reports, trunc):
+    """Per bucket: average attendance per Sunday and summed giving"""
+    rows = (
+        reports.annotate(bucket=trunc('date'))
+        .values('bucket')
+        .annotate(
+            sundays=Count('pk'),
+            **{name: Avg(field) for name, field in ATTENDANCE_FIELDS.items()},
+            **{name: Sum(field) for name, field in GIVING_FIELDS.items()},
+        )
+        .order_by('bucket')
+    )
+    buckets = {}
+    for row in rows:
+        point = {'period': row['bucket'], 'sundays': row['sundays']}
+        for name in ATTENDANCE_FIELDS:
+            point[name] = round(row[name] or 0, 1)
+        point['attendance'] = round(sum(point[name] for name in ATTENDANCE_FIELDS), 1)
+        for name in GIVING_FIELDS:
+            point[name] = _money(row[name])
+        point['giving'] = point['offering'] + point['tithe']
+        buckets[row['bucket']] = point
+    return buckets
+
+
+def _section_giving(funds, trunc):
+    """{bucket: [per-section giving]} from SectionFunds"""
+    rows = (
+        funds.annotate(bucket=trunc('report__date'))
+        .values('bucket', 'section_id', 'section__name')
+        .annotate(
+            tithe=Sum('tithe_amount'),
+            offering=Sum(F('envelopes_amount') + F('loose_offering_amount') + F('thanksgiving_amount')),
+        )
+        .order_by('bucket', 'section__name')
+    )
+    sections = {}
+    for row in rows:
+        tithe, offering = _money(row['tithe']), _money(row['offering'])
+        sections.setdefault(row['bucket'], []).append({
+            'section_id': row['section_id'],
+            'section': row['section__name'],
+            'tithe': tithe,
+            'offering': offering,
+            'total': tithe + offering,
+        })
+    return sections
+
+
+def _rolling(points, window):
+    """Average of each metric over the last ``window`` buckets (fewer at the start)"""
+    averages = []
+    for i in range(len(points)):
+        recent = points[max(0, i - window + 1):i + 1]
+        average = {}
+        for name in METRICS:
+            total = sum(point[name] for point in recent)
+            if isinstance(total, Decimal):
+                average[name] = _money(total / len(recent))
+            else:
+                average[name] = round(total / len(recent), 1)
+        averages.append(average)
+    return averages
+
+
+def _year_over_year(point, previous):
+    if previous is None:
+        return None
+    deltas = {}
+    for name in METRICS:
+        change = point[name] - previous[name]
+        deltas[name] = {
+            'change': round(change, 1) if isinstance(change, float) else change,
+            'percent': round(float(change) / float(previous[name]) * 100, 1) if previous[name] else None,
+        }
+    return deltas
+
+
+def sunday_analytics(reports, period='month', start=None, end=None, window=None):
+    """Bucketed attendance and giving series of a SundayReport queryset.
+
+    Every point carries the bucket's figures, a rolling average over the last
+    ``window`` buckets and the change against the same bucket a year
+    earlier. Buckets without any report are left out.
+    """
+    if period not in PERIODS:
+        raise AnalyticsError(f"period must be one of: {', '.join(PERIODS)}")
+    window = window or DEFAULT_WINDOWS[period]
+    if window < 1:
+        raise AnalyticsError('window must be at least 1')
+    trunc = PERIODS[period]
+
+    funds = SectionFunds._base_manager.filter(report__in=reports.values('pk'))
+    first_bucket = _bucket_start(start, period) if start else None
+    if start:
+        # Read a year more than requested to feed the rolling averages and deltas
+        reports = reports.filter(date__gte=_year_before(first_bucket, period))
+        funds = funds.filter(report__date__gte=first_bucket)
+    if end:
+        reports = reports.filter(date__lte=end)
+        funds = funds.filter(report__date__lte=end)
+
+    buckets = _buckets(reports, trunc)
+    sections = _section_giving(funds, trunc)
+
+    points = list(buckets.values())
+    averages = _rolling(points, window)
+    series = []
+    for point, average in zip(points, averages):
+        if first_bucket and point['period'] < first_bucket:
+            continue
+        series.append({
+            **point,
+            'rolling_average': average,
+            'year_over_year': _year_over_year(point, buckets.get(_year_before(point['period'], period))),
+            'sections': sections.get(point['period'], []),
+        })
+
+    return {
+        'period': period,
+        'window': window,
+        'start': start,
+        'end': end,
+        'series': series,
+    }
+
+
+def cached_sunday_analytics(church_id, period='month', start=None, end=None, window=None):
+    """sunday_analytics() of one church's reports, served from the cache while they are unchanged"""
+    key = f'planner:analytics:{church_id}:{period}:{start}:{end}:{window}'
+    stamp = _stamp(church_id)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    data = sunday_analytics(
+        SundayReport._base_manager.filter(church_id=church_id), period, start, end, window
+    )
+    cache.set(key, (stamp, data), CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,56 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Church
+from planner.models import SundayReport, REPORT_TOTAL_FIELDS, report_total_expressions, refresh_report_totals
+
+CENT = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Checks the denormalized Sunday report totals against their section funds and items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', help='Slug of a single church to check (default: all churches)')
+        parser.add_argument('--fix', action='store_true', help='Recompute the totals of the reports that differ')
+
+    def handle(self, *args, **options):
+        reports = SundayReport.admin_objects.all()
+        if options['church']:
+            try:
+                reports = reports.filter(church=Church.objects.get(slug=options['church']))
+            except Church.DoesNotExist:
+                raise CommandError(f"Church '{options['church']}' not found")
+
+        # One query: stored totals next to the totals computed from the child rows
+        expected = {f'expected_{name}': expression for name, expression in report_total_expressions().items()}
+        rows = reports.annotate(**expected).values('pk', 'church__name', 'date', *REPORT_TOTAL_FIELDS, *expected)
+
+        mismatched = []
+        checked = 0
+        for row in rows.iterator():
+            checked += 1
+            differences = []
+            for name in REPORT_TOTAL_FIELDS:
+                stored = Decimal(row[name]).quantize(CENT)
+                computed = Decimal(row[f'expected_{name}']).quantize(CENT)
+                if stored != computed:
+                    differences.append(f"{name} {stored} != {computed}")
+            if differences:
+                mismatched.append(row['pk'])
+                self.stdout.write(f"{row['church__name'] or 'No church'} {row['date']}: {'; '.join(differences)}")
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS(f'All {checked} Sunday reports are consistent'))
+            return
+
+        if options['fix']:
+            with transaction.atomic():
+                refresh_report_totals(SundayReport.admin_objects.filter(pk__in=mismatched))
+            self.stdout.write(self.style.SUCCESS(f'Recomputed {len(mismatched)} of {checked} Sunday reports'))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'{len(mismatched)} of {checked} Sunday reports are inconsistent (run with --fix to recompute them)'
+            ))
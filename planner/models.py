@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 from core.models import TenantModel
+from core.aggregates import sum_subquery
 
 
 class EventCategory(TenantModel):
@@ -52,6 +55,10 @@ class Event(TenantModel):
     
     class Meta:
         ordering = ['start_date', 'start_time']
+        indexes = [
+            # Upcoming events of a church (dashboard), narrowed by status from the index
+            models.Index(fields=['church', 'start_date', 'status'], name='event_church_start_idx'),
+        ]
 
 class SundayReport(TenantModel):
     """Report for Sunday Service Activities"""
@@ -83,6 +90,12 @@ class SundayReport(TenantModel):
     @property
     def grand_total(self):
         return self.total_offering + self.total_tithe + self.total_items_sale
+    
+    def refresh_totals(self, *fields):
+        """Recompute the denormalized totals (all, or just ``fields``) from the child rows"""
+        fields = fields or REPORT_TOTAL_FIELDS
+        refresh_report_totals(SundayReport.admin_objects.filter(pk=self.pk), *fields)
+        self.refresh_from_db(fields=[*fields, 'updated_at'])
 
     class Meta:
         ordering = ['-date']
@@ -131,3 +144,27 @@ class SectionFunds(TenantModel):
     
     class Meta:
         unique_together = [['report', 'section'], ['church', 'report', 'section']]
+
+
+REPORT_TOTAL_FIELDS = ['total_offering', 'total_tithe', 'total_items_sale']
+
+
+def report_total_expressions():
+    """SQL expressions computing each denormalized SundayReport total from its child rows"""
+    funds = SectionFunds._base_manager.all()
+    return {
+        'total_offering': sum_subquery(
+            funds, 'report', F('envelopes_amount') + F('loose_offering_amount') + F('thanksgiving_amount')
+        ),
+        'total_tithe': sum_subquery(funds, 'report', 'tithe_amount'),
+        'total_items_sale': sum_subquery(SundayItem._base_manager.filter(status='sold'), 'report', 'sold_price'),
+    }
+
+
+def refresh_report_totals(queryset, *fields):
+    """Recompute the totals of every report in ``queryset`` with a single UPDATE"""
+    expressions = report_total_expressions()
+    return queryset.update(
+        updated_at=timezone.now(),
+        **{name: expressions[name] for name in fields or REPORT_TOTAL_FIELDS}
+    )
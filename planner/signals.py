@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import SectionFunds, SundayReport
+
+
+@receiver([post_save, post_delete], sender=SectionFunds, dispatch_uid='analytics_section_funds_changed')
+def section_funds_changed(sender, instance, raw=False, **kwargs):
+    # Touch the report so cached analytics (planner.analytics) notice the change
+    if raw:
+        return
+    SundayReport._base_manager.filter(pk=instance.report_id).update(updated_at=timezone.now())
@@ -1,3 +1,255 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from core.models import Church, UserProfile
+from membership.models import Section
+from .analytics import AnalyticsError, cached_sunday_analytics, sunday_analytics
+from .models import SectionFunds, SundayItem, SundayReport
+
+
+class SundayItemSyncTests(TestCase):
+    """update_items diffs the posted list against the stored items"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Sunday Church')
+        cls.user = User.objects.create_user('planner-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.report = SundayReport.objects.create(church=cls.church, date=date(2026, 3, 1))
+        cls.kept, cls.sold, cls.dropped = [
+            SundayItem.objects.create(church=cls.church, report=cls.report, item_name=name, estimated_value=10)
+            for name in ('Maize', 'Beans', 'Chicken')
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_items(self, items):
+        return self.client.post(
+            f'/planner/api/sunday-reports/{self.report.pk}/update_items/', {'items': items},
+            content_type='application/json',
+        )
+
+    def test_rows_are_updated_created_and_deleted(self):
+        response = self.post_items([
+            {'id': self.kept.pk, 'item_name': 'Maize', 'estimated_value': '10'},
+            {'id': self.sold.pk, 'item_name': 'Beans', 'estimated_value': '10', 'status': 'sold', 'sold_price': '40'},
+            {'item_name': 'Goat', 'estimated_value': '300', 'status': 'sold', 'sold_price': '350'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        items = {item.item_name: item for item in SundayItem.objects.filter(report=self.report)}
+        self.assertEqual(set(items), {'Maize', 'Beans', 'Goat'})
+        self.assertEqual(items['Maize'].pk, self.kept.pk)
+        self.assertEqual(items['Beans'].sold_price, Decimal('40'))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.total_items_sale, Decimal('390'))
+
+    def test_duplicate_ids_are_rejected(self):
+        response = self.post_items([
+            {'id': self.kept.pk, 'item_name': 'Maize', 'estimated_value': '10'},
+            {'id': self.kept.pk, 'item_name': 'Maize (2)', 'estimated_value': '20'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [f'Row 2: id: {self.kept.pk} is already used by row 1'])
+        self.assertEqual(SundayItem.objects.filter(report=self.report).count(), 3)
+
+
+class SectionFundsUpsertTests(TestCase):
+    """update_funds writes every section's funds in one upsert and refreshes the totals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Funds Church')
+        cls.user = User.objects.create_user('funds-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.report = SundayReport.objects.create(church=cls.church, date=date(2026, 3, 8))
+        cls.men, cls.women = [Section.objects.create(church=cls.church, name=name) for name in ('Men', 'Women')]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_funds(self, funds):
+        return self.client.post(
+            f'/planner/api/sunday-reports/{self.report.pk}/update_funds/', {'funds': funds},
+            content_type='application/json',
+        )
+
+    def test_existing_funds_are_updated_in_place(self):
+        SectionFunds.objects.create(church=self.church, report=self.report, section=self.men, tithe_amount=5)
+
+        response = self.post_funds([
+            {'section_id': self.men.pk, 'tithe': '100', 'loose': '20'},
+            {'section_id': self.women.pk, 'tithe': '50', 'envelopes': '30', 'thanksgiving': '10'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        funds = {f.section_id: f for f in SectionFunds.objects.filter(report=self.report)}
+        self.assertEqual(len(funds), 2)
+        self.assertEqual(funds[self.men.pk].tithe_amount, Decimal('100'))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.total_tithe, Decimal('150'))
+        self.assertEqual(self.report.total_offering, Decimal('60'))
+
+    def test_duplicate_sections_are_rejected(self):
+        response = self.post_funds([
+            {'section_id': self.men.pk, 'tithe': '100'},
+            {'section_id': self.men.pk, 'tithe': '200'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [f'Section {self.men.pk} is listed more than once'])
+        self.assertFalse(SectionFunds.objects.filter(report=self.report).exists())
+
+    def test_a_section_missing_from_the_cached_rows_is_accepted(self):
+        cache.clear()
+        self.assertEqual(self.post_funds([{'section_id': self.men.pk, 'tithe': '10'}]).status_code, 200)
+        # Created without the signals that drop the cached sections, as in another process
+        choir, = Section.admin_objects.bulk_create([Section(church=self.church, name='Choir')])
+
+        response = self.post_funds([{'section_id': choir.pk, 'tithe': '5'}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post_funds([{'section_id': 999999, 'tithe': '5'}]).json()['errors'], ['Unknown section 999999'])
+
+
+class SundayAnalyticsTests(TestCase):
+    """Bucketed series, rolling averages and year-over-year deltas of the Sunday reports"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Analytics Church')
+        cls.user = User.objects.create_user('analytics-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        # No reports in February 2025 or from April to December 2025
+        for day, men, women, children, visitors, offering, tithe in (
+            (date(2025, 1, 5), 10, 20, 5, 1, 100, 50),
+            (date(2025, 1, 12), 20, 30, 5, 3, 50, 50),
+            (date(2025, 3, 2), 10, 10, 0, 0, 60, 40),
+            (date(2026, 1, 4), 30, 30, 10, 0, 200, 100),
+            (date(2026, 2, 1), 10, 10, 0, 0, 10, 0),
+            (date(2026, 3, 1), 5, 5, 0, 0, 30, 20),
+        ):
+            SundayReport.objects.create(
+                church=cls.church, date=day, attendance_men=men, attendance_women=women,
+                attendance_children=children, attendance_visitors=visitors,
+                total_offering=offering, total_tithe=tithe,
+            )
+        other = Church.objects.create(name='Other Church')
+        SundayReport.objects.create(church=other, date=date(2026, 1, 11), attendance_men=500, total_offering=9000)
+
+    def setUp(self):
+        cache.clear()
+
+    def analytics(self, **kwargs):
+        return sunday_analytics(SundayReport.admin_objects.filter(church=self.church), **kwargs)
+
+    def test_reports_are_grouped_by_month(self):
+        series = self.analytics()['series']
+
+        self.assertEqual(
+            [point['period'] for point in series],
+            [date(2025, 1, 1), date(2025, 3, 1), date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)],
+        )
+        january = series[0]
+        self.assertEqual(january['sundays'], 2)
+        self.assertEqual(
+            [january[name] for name in ('men', 'women', 'children', 'visitors', 'attendance')],
+            [15.0, 25.0, 5.0, 2.0, 47.0],
+        )
+        self.assertEqual(
+            [january[name] for name in ('offering', 'tithe', 'giving')],
+            [Decimal('150.00'), Decimal('100.00'), Decimal('250.00')],
+        )
+
+    def test_reports_are_grouped_by_quarter_and_week(self):
+        quarters = self.analytics(period='quarter')['series']
+
+        self.assertEqual([point['period'] for point in quarters], [date(2025, 1, 1), date(2026, 1, 1)])
+        self.assertEqual([point['sundays'] for point in quarters], [3, 3])
+        self.assertEqual(quarters[0]['men'], 13.3)
+        self.assertEqual(quarters[1]['attendance'], 33.3)
+        self.assertEqual([point['giving'] for point in quarters], [Decimal('350.00'), Decimal('360.00')])
+        self.assertEqual(quarters[1]['year_over_year']['giving'], {'change': Decimal('10.00'), 'percent': 2.9})
+
+        weeks = self.analytics(period='week')['series']
+        # Weeks start on Monday, so the two January 2025 Sundays fall in different weeks
+        self.assertEqual([point['period'] for point in weeks[:2]], [date(2024, 12, 30), date(2025, 1, 6)])
+        self.assertEqual(len(weeks), 6)
+
+    def test_rolling_average_runs_over_the_buckets_with_reports(self):
+        series = self.analytics()['series']
+
+        self.assertEqual(
+            [point['rolling_average']['attendance'] for point in series], [47.0, 33.5, 45.7, 36.7, 33.3],
+        )
+        self.assertEqual(series[2]['rolling_average']['giving'], Decimal('216.67'))
+        self.assertEqual(
+            [point['rolling_average']['attendance'] for point in self.analytics(window=1)['series']],
+            [point['attendance'] for point in series],
+        )
+
+    def test_year_over_year_compares_with_the_same_bucket(self):
+        series = {point['period']: point for point in self.analytics()['series']}
+
+        self.assertIsNone(series[date(2025, 1, 1)]['year_over_year'])
+        # February 2025 had no reports to compare with
+        self.assertIsNone(series[date(2026, 2, 1)]['year_over_year'])
+        january = series[date(2026, 1, 1)]['year_over_year']
+        self.assertEqual(january['attendance'], {'change': 23.0, 'percent': 48.9})
+        self.assertEqual(january['giving'], {'change': Decimal('50.00'), 'percent': 20.0})
+        march = series[date(2026, 3, 1)]['year_over_year']
+        self.assertEqual(march['giving'], {'change': Decimal('-50.00'), 'percent': -50.0})
+        self.assertEqual(march['visitors'], {'change': 0.0, 'percent': None})
+
+    def test_start_reads_the_year_before_for_averages_and_deltas(self):
+        series = self.analytics(start=date(2026, 1, 15), end=date(2026, 2, 28))['series']
+
+        self.assertEqual([point['period'] for point in series], [date(2026, 1, 1), date(2026, 2, 1)])
+        self.assertEqual(series[0]['rolling_average']['attendance'], 45.7)
+        self.assertEqual(series[0]['year_over_year']['attendance']['change'], 23.0)
+
+    def test_section_giving_is_broken_down_per_bucket(self):
+        men = Section.objects.create(church=self.church, name='Men')
+        report = SundayReport.admin_objects.get(church=self.church, date=date(2026, 1, 4))
+        SectionFunds.objects.create(
+            church=self.church, report=report, section=men, tithe_amount=100, envelopes_amount=30,
+            loose_offering_amount=15, thanksgiving_amount=5,
+        )
+
+        series = {point['period']: point for point in self.analytics()['series']}
+
+        self.assertEqual(series[date(2026, 1, 1)]['sections'], [{
+            'section_id': men.pk, 'section': 'Men',
+            'tithe': Decimal('100.00'), 'offering': Decimal('50.00'), 'total': Decimal('150.00'),
+        }])
+        self.assertEqual(series[date(2026, 2, 1)]['sections'], [])
+
+    def test_invalid_parameters_are_rejected(self):
+        with self.assertRaises(AnalyticsError):
+            self.analytics(period='day')
+        with self.assertRaises(AnalyticsError):
+            self.analytics(window=-1)
+
+    def test_cached_series_follows_report_changes(self):
+        first = cached_sunday_analytics(self.church.pk)
+        self.assertEqual(len(first['series']), 5)
+
+        SundayReport.objects.create(church=self.church, date=date(2026, 4, 5), attendance_men=40)
+
+        self.assertEqual(len(cached_sunday_analytics(self.church.pk)['series']), 6)
+
+    def test_endpoint_serves_the_users_church(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get('/api/reports/generate/attendance_analytics/', {'period': 'quarter'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([point['sundays'] for point in response.json()['series']], [3, 3])
+        response = self.client.get('/api/reports/generate/attendance_analytics/', {'start': 'soon'})
+        self.assertEqual(response.status_code, 400)
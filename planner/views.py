@@ -1,3 +1,5 @@
+from collections import Counter
+
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import render
@@ -5,8 +7,23 @@ from .models import Event, EventCategory, SundayReport, SectionFunds, SundayItem
 from .serializers import EventSerializer, EventCategorySerializer, SundayReportSerializer, SectionFundsSerializer, SundayItemSerializer
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from membership.models import Section
+from core.batch_sync import clean_rows, sync_rows
+from core.lookups import lookup_by_pk
+
+SECTION_FUND_FIELDS = ['tithe_amount', 'envelopes_amount', 'loose_offering_amount', 'thanksgiving_amount']
+# Keys posted by the Sunday activities screen -> SectionFunds fields
+SECTION_FUND_KEYS = {
+    'tithe': 'tithe_amount',
+    'envelopes': 'envelopes_amount',
+    'loose': 'loose_offering_amount',
+    'thanksgiving': 'thanksgiving_amount',
+}
+SUNDAY_ITEM_FIELDS = ['item_name', 'quantity', 'estimated_value', 'reserve_price', 'status', 'sold_price']
+SUNDAY_ITEM_DEFAULTS = {'quantity': 1, 'estimated_value': 0, 'reserve_price': 0, 'status': 'pending', 'sold_price': 0}
 
 def sunday_activities_view(request):
     """Render the Sunday activities dashboard"""
@@ -30,7 +47,7 @@ class EventViewSet(viewsets.ModelViewSet):
     ordering = ['start_date']
 
 class SundayReportViewSet(viewsets.ModelViewSet):
-    queryset = SundayReport.objects.prefetch_related('section_funds')
+    queryset = SundayReport.objects.select_related('section_on_duty').prefetch_related('section_funds__section', 'items')
     serializer_class = SundayReportSerializer
     filter_backends = [filters.OrderingFilter]
     ordering = ['-date']
@@ -51,27 +68,39 @@ class SundayReportViewSet(viewsets.ModelViewSet):
         report = self.get_object()
         funds_data = request.data.get('funds', []) # List of {section_id, tithe, envelopes...}
         
+        rows = [
+            {SECTION_FUND_KEYS.get(key, key): value for key, value in item.items()}
+            for item in funds_data
+        ]
+        try:
+            rows = clean_rows(SectionFunds, rows, SECTION_FUND_FIELDS)
+            section_ids = [int(item.get('section_id')) for item in funds_data]
+        except (TypeError, ValueError):
+            return Response({'errors': ['Every row needs a section_id']}, status=400)
+        except ValidationError as e:
+            return Response({'errors': e.messages}, status=400)
+        unknown = set(section_ids) - lookup_by_pk(Section, report.church_id, section_ids).keys()
+        if unknown:
+            return Response({'errors': [f"Unknown section {pk}" for pk in sorted(unknown)]}, status=400)
+        # One upsert cannot write the same (report, section) row twice
+        repeated = [pk for pk, count in Counter(section_ids).items() if count > 1]
+        if repeated:
+            return Response({'errors': [f"Section {pk} is listed more than once" for pk in sorted(repeated)]}, status=400)
+        
+        funds = [
+            SectionFunds(report=report, church_id=report.church_id, section_id=section_id,
+                         **{field: row[field] for field in SECTION_FUND_FIELDS})
+            for section_id, row in zip(section_ids, rows)
+        ]
         with transaction.atomic():
-            for item in funds_data:
-                section_id = item.get('section_id')
-                SectionFunds.objects.update_or_create(
-                    report=report,
-                    section_id=section_id,
-                    defaults={
-                        'tithe_amount': item.get('tithe', 0),
-                        'envelopes_amount': item.get('envelopes', 0),
-                        'loose_offering_amount': item.get('loose', 0),
-                        'thanksgiving_amount': item.get('thanksgiving', 0),
-                    }
-                )
-            
-            # Recalculate totals
-            total_offering = sum(f.envelopes_amount + f.loose_offering_amount + f.thanksgiving_amount for f in report.section_funds.all())
-            total_tithe = sum(f.tithe_amount for f in report.section_funds.all())
-            
-            report.total_offering = total_offering
-            report.total_tithe = total_tithe
-            report.save()
+            # One upsert for all sections, then the totals in one UPDATE
+            SectionFunds.admin_objects.bulk_create(
+                funds, update_conflicts=True, unique_fields=['report', 'section'], update_fields=SECTION_FUND_FIELDS
+            )
+            report.refresh_totals('total_offering', 'total_tithe')
+        # Replace the funds prefetched by get_object() so the response shows the saved values
+        getattr(report, '_prefetched_objects_cache', {}).pop('section_funds', None)
+        prefetch_related_objects([report], 'section_funds__section')
             
         return Response(self.get_serializer(report).data)
 
@@ -79,29 +108,30 @@ class SundayReportViewSet(viewsets.ModelViewSet):
     def update_items(self, request, pk=None):
         """Update donated items for this report"""
         report = self.get_object()
-        items_data = request.data.get('items', [])
+        try:
+            rows = clean_rows(SundayItem, request.data.get('items', []), SUNDAY_ITEM_FIELDS, SUNDAY_ITEM_DEFAULTS)
+        except ValidationError as e:
+            return Response({'errors': e.messages}, status=400)
+        for row in rows:
+            if row['status'] != 'sold':
+                row['sold_price'] = 0
+        
+        def build(row):
+            return SundayItem(report=report, church_id=report.church_id,
+                              **{field: row[field] for field in SUNDAY_ITEM_FIELDS})
+        
+        def apply(item, row):
+            for field in SUNDAY_ITEM_FIELDS:
+                setattr(item, field, row[field])
         
         with transaction.atomic():
-            # Clear existing items? Or update? Let's clear and re-add for simplicity of the UI form
-            # But maybe risky if ID based.
-            # Strategy: Delete all for this report and recreate. 
-            # Ideally we should use IDs to update, but for this specific "save functionality" from UI, replace is easiest.
-            report.items.all().delete()
-            
-            for item in items_data:
-                SundayItem.objects.create(
-                    report=report,
-                    item_name=item.get('item_name'),
-                    quantity=item.get('quantity', 1),
-                    estimated_value=item.get('estimated_value', 0),
-                    reserve_price=item.get('reserve_price', 0),
-                    status=item.get('status', 'pending'),
-                    sold_price=item.get('sold_price', 0) if item.get('status') == 'sold' else 0
-                )
+            # Rows sent without an id replace the ones missing from the list
+            sync_rows(report.items.all(), rows, SUNDAY_ITEM_FIELDS, build, apply)
             
             # Recalculate total sales
-            total_sales = sum(i.sold_price for i in report.items.all() if i.status == 'sold')
-            report.total_items_sale = total_sales
-            report.save()
+            report.refresh_totals('total_items_sale')
+        # Replace the items prefetched by get_object() with the saved ones
+        getattr(report, '_prefetched_objects_cache', {}).pop('items', None)
+        prefetch_related_objects([report], 'items')
             
         return Response(self.get_serializer(report).data)
@@ -1,3 +1,5 @@
+import datetime
+
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,12 +7,14 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count, Sum
 from membership.models import Member, Dependent
 from finance.models import (
-    Income, Expense, AnnualBudget, BudgetIncomeItem, BudgetExpenseItem
+    Income, Expense, AnnualBudget
 )
 from administration.models import Department
-from groups.models import GroupMembership
-from committees.models import CommitteeMembership
 from projects.models import Project
+from core.aggregates import with_membership_stats
+from core.models import get_current_church
+from finance.budget_performance import budget_performance
+from finance.budget_store import period_totals
 from .models import ReportTemplate, SavedReport
 from .serializers import ReportTemplateSerializer, SavedReportSerializer
 
@@ -79,17 +83,19 @@ class ReportViewSet(viewsets.ViewSet):
         """Groups statistics"""
         from groups.models import Group
         
-        groups = Group.objects.all()
-        data = []
-        
-        for group in groups:
-            active_members = GroupMembership.objects.filter(group=group, is_active=True).count()
-            data.append({
+        groups = with_membership_stats(Group.objects.all())
+        data = [
+            {
                 'group_name': group.name,
                 'description': group.description,
                 'meeting_schedule': group.meeting_schedule,
-                'active_members': active_members,
-            })
+                'active_members': group.active_member_count,
+                'total_members': group.member_count_total,
+                'active_leaders': group.active_leader_count,
+                'convenor': group.convenor_name,
+            }
+            for group in groups
+        ]
         
         return Response(data)
     
@@ -98,17 +104,19 @@ class ReportViewSet(viewsets.ViewSet):
         """Committees statistics"""
         from committees.models import Committee
         
-        committees = Committee.objects.all()
-        data = []
-        
-        for committee in committees:
-            active_members = CommitteeMembership.objects.filter(committee=committee, is_active=True).count()
-            data.append({
+        committees = with_membership_stats(Committee.objects.all())
+        data = [
+            {
                 'committee_name': committee.name,
                 'description': committee.description,
                 'meeting_schedule': committee.meeting_schedule,
-                'active_members': active_members,
-            })
+                'active_members': committee.active_member_count,
+                'total_members': committee.member_count_total,
+                'active_leaders': committee.active_leader_count,
+                'convenor': committee.convenor_name,
+            }
+            for committee in committees
+        ]
         
         return Response(data)
     
@@ -145,6 +153,31 @@ class ReportViewSet(viewsets.ViewSet):
             'recent_trend': data
         })
 
+    @action(detail=False, methods=['get'])
+    def attendance_analytics(self, request):
+        """Weekly, monthly or quarterly attendance and giving series with rolling averages"""
+        from planner.analytics import AnalyticsError, cached_sunday_analytics, sunday_analytics
+        from planner.models import SundayReport
+
+        params = request.query_params
+        try:
+            start = datetime.date.fromisoformat(params['start']) if params.get('start') else None
+            end = datetime.date.fromisoformat(params['end']) if params.get('end') else None
+            window = int(params['window']) if params.get('window') else None
+        except ValueError:
+            return Response({'error': 'start and end must be dates (YYYY-MM-DD) and window a number'}, status=400)
+        period = params.get('period', 'month')
+
+        church = get_current_church()
+        try:
+            if church:
+                data = cached_sunday_analytics(church.pk, period, start, end, window)
+            else:
+                data = sunday_analytics(SundayReport.objects.all(), period, start, end, window)
+        except AnalyticsError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def transfers_summary(self, request):
         """Member transfers statistics"""
@@ -175,7 +208,6 @@ class ReportViewSet(viewsets.ViewSet):
         """Variance analysis of Budget vs Actuals"""
         year = request.query_params.get('year')
         if not year:
-            import datetime
             year = datetime.date.today().year
             
         try:
@@ -188,8 +220,8 @@ class ReportViewSet(viewsets.ViewSet):
         expense_actual = Expense.objects.filter(transaction_date__year=year).aggregate(total=Sum('amount'))['total'] or 0
         
         # Budgeted
-        income_budgeted = sum(item.total for item in budget.income_items.all())
-        expense_budgeted = sum(item.total for item in budget.expense_items.all())
+        income_budgeted = period_totals('income', [budget]).get(budget.year, 0)
+        expense_budgeted = period_totals('expense', [budget]).get(budget.year, 0)
         
         return Response({
             'year': year,
@@ -208,20 +240,25 @@ class ReportViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def departmental_performance(self, request):
         """Budget performance by department"""
-        year = request.query_params.get('year', 2025)
-        depts = Department.objects.all()
+        year = request.query_params.get('year', datetime.date.today().year)
+
+        # Expenses carry no department; they are attributed through the
+        # department of their category's budget line
+        totals = {}
+        for budget in AnnualBudget.objects.filter(year=year):
+            for line in budget_performance(budget)['expense']:
+                dept = totals.setdefault(line['department_id'], {'budgeted': 0, 'actual': 0})
+                dept['budgeted'] += line['budgeted']
+                dept['actual'] += line['actual']
+
         data = []
-        
-        for dept in depts:
-            budgeted = BudgetExpenseItem.objects.filter(budget__year=year, department=dept).aggregate(total=Sum('jan')+Sum('feb')+Sum('mar')+Sum('apr')+Sum('may')+Sum('jun')+Sum('jul')+Sum('aug')+Sum('sep')+Sum('oct')+Sum('nov')+Sum('dec'))['total'] or 0
-            
-            # Actuals (This assumes Expense model has a department field, which it might not yet)
-            # For now return the budgeted allocation per department
+        for dept in Department.objects.all():
+            figures = totals.get(dept.pk, {'budgeted': 0, 'actual': 0})
             data.append({
                 'department': dept.name,
-                'budgeted': budgeted,
-                'actual': 0, # Future enhancement
-                'variance': -budgeted
+                'budgeted': figures['budgeted'],
+                'actual': figures['actual'],
+                'variance': figures['budgeted'] - figures['actual'],
             })
-            
+
         return Response(data)
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+        ('finance', '0012_hot_path_indexes'),
+        ('membership', '0007_hot_path_indexes'),
+        ('special_events', '0003_donation_church_harvestitem_church_pledge_church_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['church', 'date'], name='donation_church_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialday',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['church', 'date'], name='specialday_active_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from django.db.models import Case, F, Q, When
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from core.models import TenantModel
+from core.aggregates import sum_subquery
 
 
 class SpecialDay(TenantModel):
@@ -28,6 +30,9 @@ class SpecialDay(TenantModel):
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['church', 'date'], condition=models.Q(is_active=True), name='specialday_active_idx'),
+        ]
 
 class Pledge(TenantModel):
     """Promise to contribute"""
@@ -55,6 +60,9 @@ class Donation(TenantModel):
     def __str__(self):
         return f"K{self.amount} for {self.event}"
 
+    class Meta:
+        indexes = [models.Index(fields=['church', 'date'], name='donation_church_date_idx')]
+
 class HarvestItem(TenantModel):
     """In-Kind Donations (Maize, Chicken, etc.)"""
     STATUS_CHOICES = [
@@ -88,3 +96,23 @@ class HarvestItem(TenantModel):
     
     def __str__(self):
         return f"{self.item_name} ({self.status})"
+
+
+# Totals shown for each event, in the order the serializer lists them
+EVENT_TOTAL_FIELDS = ['total_cash', 'total_pledged', 'total_items_value', 'total_sales', 'total_estimated_unsold']
+
+
+def with_event_totals(queryset):
+    """Annotate SpecialDay rows with their donation, pledge and harvest item totals in one query"""
+    items = HarvestItem._base_manager.all()
+    sold = Q(status='sold', sold_amount__isnull=False) & ~Q(sold_amount=0)
+    return queryset.annotate(
+        total_cash=sum_subquery(Donation._base_manager.all(), 'event', 'amount'),
+        total_pledged=sum_subquery(Pledge._base_manager.all(), 'event', 'amount'),
+        # Sold items count at their sale price, everything else at its estimated value
+        total_items_value=sum_subquery(
+            items, 'event', Case(When(sold, then=F('sold_amount')), default=F('estimated_value'))
+        ),
+        total_sales=sum_subquery(items.filter(status='sold'), 'event', 'sold_amount'),
+        total_estimated_unsold=sum_subquery(items.exclude(status='sold'), 'event', 'estimated_value'),
+    )
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SpecialDay, Pledge, Donation, HarvestItem
+from .models import SpecialDay, Pledge, Donation, HarvestItem, EVENT_TOTAL_FIELDS, with_event_totals
 
 class SpecialDaySerializer(serializers.ModelSerializer):
     total_cash = serializers.SerializerMethodField()
@@ -11,28 +11,31 @@ class SpecialDaySerializer(serializers.ModelSerializer):
     class Meta:
         model = SpecialDay
         fields = '__all__'
+    
+    def _totals(self, obj):
+        # Annotated by with_event_totals on the viewset queryset; objects that were
+        # just created or updated are fetched with their totals once
+        if not hasattr(obj, 'total_cash'):
+            totals = with_event_totals(SpecialDay.admin_objects.filter(pk=obj.pk)).values(*EVENT_TOTAL_FIELDS).get()
+            for name, value in totals.items():
+                setattr(obj, name, value)
+        return obj
         
     def get_total_cash(self, obj):
-        return sum(d.amount for d in obj.donations.all())
+        return self._totals(obj).total_cash
         
     def get_total_pledged(self, obj):
-        return sum(p.amount for p in obj.pledges.all())
+        return self._totals(obj).total_pledged
         
     def get_total_items_value(self, obj):
         # Value of items (Estimated if not sold, Sold Amount if sold)
-        total = 0
-        for item in obj.items.all():
-            if item.status == 'sold' and item.sold_amount:
-                total += item.sold_amount
-            else:
-                total += item.estimated_value
-        return total
+        return self._totals(obj).total_items_value
 
     def get_total_sales(self, obj):
-        return sum(item.sold_amount for item in obj.items.filter(status='sold') if item.sold_amount)
+        return self._totals(obj).total_sales
 
     def get_total_estimated_unsold(self, obj):
-        return sum(item.estimated_value for item in obj.items.exclude(status='sold'))
+        return self._totals(obj).total_estimated_unsold
 
 class PledgeSerializer(serializers.ModelSerializer):
     member_name = serializers.CharField(source='member.full_name', read_only=True)
@@ -1,3 +1,169 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Church, UserProfile
+from finance.models import BankAccount, Income
+from membership.models import Member
+from .models import EVENT_TOTAL_FIELDS, Donation, HarvestItem, Pledge, SpecialDay, with_event_totals
+from .views import record_harvest_sales
+
+
+def python_totals(event):
+    """The totals as the serializer used to add them up, one event at a time"""
+    items = list(event.items.all())
+    return {
+        'total_cash': sum(d.amount for d in event.donations.all()),
+        'total_pledged': sum(p.amount for p in event.pledges.all()),
+        'total_items_value': sum(
+            item.sold_amount if item.status == 'sold' and item.sold_amount else item.estimated_value for item in items
+        ),
+        'total_sales': sum(item.sold_amount for item in items if item.status == 'sold' and item.sold_amount),
+        'total_estimated_unsold': sum(item.estimated_value for item in items if item.status != 'sold'),
+    }
+
+
+class EventTotalsTests(TestCase):
+    """with_event_totals gives the same figures as summing each event's rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Harvest Church')
+        cls.user = User.objects.create_user('events-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        member = Member.objects.create(
+            church=cls.church, first_name='Ruth', last_name='Banda', gender='F', date_of_birth=date(1980, 1, 1),
+            address='-', membership_status='communicant', date_joined=date(2010, 1, 1),
+        )
+        cls.harvest, cls.christmas, cls.empty = [
+            SpecialDay.objects.create(church=cls.church, name=name, date=date(2026, month, 1), event_type='harvest')
+            for name, month in (('Harvest', 4), ('Christmas', 12), ('Quiet Sunday', 6))
+        ]
+        for event, amounts in ((cls.harvest, ('100.00', '50.50')), (cls.christmas, ('20.00',))):
+            for amount in amounts:
+                Donation.objects.create(church=cls.church, event=event, amount=Decimal(amount), date=event.date)
+                Pledge.objects.create(church=cls.church, event=event, member=member, amount=Decimal(amount) * 2)
+        for status, estimate, sold in (
+            ('sold', '40.00', '55.00'),
+            ('sold', '30.00', None),
+            ('sold', '25.00', '0.00'),
+            ('received', '60.00', None),
+            ('donated', '15.00', None),
+        ):
+            HarvestItem.objects.create(
+                church=cls.church, event=cls.harvest, item_name='Maize', status=status,
+                estimated_value=Decimal(estimate), sold_amount=sold and Decimal(sold),
+            )
+
+    def test_annotations_match_the_per_event_sums(self):
+        for event in with_event_totals(SpecialDay.objects.all()):
+            annotated = {name: getattr(event, name) or 0 for name in EVENT_TOTAL_FIELDS}
+            self.assertEqual(annotated, python_totals(event), event.name)
+
+    def list_events(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/special/api/events/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_event_list_reads_the_annotations(self):
+        self.client.force_login(self.user)
+        _, queries = self.list_events()
+        SpecialDay.objects.create(church=self.church, name='New Year', date=date(2026, 1, 1), event_type='holiday')
+
+        response, more_queries = self.list_events()
+
+        self.assertEqual(more_queries, queries)
+        events = {event['name']: event for event in response.json()['results']}
+        self.assertEqual(len(events), 4)
+        harvest = events['Harvest']
+        self.assertEqual(Decimal(harvest['total_cash']), Decimal('150.50'))
+        self.assertEqual(Decimal(harvest['total_pledged']), Decimal('301.00'))
+        self.assertEqual(Decimal(harvest['total_items_value']), Decimal('185.00'))
+        self.assertEqual(Decimal(harvest['total_sales']), Decimal('55.00'))
+        self.assertEqual(Decimal(harvest['total_estimated_unsold']), Decimal('75.00'))
+
+
+class HarvestItemSyncTests(TestCase):
+    """update_items syncs the posted items in bulk and books the new sales as income"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Sales Church')
+        cls.user = User.objects.create_user('harvest-admin', password='x')
+        UserProfile.objects.create(user=cls.user, church=cls.church)
+        cls.event = SpecialDay.objects.create(
+            church=cls.church, name='Green Harvest', date=date(2026, 4, 5), event_type='harvest',
+        )
+        cls.kept, cls.sold, cls.dropped = [
+            HarvestItem.objects.create(church=cls.church, event=cls.event, item_name=name, estimated_value=50)
+            for name in ('Maize', 'Beans', 'Pumpkins')
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def add_account(self):
+        return BankAccount.objects.create(
+            church=self.church, account_name='Main', bank_name='Bank', account_number='1', account_type='checking',
+        )
+
+    def post_items(self, items):
+        return self.client.post(
+            f'/special/api/events/{self.event.pk}/update_items/', {'items': items}, content_type='application/json',
+        )
+
+    def sale_rows(self):
+        return [
+            {'id': self.kept.pk, 'item_name': 'Maize', 'estimated_value': '50'},
+            {'id': self.sold.pk, 'item_name': 'Beans', 'estimated_value': '50', 'status': 'sold', 'sold_amount': '80'},
+            {'item_name': 'Goat', 'estimated_value': '300', 'status': 'sold', 'sold_amount': '320'},
+        ]
+
+    def test_items_are_synced_and_sales_booked_once(self):
+        account = self.add_account()
+
+        response = self.post_items(self.sale_rows())
+
+        self.assertEqual(response.json(), {'status': 'Items updated', 'count': 3})
+        items = {item.item_name: item for item in HarvestItem.objects.filter(event=self.event)}
+        self.assertEqual(set(items), {'Maize', 'Beans', 'Goat'})
+        self.assertEqual(items['Beans'].pk, self.sold.pk)
+        self.assertIsNone(items['Maize'].finance_income)
+        incomes = {income.amount: income for income in Income.objects.filter(church=self.church)}
+        self.assertEqual(set(incomes), {Decimal('80.00'), Decimal('320.00')})
+        self.assertEqual(items['Goat'].finance_income, incomes[Decimal('320.00')])
+        self.assertEqual(incomes[Decimal('80.00')].category.name, 'Harvest Sales')
+        self.assertEqual(incomes[Decimal('80.00')].description, 'Harvest Sale: Beans from Green Harvest')
+        account.refresh_from_db()
+        self.assertEqual(account.current_balance, Decimal('400.00'))
+
+        # Posting the same list again leaves the booked sales alone
+        rows = self.sale_rows()
+        rows[2]['id'] = items['Goat'].pk
+        self.assertEqual(self.post_items(rows).status_code, 200)
+        self.assertEqual(Income.objects.filter(church=self.church).count(), 2)
+        account.refresh_from_db()
+        self.assertEqual(account.current_balance, Decimal('400.00'))
+
+    def test_sales_wait_for_a_bank_account(self):
+        self.assertEqual(self.post_items(self.sale_rows()).status_code, 200)
+        self.assertFalse(Income.objects.exists())
+
+        self.add_account()
+        items = HarvestItem.objects.filter(event=self.event).select_related('event')
+        self.assertEqual(len(record_harvest_sales(items, self.user)), 2)
+        self.assertEqual(HarvestItem.objects.filter(finance_income__isnull=False).count(), 2)
+
+    def test_invalid_rows_change_nothing(self):
+        response = self.post_items([{'id': self.kept.pk, 'item_name': '', 'estimated_value': 'lots'}])
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['errors']), 2)
+        self.assertEqual(HarvestItem.objects.filter(event=self.event).count(), 3)
@@ -1,12 +1,66 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Sum
-from .models import SpecialDay, Pledge, Donation, HarvestItem
+from .models import SpecialDay, Pledge, Donation, HarvestItem, with_event_totals
 from .serializers import SpecialDaySerializer, PledgeSerializer, DonationSerializer, HarvestItemSerializer
 from finance.models import Income, IncomeCategory, BankAccount
+from finance.ledger import record_transactions
+from core.batch_sync import clean_rows, sync_rows
+from core.lookups import lookup_or_create, lookup_rows
+from dashboard.summaries import schedule_refresh
 from django.shortcuts import render
 
+HARVEST_ITEM_FIELDS = ['item_name', 'quantity', 'estimated_value', 'reserve_price', 'donor_name', 'status', 'sold_amount']
+HARVEST_ITEM_DEFAULTS = {'quantity': 1, 'estimated_value': 0, 'reserve_price': 0, 'donor_name': '', 'status': 'received'}
+
+
+def record_harvest_sales(items, user):
+    """Create the finance income for sold harvest items that don't have one yet, in bulk"""
+    pending = [item for item in items if item.status == 'sold' and item.sold_amount and not item.finance_income_id]
+    if not pending:
+        return []
+    
+    incomes = []
+    for church_id in {item.church_id for item in pending}:
+        accounts = lookup_rows(BankAccount, church_id) or lookup_rows(BankAccount, church_id, fresh=True)
+        if not accounts:
+            continue
+        category = lookup_or_create(IncomeCategory, "Harvest Sales", church_id)
+        default_account = accounts[0]
+        for item in pending:
+            if item.church_id != church_id:
+                continue
+            sold_date = HarvestItem._meta.get_field('sold_date').to_python(item.sold_date)
+            item.finance_income = Income(
+                church_id=church_id,
+                category=category,
+                bank_account=default_account,
+                amount=item.sold_amount,
+                transaction_date=sold_date or item.created_at.date(),
+                payer_name=f"Sale of {item.item_name}",
+                description=f"Harvest Sale: {item.item_name} from {item.event.name}",
+                payment_method='cash',
+                created_by=user
+            )
+            incomes.append(item.finance_income)
+    
+    if incomes:
+        Income.objects.bulk_create(incomes)
+        linked = [item for item in pending if item.finance_income is not None]
+        for item in linked:
+            # Re-assign now that the income has a primary key
+            item.finance_income = item.finance_income
+        HarvestItem._base_manager.bulk_update(linked, ['finance_income'])
+        # bulk_create skips the signals that keep the bank balances and dashboard rollups current
+        record_transactions(incomes)
+        for church_id in {income.church_id for income in incomes}:
+            schedule_refresh(church_id, [i.transaction_date for i in incomes if i.church_id == church_id], ('income',))
+    return incomes
+
+
 def special_events_dashboard(request):
     """Render the special events dashboard"""
     return render(request, 'dashboard/special_events.html')
@@ -18,86 +72,44 @@ class SpecialDayViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
     ordering = ['-date']
 
+    def get_queryset(self):
+        return with_event_totals(super().get_queryset())
+
     @action(detail=True, methods=['post'])
     def update_items(self, request, pk=None):
         """Bulk update items for this event (Sync items from FE)"""
         event = self.get_object()
-        items_data = request.data.get('items', [])
+        try:
+            rows = clean_rows(HarvestItem, request.data.get('items', []), HARVEST_ITEM_FIELDS, HARVEST_ITEM_DEFAULTS)
+        except ValidationError as e:
+            return Response({'errors': e.messages}, status=400)
         
-        # Get existing IDs to track deletions
-        existing_ids = set(event.items.values_list('id', flat=True))
-        incoming_ids = set(item.get('id') for item in items_data if item.get('id'))
+        def build(row):
+            return HarvestItem(
+                event=event,
+                church_id=event.church_id,
+                item_name=row['item_name'],
+                quantity=row['quantity'],
+                estimated_value=row['estimated_value'],
+                reserve_price=row['reserve_price'],
+                donor_name=row['donor_name'],
+                status=row['status'],
+                sold_amount=row['sold_amount'] if row['status'] == 'sold' else None,
+            )
         
-        # Items to delete
-        to_delete_ids = existing_ids - incoming_ids
-        HarvestItem.objects.filter(id__in=to_delete_ids).delete()
+        def apply(item, row):
+            for field in ('item_name', 'quantity', 'estimated_value', 'reserve_price', 'donor_name', 'status'):
+                setattr(item, field, row[field])
+            if row['status'] == 'sold' and row['sold_amount']:
+                item.sold_amount = row['sold_amount']
         
-        updated_items = []
+        with transaction.atomic():
+            # Existing rows missing from the list are deleted
+            result = sync_rows(event.items.all(), rows, HARVEST_ITEM_FIELDS, build, apply)
+            # Make sure every sold item has its finance record
+            record_harvest_sales(result.objects, request.user)
         
-        for item_data in items_data:
-            item_id = item_data.get('id')
-            status_val = item_data.get('status', 'received')
-            sold_amount = item_data.get('sold_amount')
-            sold_date = item_data.get('sold_date') or request.data.get('date') # Default to today if not set?
-            
-            if item_id:
-                # Update
-                item = HarvestItem.objects.get(id=item_id)
-                item.item_name = item_data.get('item_name')
-                item.quantity = item_data.get('quantity', 1)
-                item.estimated_value = item_data.get('estimated_value', 0)
-                item.reserve_price = item_data.get('reserve_price', 0)
-                item.donor_name = item_data.get('donor_name', '')
-                item.status = status_val
-                
-                if status_val == 'sold' and sold_amount:
-                     item.sold_amount = sold_amount
-                     # If newly sold or amount changed, handle finance? 
-                     # For simplicity, we assume the specific 'sell' action handled finance, 
-                     # but here we might need to sync it. 
-                     # Let's call the logic to ensure finance record exists if sold
-                     # Reuse logic from HarvestItemViewSet if possible, or duplicate for safety
-                     pass 
-                
-                item.save()
-                updated_items.append(item)
-            else:
-                # Create
-                item = HarvestItem.objects.create(
-                    event=event,
-                    item_name=item_data.get('item_name'),
-                    quantity=item_data.get('quantity', 1),
-                    estimated_value=item_data.get('estimated_value', 0),
-                    reserve_price=item_data.get('reserve_price', 0),
-                    donor_name=item_data.get('donor_name', ''),
-                    status=status_val,
-                    sold_amount=sold_amount if status_val == 'sold' else None
-                )
-                updated_items.append(item)
-                
-            # Post-save finance check for this item
-            if item.status == 'sold' and item.sold_amount and not item.finance_income:
-                 # Create income
-                 try:
-                    category, _ = IncomeCategory.objects.get_or_create(name="Harvest Sales")
-                    default_account = BankAccount.objects.first()
-                    if default_account:
-                        income = Income.objects.create(
-                            category=category,
-                            bank_account=default_account,
-                            amount=item.sold_amount,
-                            transaction_date=item.sold_date or item.created_at.date(),
-                            payer_name=f"Sale of {item.item_name}",
-                            description=f"Harvest Sale: {item.item_name} from {event.name}",
-                            payment_method='cash',
-                            created_by=request.user
-                        )
-                        item.finance_income = income
-                        item.save()
-                 except Exception as e:
-                     print(f"Auto-finance error: {e}")
-        
-        return Response({'status': 'Items updated', 'count': len(updated_items)})
+        return Response({'status': 'Items updated', 'count': len(result)})
 
 class DonationViewSet(viewsets.ModelViewSet):
     queryset = Donation.objects.all()
@@ -111,8 +123,12 @@ class DonationViewSet(viewsets.ModelViewSet):
     def _create_finance_record(self, donation):
         try:
             # Find or Create Category for Special Events
-            category, _ = IncomeCategory.objects.get_or_create(name="Special Events")
-            default_account = BankAccount.objects.first() # Simplification
+            category = lookup_or_create(IncomeCategory, "Special Events", donation.church_id)
+            accounts = (
+                lookup_rows(BankAccount, donation.church_id)
+                or lookup_rows(BankAccount, donation.church_id, fresh=True)
+            )
+            default_account = accounts[0] if accounts else None # Simplification
             
             if default_account:
                 income = Income.objects.create(
@@ -140,25 +156,7 @@ class HarvestItemViewSet(viewsets.ModelViewSet):
             self._record_sale_income(item, self.request.user)
             
     def _record_sale_income(self, item, user):
-        try:
-            category, _ = IncomeCategory.objects.get_or_create(name="Harvest Sales")
-            default_account = BankAccount.objects.first()
-            
-            if default_account and not item.finance_income:
-                income = Income.objects.create(
-                    category=category,
-                    bank_account=default_account,
-                    amount=item.sold_amount,
-                    transaction_date=item.sold_date or item.created_at.date(),
-                    payer_name=f"Sale of {item.item_name}",
-                    description=f"Harvest Sale: {item.item_name} from {item.event.name}",
-                    payment_method='cash',
-                    created_by=user
-                )
-                item.finance_income = income
-                item.save()
-        except Exception as e:
-            print(f"Error recording income: {e}")
+        record_harvest_sales([item], user)
 
     @action(detail=True, methods=['post'])
     def sell(self, request, pk=None):
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'planner',
     'hr',
     'special_events',
+    'dashboard',
 ]
 
 MIDDLEWARE = [
@@ -94,6 +95,22 @@ DATABASES = {
 }
 
 
+# Cache. The local-memory backend is per process: each worker keeps its own
+# entries and never sees another process store or delete one. Cached figures
+# that must stay correct across workers (such as the Sunday analytics) are
+# stored with a freshness stamp of their source rows (row count and latest
+# updated_at) that is checked on every read, so a stale entry is never served.
+# Lookup tables (core.lookups) expire after a few minutes, and are read again
+# from the database when a row being looked up is missing.
+# A shared backend (Redis, Memcached) gives every worker the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ucz-cms',
+    }
+}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
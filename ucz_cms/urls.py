@@ -18,6 +18,7 @@ urlpatterns = [
     path('', include('dashboard.urls')),
     
     # API endpoints
+    path('api/core/', include('core.urls')),
     path('api/membership/', include('membership.urls')),
     path('api/administration/', include('administration.urls')),
     path('api/groups/', include('groups.urls')),
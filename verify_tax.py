@@ -5,51 +5,35 @@ from decimal import Decimal
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ucz_cms.settings')
 django.setup()
 
-from hr.models import Employee, PayrollPeriod, Payslip
-from hr.views import calculate_paye
+from hr.models import Employee, PayrollPeriod
+from hr.payroll import calculate_payslip
+from hr.rates import rates_for
 from django.utils import timezone
 
 def test_calculations():
     print("--- Starting Verification ---")
     
-    # 1. Setup Data
-    basic = 10000
-    housing = 2000
-    emp, _ = Employee.objects.get_or_create(
-        email="tax_test@example.com",
-        defaults={
-            'first_name': "Tax", 'last_name': "Payer", 'role': "Manager",
-            'date_joined': timezone.now().date(),
-            'basic_salary': basic, 'housing_allowance': housing
-        }
+    # 1. Setup Data (not saved)
+    emp = Employee(
+        first_name="Tax", last_name="Payer", role="Manager",
+        date_joined=timezone.now().date(),
+        basic_salary=Decimal("10000.00"), housing_allowance=Decimal("2000.00")
     )
-    # Ensure allowances are set if it existed
-    emp.basic_salary = basic
-    emp.housing_allowance = housing
-    emp.save()
     
-    # 2. Simulate View Logic (Copy-Paste of logic for verification)
-    gross = emp.basic_salary + emp.housing_allowance
+    # 2. Run the payroll engine with the rates in effect this month
+    period = PayrollPeriod(month=timezone.now().date().replace(day=1))
+    rates = rates_for(period.month)
+    slip = calculate_payslip(emp, period, rates)
     
-    napsa_max_income = 27072
-    napsa_income = min(gross, napsa_max_income)
-    pension = Decimal(float(napsa_income) * 0.05).quantize(Decimal("0.01"))
+    print(f"Rates: effective from {rates.effective_from}")
+    print(f"Gross: {slip.gross_pay}")
+    print(f"Pension (5%): {slip.pension_deduction} (Expected: 600.00)")
+    print(f"NHIMA (1% Basic): {slip.nhima_deduction} (Expected: 100.00)")
+    print(f"Taxable: {slip.gross_pay - slip.pension_deduction}")
+    print(f"PAYE: {slip.paye_tax} (Expected: 1844.00)")
+    print(f"Net Pay: {slip.net_pay_calculated} (Expected: 9456.00)")
     
-    nhima = Decimal(float(emp.basic_salary) * 0.01).quantize(Decimal("0.01"))
-    
-    taxable_income = gross - pension
-    paye = Decimal(calculate_paye(taxable_income)).quantize(Decimal("0.01"))
-    
-    net_pay = gross - (pension + nhima + paye)
-    
-    print(f"Gross: {gross}")
-    print(f"Pension (5%): {pension} (Expected: 600.00)")
-    print(f"NHIMA (1% Basic): {nhima} (Expected: 100.00)")
-    print(f"Taxable: {taxable_income}")
-    print(f"PAYE: {paye} (Expected: ~1844.00)")
-    print(f"Net Pay: {net_pay} (Expected: ~9456.00)")
-    
-    if abs(paye - Decimal("1844.00")) < 1:
+    if slip.paye_tax == Decimal("1844.00") and slip.net_pay_calculated == Decimal("9456.00"):
         print("SUCCESS: Tax calculation looks correct.")
     else:
         print("FAILURE: Tax calculation mismatch.")